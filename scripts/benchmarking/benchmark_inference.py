@@ -0,0 +1,113 @@
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from src.bayesian_nn import (
+    create_bnn_model,
+    extract_features_and_target,
+    model_inference,
+)
+from src.priors_posteriors import std_normal_posterior, std_normal_prior
+
+
+def time_inference(model, X, num_samples, batched, repeats):
+    # The first call traces the batched graph, so it is excluded
+    model_inference(model, X, num_samples, tag="warmup", batched=batched)
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model_inference(model, X, num_samples, tag="timed", batched=batched)
+        timings.append(time.perf_counter() - start)
+
+    return float(np.median(timings))
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--data_path",
+        type=str,
+        default="data/val_data.csv",
+        help="Path of the csv used as the inference set",
+    )
+    parser.add_argument(
+        "--hidden_units",
+        nargs="+",
+        type=int,
+        default=None,
+        help="Structure of hidden layer as a list, e.g., 8 or 8 16",
+    )
+    parser.add_argument(
+        "--num_samples",
+        nargs="+",
+        type=int,
+        default=[100, 1000],
+        help="Numbers of output samples to benchmark",
+    )
+    parser.add_argument(
+        "--repeats",
+        type=int,
+        default=3,
+        help="Number of timed repeats per configuration",
+    )
+    parser.add_argument(
+        "--output_path",
+        type=str,
+        default=None,
+        help="Optional path to save the results as json",
+    )
+
+    args = parser.parse_args()
+
+    data = pd.read_csv(args.data_path)
+    data = data.drop(
+        columns=[
+            col for col in ["season", "bookies_prob"] if col in data.columns
+        ]
+    )
+    feature_names = [col for col in data.columns if col != "h_win"]
+    X, _ = extract_features_and_target(data, feature_names, "h_win")
+
+    # Sampling cost does not depend on the fitted values of the weights
+    model = create_bnn_model(
+        feature_names=feature_names,
+        hidden_units=args.hidden_units,
+        prior=std_normal_prior,
+        posterior=std_normal_posterior,
+        n_train=len(data),
+    )
+
+    results = []
+    for num_samples in args.num_samples:
+        loop_time = time_inference(
+            model, X, num_samples, batched=False, repeats=args.repeats
+        )
+        batched_time = time_inference(
+            model, X, num_samples, batched=True, repeats=args.repeats
+        )
+        results.append(
+            {
+                "num_fixtures": len(data),
+                "num_samples": num_samples,
+                "hidden_units": args.hidden_units,
+                "loop_seconds": loop_time,
+                "batched_seconds": batched_time,
+                "speedup": loop_time / batched_time,
+            }
+        )
+        logger.info(
+            f"{num_samples} samples over {len(data)} fixtures: "
+            f"loop {loop_time:.3f}s, batched {batched_time:.3f}s "
+            f"({loop_time / batched_time:.1f}x)"
+        )
+
+    if args.output_path is not None:
+        with open(args.output_path, "w") as f:
+            json.dump(results, f, indent=4)
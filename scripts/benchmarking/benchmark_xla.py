@@ -0,0 +1,120 @@
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from src.bayesian_nn import extract_features_and_target, model_inference
+from src.experimentation import fit_bnn_model
+from src.helper_functions import EpochTimer
+
+
+def time_call(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--training_data_path",
+        type=str,
+        default="data/train_data.csv",
+        help="Path of training data csv",
+    )
+    parser.add_argument(
+        "--validation_data_path",
+        type=str,
+        default="data/val_data.csv",
+        help="Path of validation data csv",
+    )
+    parser.add_argument(
+        "--hidden_units",
+        nargs="+",
+        type=int,
+        default=None,
+        help="Structure of hidden layer as a list, e.g., 8 or 8 16",
+    )
+    parser.add_argument(
+        "--num_epochs", type=int, default=20, help="Number of epochs"
+    )
+    parser.add_argument(
+        "--num_batches",
+        type=int,
+        default=1,
+        help="Number of batches for training",
+    )
+    parser.add_argument(
+        "--num_samples",
+        type=int,
+        default=100,
+        help="Number of output samples per inference call",
+    )
+    parser.add_argument(
+        "--output_path",
+        type=str,
+        default=None,
+        help="Optional path to save the results as json",
+    )
+
+    args = parser.parse_args()
+
+    train_data = pd.read_csv(args.training_data_path).drop(columns="season")
+    val_data = pd.read_csv(args.validation_data_path).drop(
+        columns=["season", "bookies_prob"]
+    )
+
+    feature_names = [col for col in train_data.columns if col != "h_win"]
+    X_train, y_train = extract_features_and_target(
+        train_data, feature_names, "h_win"
+    )
+    X_val, _ = extract_features_and_target(val_data, feature_names, "h_win")
+
+    results = []
+    for jit_compile in [False, True]:
+        timer = EpochTimer()
+        model = fit_bnn_model(
+            X_train,
+            y_train,
+            feature_names,
+            hidden_units=args.hidden_units,
+            num_epochs=args.num_epochs,
+            num_batches=args.num_batches,
+            callbacks=[timer],
+            jit_compile=jit_compile,
+        )
+        epoch_times = np.diff([0.0] + timer.epoch_ends)
+
+        result = {
+            "jit_compile": jit_compile,
+            "first_epoch_seconds": float(epoch_times[0]),
+            "median_epoch_seconds": float(np.median(epoch_times[1:])),
+        }
+        for batched in [False, True]:
+            mode = "batched" if batched else "loop"
+
+            def inference():
+                model_inference(
+                    model,
+                    X_val,
+                    args.num_samples,
+                    tag=mode,
+                    batched=batched,
+                    jit_compile=jit_compile,
+                )
+
+            # The first call includes tracing and compilation
+            result[f"{mode}_first_inference_seconds"] = time_call(inference)
+            result[f"{mode}_inference_seconds"] = time_call(inference)
+
+        results.append(result)
+        logger.info(result)
+
+    if args.output_path is not None:
+        with open(args.output_path, "w") as f:
+            json.dump(results, f, indent=4)
@@ -0,0 +1,132 @@
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from src.bayesian_nn import extract_features_and_target
+from src.experimentation import fit_bnn_model
+from src.helper_functions import EpochTimer, SampledBrierScore
+
+LAYER_TYPES = ["dense_variational", "flipout", "local_reparameterization"]
+
+
+def epochs_to_target(val_briers, target):
+    reached = np.flatnonzero(np.asarray(val_briers) <= target)
+    return int(reached[0]) + 1 if len(reached) else None
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--training_data_path",
+        type=str,
+        default="data/train_data.csv",
+        help="Path of training data csv",
+    )
+    parser.add_argument(
+        "--validation_data_path",
+        type=str,
+        default="data/val_data.csv",
+        help="Path of validation data csv",
+    )
+    parser.add_argument(
+        "--hidden_units",
+        nargs="+",
+        type=int,
+        default=None,
+        help="Structure of hidden layer as a list, e.g., 8 or 8 16",
+    )
+    parser.add_argument(
+        "--learning_rate", type=float, default=0.001, help="Learning rate"
+    )
+    parser.add_argument(
+        "--num_epochs", type=int, default=100, help="Number of epochs"
+    )
+    parser.add_argument(
+        "--num_batches",
+        type=int,
+        default=1,
+        help="Number of batches for training",
+    )
+    parser.add_argument(
+        "--target_brier",
+        type=float,
+        default=None,
+        help="Validation Brier score to reach, defaults to the final "
+        + "score of the dense_variational run",
+    )
+    parser.add_argument(
+        "--output_path",
+        type=str,
+        default=None,
+        help="Optional path to save the results as json",
+    )
+
+    args = parser.parse_args()
+
+    train_data = pd.read_csv(args.training_data_path).drop(columns="season")
+    val_data = pd.read_csv(args.validation_data_path).drop(
+        columns=["season", "bookies_prob"]
+    )
+
+    feature_names = [col for col in train_data.columns if col != "h_win"]
+    X_train, y_train = extract_features_and_target(
+        train_data, feature_names, "h_win"
+    )
+    X_val, y_val = extract_features_and_target(
+        val_data, feature_names, "h_win"
+    )
+
+    histories = {}
+    for layer_type in LAYER_TYPES:
+        timer = EpochTimer()
+        model = fit_bnn_model(
+            X_train,
+            y_train,
+            feature_names,
+            hidden_units=args.hidden_units,
+            learning_rate=args.learning_rate,
+            num_epochs=args.num_epochs,
+            num_batches=args.num_batches,
+            # The only posterior every layer type supports, so the
+            # comparison isolates the gradient estimator
+            posterior="mean_field",
+            layer_type=layer_type,
+            callbacks=[SampledBrierScore(X_val, y_val), timer],
+        )
+        histories[layer_type] = {
+            "val_brier": model.history.history["val_brier"],
+            "epoch_ends": timer.epoch_ends,
+        }
+
+    target = args.target_brier
+    if target is None:
+        target = histories["dense_variational"]["val_brier"][-1]
+
+    results = []
+    for layer_type, history in histories.items():
+        epochs = epochs_to_target(history["val_brier"], target)
+        results.append(
+            {
+                "layer_type": layer_type,
+                "target_brier": target,
+                "final_val_brier": history["val_brier"][-1],
+                "epochs_to_target": epochs,
+                "seconds_to_target": (
+                    history["epoch_ends"][epochs - 1] if epochs else None
+                ),
+                "total_seconds": history["epoch_ends"][-1],
+            }
+        )
+        logger.info(
+            f"{layer_type}: {epochs} epochs to Brier {target:.4f}, "
+            f"{history['epoch_ends'][-1]:.1f}s for {args.num_epochs} epochs"
+        )
+
+    if args.output_path is not None:
+        with open(args.output_path, "w") as f:
+            json.dump(results, f, indent=4)
@@ -0,0 +1,130 @@
+import argparse
+import json
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from loguru import logger
+
+
+def post_fixture(url: str, fixture: dict, timeout: float) -> float:
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(fixture).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def run_load_test(
+    url: str,
+    fixture: dict,
+    num_clients: int,
+    num_requests: int,
+    timeout: float = 30.0,
+) -> dict:
+    # Every client waits at the barrier so the first wave of connections
+    # lands at once, like the rush before a round of kick-offs
+    barrier = threading.Barrier(num_clients)
+
+    def client(requests_per_client: int) -> list:
+        barrier.wait()
+        outcomes = []
+        for _ in range(requests_per_client):
+            try:
+                outcomes.append(post_fixture(url, fixture, timeout))
+            except Exception as e:
+                outcomes.append(type(e).__name__)
+        return outcomes
+
+    per_client = [
+        num_requests // num_clients + (i < num_requests % num_clients)
+        for i in range(num_clients)
+    ]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=num_clients) as executor:
+        outcomes = [
+            outcome
+            for results in executor.map(client, per_client)
+            for outcome in results
+        ]
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array([o for o in outcomes if isinstance(o, float)])
+    errors = [o for o in outcomes if not isinstance(o, float)]
+    return {
+        "num_clients": num_clients,
+        "num_requests": num_requests,
+        "num_succeeded": len(latencies),
+        "num_failed": len(errors),
+        "errors": {name: errors.count(name) for name in set(errors)},
+        "p50_latency_ms": (
+            float(np.percentile(latencies, 50) * 1000)
+            if len(latencies)
+            else None
+        ),
+        "p99_latency_ms": (
+            float(np.percentile(latencies, 99) * 1000)
+            if len(latencies)
+            else None
+        ),
+        "throughput_per_second": len(latencies) / elapsed,
+    }
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--url",
+        type=str,
+        default="http://127.0.0.1:8080/predict",
+        help="Prediction endpoint of a running serve.py",
+    )
+    parser.add_argument(
+        "--weight_bank_path",
+        type=str,
+        required=True,
+        help="Weight bank the server uses, to build a valid payload",
+    )
+    parser.add_argument(
+        "--num_clients",
+        type=int,
+        default=200,
+        help="Number of concurrent clients",
+    )
+    parser.add_argument(
+        "--num_requests",
+        type=int,
+        default=400,
+        help="Total number of requests across all clients",
+    )
+    parser.add_argument(
+        "--output_path",
+        type=str,
+        default=None,
+        help="Optional path to save the results as json",
+    )
+
+    args = parser.parse_args()
+
+    with open(f"{args.weight_bank_path}/metadata.json", "r") as f:
+        feature_names = json.load(f)["feature_names"]
+
+    results = run_load_test(
+        args.url,
+        {name: 0.0 for name in feature_names},
+        args.num_clients,
+        args.num_requests,
+    )
+    logger.info(json.dumps(results, indent=4))
+
+    if args.output_path is not None:
+        with open(args.output_path, "w") as f:
+            json.dump(results, f, indent=4)
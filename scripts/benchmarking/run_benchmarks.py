@@ -0,0 +1,106 @@
+import argparse
+import json
+
+from loguru import logger
+
+from src.benchmarking import (
+    TIERS,
+    compare_results,
+    run_benchmarks,
+    save_results,
+)
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--tiers",
+        nargs="+",
+        type=str,
+        default=list(TIERS),
+        choices=list(TIERS),
+        help="Size tiers of synthetic data to benchmark",
+    )
+    parser.add_argument(
+        "--hidden_units",
+        nargs="+",
+        type=int,
+        default=None,
+        help="Structure of hidden layer as a list, e.g., 8 or 8 16",
+    )
+    parser.add_argument(
+        "--num_epochs",
+        type=int,
+        default=5,
+        help="Number of training epochs to time",
+    )
+    parser.add_argument(
+        "--num_batches",
+        type=int,
+        default=1,
+        help="Number of batches per training epoch",
+    )
+    parser.add_argument(
+        "--num_samples",
+        type=int,
+        default=100,
+        help="Number of output samples drawn in model_inference",
+    )
+    parser.add_argument(
+        "--repeats",
+        type=int,
+        default=3,
+        help="Number of timed repeats per stage",
+    )
+    parser.add_argument(
+        "--output_dir",
+        type=str,
+        default="benchmarks",
+        help="Directory the results are saved in, as <commit>.json",
+    )
+    parser.add_argument(
+        "--compare_to",
+        type=str,
+        default=None,
+        help="Path of an earlier results file to check for regressions",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Relative slowdown reported as a regression",
+    )
+
+    args = parser.parse_args()
+
+    results = run_benchmarks(
+        tiers=args.tiers,
+        hidden_units=args.hidden_units,
+        num_epochs=args.num_epochs,
+        num_batches=args.num_batches,
+        num_samples=args.num_samples,
+        repeats=args.repeats,
+    )
+    path = save_results(results, args.output_dir)
+    logger.info(f"Saved benchmark results to {path}")
+
+    if args.compare_to is not None:
+        with open(args.compare_to, "r") as f:
+            baseline = json.load(f)
+        comparison = compare_results(baseline, results, args.threshold)
+        logger.info(
+            f"Benchmark comparison:\n{comparison.to_string(index=False)}"
+        )
+        regressions = comparison[comparison["status"] == "regression"]
+        if len(regressions):
+            logger.warning(
+                f"{len(regressions)} stages regressed against "
+                f"{baseline['commit']}"
+            )
+        unmatched = comparison[comparison["status"].isin(["new", "missing"])]
+        if len(unmatched):
+            logger.info(
+                f"{len(unmatched)} stages have no timing to compare against "
+                f"{baseline['commit']}"
+            )
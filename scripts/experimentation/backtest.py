@@ -0,0 +1,150 @@
+import argparse
+
+from loguru import logger
+
+from src.backtesting import run_backtest
+from src.storage import load_table
+from src.sweep import grid_search
+
+
+def parse_hidden_units(value: str):
+    if value.lower() == "none":
+        return None
+    return [int(units) for units in value.split()]
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--experiment_name",
+        type=str,
+        default="walk-forward-backtest",
+        help="The experiment to attribute the runs to",
+    )
+    parser.add_argument(
+        "--data_path",
+        type=str,
+        default="data/model_data.csv",
+        help="Path of a csv or parquet covering every season, with "
+        + "bookies_prob",
+    )
+    parser.add_argument(
+        "--season_range",
+        nargs=2,
+        type=str,
+        default=None,
+        help="First and last season to load, e.g. 15_16 22_23",
+    )
+    parser.add_argument(
+        "--cache_dir",
+        type=str,
+        default="data/backtest_folds",
+        help="Directory the prepared fold data is cached in",
+    )
+    parser.add_argument(
+        "--backtest_id",
+        type=str,
+        default="backtest",
+        help="Identifier used to tag the fold and aggregate runs",
+    )
+    parser.add_argument(
+        "--min_train_seasons",
+        type=int,
+        default=3,
+        help="Number of seasons in the first training window",
+    )
+    parser.add_argument(
+        "--window",
+        type=str,
+        default="expanding",
+        choices=["expanding", "sliding"],
+        help="Whether the training window grows or slides forward",
+    )
+    parser.add_argument(
+        "--window_size",
+        type=int,
+        default=None,
+        help="Seasons in a sliding window, defaults to min_train_seasons",
+    )
+    parser.add_argument(
+        "--hidden_units_grid",
+        nargs="+",
+        type=parse_hidden_units,
+        default=[None],
+        help="Hidden layer structures to try, e.g. 'none' '8' '8 8'",
+    )
+    parser.add_argument(
+        "--learning_rate_grid",
+        nargs="+",
+        type=float,
+        default=[0.001],
+        help="Learning rates to try",
+    )
+    parser.add_argument(
+        "--num_epochs_grid",
+        nargs="+",
+        type=int,
+        default=[100],
+        help="Numbers of epochs to try",
+    )
+    parser.add_argument(
+        "--num_samples",
+        type=int,
+        default=100,
+        help="Number of forward passes when generating output distributions",
+    )
+    parser.add_argument(
+        "--num_workers",
+        type=int,
+        default=4,
+        help="Number of worker processes",
+    )
+    parser.add_argument(
+        "--threads_per_worker",
+        type=int,
+        default=1,
+        help="TensorFlow intra-op threads per worker",
+    )
+    parser.add_argument(
+        "--league_tag",
+        type=str,
+        default=None,
+        help="The league intended for the model",
+    )
+    parser.add_argument(
+        "--tracking_uri",
+        type=str,
+        default=None,
+        help="MLflow tracking URI, defaults to $MLFLOW_TRACKING_URI or "
+        + "http://localhost:5001",
+    )
+
+    args = parser.parse_args()
+
+    configs = grid_search(
+        {
+            "hidden_units": args.hidden_units_grid,
+            "learning_rate": args.learning_rate_grid,
+            "num_epochs": args.num_epochs_grid,
+        }
+    )
+
+    results = run_backtest(
+        args.experiment_name,
+        load_table(args.data_path, season_range=args.season_range),
+        configs,
+        args.cache_dir,
+        min_train_seasons=args.min_train_seasons,
+        window=args.window,
+        window_size=args.window_size,
+        num_workers=args.num_workers,
+        threads_per_worker=args.threads_per_worker,
+        backtest_id=args.backtest_id,
+        num_samples=args.num_samples,
+        league_tag=args.league_tag,
+        batched_inference=True,
+        tracking_uri=args.tracking_uri,
+    )
+    logger.info(f"Backtest results:\n{results.to_string()}")
@@ -1,6 +1,6 @@
-import pandas as pd
 import argparse
-from src.experimentation import run_experiment
+from src.experimentation import run_ensemble_experiment, run_experiment
+from src.storage import load_table
 
 if __name__ == "__main__":
 
@@ -72,23 +72,240 @@ if __name__ == "__main__":
         default=None,
         help="The league intended for the model",
     )
+    parser.add_argument(
+        "--batched_inference",
+        action="store_true",
+        help="Draw all output samples in one batched graph",
+    )
+    parser.add_argument(
+        "--posterior",
+        type=str,
+        default="std_normal",
+        choices=["std_normal", "mean_field", "low_rank"],
+        help="Family of the variational posterior",
+    )
+    parser.add_argument(
+        "--posterior_rank",
+        type=int,
+        default=2,
+        help="Rank of the low_rank posterior covariance factor",
+    )
+    parser.add_argument(
+        "--prior_scale",
+        type=float,
+        default=1.0,
+        help="Standard deviation of the normal weight prior",
+    )
+    parser.add_argument(
+        "--kl_use_exact",
+        action="store_true",
+        help="Use the closed-form KL divergence instead of a sampled one",
+    )
+    parser.add_argument(
+        "--layer_type",
+        type=str,
+        default="dense_variational",
+        choices=["dense_variational", "flipout", "local_reparameterization"],
+        help="Variational layer used for the hidden and output layers; "
+        + "flipout and local_reparameterization need --posterior mean_field",
+    )
+    parser.add_argument(
+        "--weight_bank_path",
+        type=str,
+        default=None,
+        help="Directory to export posterior weight samples to for the "
+        + "NumPy predictor",
+    )
+    parser.add_argument(
+        "--shuffle_buffer_size",
+        type=int,
+        default=None,
+        help="Shuffle buffer size, defaults to the number of training rows",
+    )
+    parser.add_argument(
+        "--no_reshuffle",
+        action="store_true",
+        help="Keep the same shuffle order for every epoch",
+    )
+    parser.add_argument(
+        "--no_prefetch",
+        action="store_true",
+        help="Disable prefetching in the input pipeline",
+    )
+    parser.add_argument(
+        "--shard_by",
+        type=str,
+        default=None,
+        help="Column to split the training data into interleaved shards, "
+        + "e.g. season",
+    )
+    parser.add_argument(
+        "--log_pipeline_timing",
+        action="store_true",
+        help="Log per-epoch input pipeline and train step times; the "
+        + "input time drains the training pipeline once more per epoch",
+    )
+    parser.add_argument(
+        "--packed_inputs",
+        action="store_true",
+        help="Feed the features as one (N, F) matrix instead of a dict",
+    )
+    parser.add_argument(
+        "--jit_compile",
+        action="store_true",
+        help="XLA-compile the training step and the sampling forward pass",
+    )
+    parser.add_argument(
+        "--early_stopping",
+        action="store_true",
+        help="Stop once the ELBO and holdout Brier score stop improving",
+    )
+    parser.add_argument(
+        "--early_stopping_window",
+        type=int,
+        default=10,
+        help="Number of epochs each smoothed value is averaged over",
+    )
+    parser.add_argument(
+        "--early_stopping_tolerance",
+        type=float,
+        default=1e-3,
+        help="Relative improvement between windows below which to stop",
+    )
+    parser.add_argument(
+        "--early_stopping_holdout",
+        type=float,
+        default=0.1,
+        help="Fraction of training rows held out to score the posterior",
+    )
+    parser.add_argument(
+        "--models_dir",
+        type=str,
+        default=None,
+        help="Directory to save the fitted posterior to as a new version",
+    )
+    parser.add_argument(
+        "--model_name",
+        type=str,
+        default=None,
+        help="Name to version the model under, defaults to the experiment",
+    )
+    parser.add_argument(
+        "--num_bootstrap_replicates",
+        type=int,
+        default=2000,
+        help="Bootstrap resamples for the validation confidence intervals",
+    )
+    parser.add_argument(
+        "--samples_path",
+        type=str,
+        default=None,
+        help="Save the full (samples, fixtures) validation array to this "
+        + ".npy path instead of streaming summary statistics",
+    )
+    parser.add_argument(
+        "--tracking_uri",
+        type=str,
+        default=None,
+        help="MLflow tracking URI, defaults to $MLFLOW_TRACKING_URI or "
+        + "http://localhost:5001",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Record time and memory per pipeline stage and attach a JSON "
+        + "report to the run",
+    )
+    parser.add_argument(
+        "--profile_stage",
+        type=str,
+        default=None,
+        help="Stage to capture with cProfile, e.g. fit or val_inference",
+    )
+    parser.add_argument(
+        "--profile_dir",
+        type=str,
+        default="profiles",
+        help="Directory for profiling reports and captures",
+    )
+    parser.add_argument(
+        "--num_replicas",
+        type=int,
+        default=1,
+        help="Train this many independent replicas in one vectorized model",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Global TensorFlow seed for an ensemble run",
+    )
 
     args = parser.parse_args()
 
-    training_data = pd.read_csv(args.training_data_path)
-    validation_data = pd.read_csv(args.validation_data_path)
+    training_data = load_table(args.training_data_path)
+    validation_data = load_table(args.validation_data_path)
 
-    run_experiment(
-        args.experiment_name,
-        training_data,
-        validation_data,
-        args.hidden_units,
-        args.learning_rate,
-        args.num_epochs,
-        args.num_samples,
-        args.num_batches,
-        args.league_tag,
-        args.run_id,
-        args.run_description,
-        return_model=False,
-    )
+    if args.num_replicas > 1:
+        run_ensemble_experiment(
+            args.experiment_name,
+            training_data,
+            validation_data,
+            num_replicas=args.num_replicas,
+            hidden_units=args.hidden_units,
+            learning_rate=args.learning_rate,
+            num_epochs=args.num_epochs,
+            num_samples=args.num_samples,
+            num_batches=args.num_batches,
+            league_tag=args.league_tag,
+            run_id=args.run_id,
+            run_description=args.run_description,
+            posterior=args.posterior,
+            posterior_rank=args.posterior_rank,
+            prior_scale=args.prior_scale,
+            kl_use_exact=args.kl_use_exact,
+            packed_inputs=args.packed_inputs,
+            seed=args.seed,
+            tracking_uri=args.tracking_uri,
+        )
+    else:
+        run_experiment(
+            args.experiment_name,
+            training_data,
+            validation_data,
+            args.hidden_units,
+            args.learning_rate,
+            args.num_epochs,
+            args.num_samples,
+            args.num_batches,
+            args.league_tag,
+            args.run_id,
+            args.run_description,
+            return_model=False,
+            batched_inference=args.batched_inference,
+            posterior=args.posterior,
+            posterior_rank=args.posterior_rank,
+            prior_scale=args.prior_scale,
+            kl_use_exact=args.kl_use_exact,
+            layer_type=args.layer_type,
+            weight_bank_path=args.weight_bank_path,
+            shuffle_buffer_size=args.shuffle_buffer_size,
+            reshuffle_each_iteration=not args.no_reshuffle,
+            prefetch=not args.no_prefetch,
+            shard_by=args.shard_by,
+            log_pipeline_timing=args.log_pipeline_timing,
+            packed_inputs=args.packed_inputs,
+            jit_compile=args.jit_compile,
+            early_stopping=args.early_stopping,
+            early_stopping_window=args.early_stopping_window,
+            early_stopping_tolerance=args.early_stopping_tolerance,
+            early_stopping_holdout=args.early_stopping_holdout,
+            models_dir=args.models_dir,
+            model_name=args.model_name,
+            num_bootstrap_replicates=args.num_bootstrap_replicates,
+            samples_path=args.samples_path,
+            tracking_uri=args.tracking_uri,
+            profile=args.profile,
+            profile_stage=args.profile_stage,
+            profile_dir=args.profile_dir,
+        )
@@ -0,0 +1,99 @@
+import argparse
+import json
+import time
+
+from loguru import logger
+
+from src.bayesian_nn import (
+    extract_features_and_target,
+    model_inference,
+    model_moments,
+    moment_drift,
+)
+from src.experimentation import fit_bnn_model
+from src.storage import load_table
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--training_data_path",
+        type=str,
+        default="data/train_data.csv",
+        help="Path of training data csv",
+    )
+    parser.add_argument(
+        "--validation_data_path",
+        type=str,
+        default="data/val_data.csv",
+        help="Path of validation data csv",
+    )
+    parser.add_argument(
+        "--hidden_units",
+        nargs="+",
+        type=int,
+        default=None,
+        help="Structure of hidden layer as a list, e.g., 8 or 8 16",
+    )
+    parser.add_argument(
+        "--learning_rate", type=float, default=0.001, help="Learning rate"
+    )
+    parser.add_argument(
+        "--num_epochs", type=int, default=100, help="Number of epochs"
+    )
+    parser.add_argument(
+        "--num_samples",
+        type=int,
+        default=1000,
+        help="Number of Monte Carlo samples to compare against",
+    )
+    parser.add_argument(
+        "--output_path",
+        type=str,
+        default=None,
+        help="Optional path to save the drift report as json",
+    )
+
+    args = parser.parse_args()
+
+    train_data = load_table(args.training_data_path).drop(columns="season")
+    val_data = load_table(args.validation_data_path).drop(
+        columns=["season", "bookies_prob"]
+    )
+
+    feature_names = [col for col in train_data.columns if col != "h_win"]
+    X_train, y_train = extract_features_and_target(
+        train_data, feature_names, "h_win"
+    )
+    X_val, _ = extract_features_and_target(val_data, feature_names, "h_win")
+
+    model = fit_bnn_model(
+        X_train,
+        y_train,
+        feature_names,
+        hidden_units=args.hidden_units,
+        learning_rate=args.learning_rate,
+        num_epochs=args.num_epochs,
+    )
+
+    start = time.perf_counter()
+    sampled_probs = model_inference(
+        model, X_val, args.num_samples, tag="validation", batched=True
+    )
+    sampling_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    moment_mean, moment_variance = model_moments(model, X_val)
+    moment_seconds = time.perf_counter() - start
+
+    report = moment_drift(sampled_probs, moment_mean, moment_variance)
+    report["sampling_seconds"] = sampling_seconds
+    report["moment_seconds"] = moment_seconds
+
+    for key, value in report.items():
+        logger.info(f"{key}: {value:.5f}")
+
+    if args.output_path is not None:
+        with open(args.output_path, "w") as f:
+            json.dump(report, f, indent=4)
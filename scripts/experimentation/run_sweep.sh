@@ -0,0 +1,21 @@
+#!/bin/bash
+
+# This file is intended as a quick means of running sweep.py
+# This file can be editted and ran using `bash scripts/experimentation/run_sweep.sh`
+# Please do not push any changes to this file 
+
+poetry run python scripts/experimentation/sweep.py \
+    --experiment_name 'general-experiment' \
+    --training_data_path 'data/train_data.csv' \
+    --validation_data_path 'data/val_data.csv' \
+    --sweep_dir 'data/sweeps/general-sweep' \
+    --search 'grid' \
+    --hidden_units_grid 'none' '8' '8 8' \
+    --learning_rate_grid 0.001 0.01 \
+    --num_epochs_grid 100 \
+    --num_batches_grid 1 4 \
+    --posterior_grid 'std_normal' 'mean_field' \
+    --num_samples 100 \
+    --num_workers 4 \
+    --threads_per_worker 1 \
+    --league_tag 'epl'
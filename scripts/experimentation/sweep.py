@@ -0,0 +1,151 @@
+import argparse
+
+from src.storage import load_table
+from src.sweep import grid_search, random_search, run_sweep
+
+
+def parse_hidden_units(value: str):
+    if value.lower() == "none":
+        return None
+    return [int(units) for units in value.split()]
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--experiment_name",
+        type=str,
+        default="general-experiment",
+        help="The experiment to attribute the runs to",
+    )
+    parser.add_argument(
+        "--training_data_path",
+        type=str,
+        default="data/train_data.csv",
+        help="Path of training data csv",
+    )
+    parser.add_argument(
+        "--validation_data_path",
+        type=str,
+        default="data/val_data.csv",
+        help="Path of validation data csv",
+    )
+    parser.add_argument(
+        "--sweep_dir",
+        type=str,
+        default="data/sweeps/general-sweep",
+        help="Directory holding the shared data and progress of the sweep",
+    )
+    parser.add_argument(
+        "--search",
+        type=str,
+        default="grid",
+        choices=["grid", "random"],
+        help="Whether to run every combination or a random subset",
+    )
+    parser.add_argument(
+        "--num_trials",
+        type=int,
+        default=20,
+        help="Number of trials for a random search",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="Seed for a random search"
+    )
+    parser.add_argument(
+        "--hidden_units_grid",
+        nargs="+",
+        type=parse_hidden_units,
+        default=[None],
+        help="Hidden layer structures to try, e.g. 'none' '8' '8 8'",
+    )
+    parser.add_argument(
+        "--learning_rate_grid",
+        nargs="+",
+        type=float,
+        default=[0.001],
+        help="Learning rates to try",
+    )
+    parser.add_argument(
+        "--num_epochs_grid",
+        nargs="+",
+        type=int,
+        default=[100],
+        help="Numbers of epochs to try",
+    )
+    parser.add_argument(
+        "--num_batches_grid",
+        nargs="+",
+        type=int,
+        default=[1],
+        help="Numbers of batches to try",
+    )
+    parser.add_argument(
+        "--posterior_grid",
+        nargs="+",
+        type=str,
+        default=["std_normal"],
+        help="Posterior families to try",
+    )
+    parser.add_argument(
+        "--num_samples",
+        type=int,
+        default=100,
+        help="Number of forward passes when generating output distributions",
+    )
+    parser.add_argument(
+        "--num_workers",
+        type=int,
+        default=4,
+        help="Number of worker processes",
+    )
+    parser.add_argument(
+        "--threads_per_worker",
+        type=int,
+        default=1,
+        help="TensorFlow intra-op threads per worker",
+    )
+    parser.add_argument(
+        "--league_tag",
+        type=str,
+        default=None,
+        help="The league intended for the model",
+    )
+    parser.add_argument(
+        "--tracking_uri",
+        type=str,
+        default=None,
+        help="MLflow tracking URI, defaults to $MLFLOW_TRACKING_URI or "
+        + "http://localhost:5001",
+    )
+
+    args = parser.parse_args()
+
+    space = {
+        "hidden_units": args.hidden_units_grid,
+        "learning_rate": args.learning_rate_grid,
+        "num_epochs": args.num_epochs_grid,
+        "num_batches": args.num_batches_grid,
+        "posterior": args.posterior_grid,
+    }
+    if args.search == "grid":
+        trials = grid_search(space)
+    else:
+        trials = random_search(space, args.num_trials, seed=args.seed)
+
+    run_sweep(
+        args.experiment_name,
+        load_table(args.training_data_path),
+        load_table(args.validation_data_path),
+        trials,
+        args.sweep_dir,
+        num_workers=args.num_workers,
+        threads_per_worker=args.threads_per_worker,
+        num_samples=args.num_samples,
+        league_tag=args.league_tag,
+        run_description=f"{args.search} sweep in {args.sweep_dir}",
+        batched_inference=True,
+        tracking_uri=args.tracking_uri,
+    )
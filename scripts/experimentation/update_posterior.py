@@ -0,0 +1,144 @@
+import argparse
+import json
+import time
+
+import numpy as np
+from loguru import logger
+from sklearn.metrics import brier_score_loss, roc_auc_score
+
+from src.bayesian_nn import (
+    extract_feature_matrix,
+    extract_features_and_target,
+    model_inference,
+)
+from src.experimentation import fit_bnn_model
+from src.online_update import update_posterior
+from src.storage import load_table
+
+
+def validation_metrics(model, X_val, y_val, num_samples):
+    mean_probs = np.mean(
+        model_inference(
+            model, X_val, num_samples, tag="validation", batched=True
+        ),
+        axis=0,
+    )
+    return {
+        "val_mse": brier_score_loss(y_val, mean_probs),
+        "val_auc": roc_auc_score(y_val, mean_probs),
+    }
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--models_dir",
+        type=str,
+        default="models",
+        help="Directory holding the saved model versions",
+    )
+    parser.add_argument(
+        "--model_name",
+        type=str,
+        required=True,
+        help="Name of the model to update",
+    )
+    parser.add_argument(
+        "--new_data_path",
+        type=str,
+        required=True,
+        help="Path of a csv of the newly arrived fixtures",
+    )
+    parser.add_argument(
+        "--validation_data_path",
+        type=str,
+        default="data/val_data.csv",
+        help="Path of validation data csv",
+    )
+    parser.add_argument(
+        "--full_training_data_path",
+        type=str,
+        default=None,
+        help="Optional csv of all training fixtures, including the new "
+        + "ones, to compare the update against a full retrain",
+    )
+    parser.add_argument(
+        "--num_epochs",
+        type=int,
+        default=10,
+        help="Number of epochs to train on the new fixtures",
+    )
+    parser.add_argument(
+        "--retrain_epochs",
+        type=int,
+        default=100,
+        help="Number of epochs for the full retrain",
+    )
+    parser.add_argument(
+        "--learning_rate", type=float, default=0.001, help="Learning rate"
+    )
+    parser.add_argument(
+        "--num_samples",
+        type=int,
+        default=100,
+        help="Number of forward passes when generating output distributions",
+    )
+
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    model, version_path = update_posterior(
+        args.models_dir,
+        args.model_name,
+        load_table(args.new_data_path),
+        num_epochs=args.num_epochs,
+        learning_rate=args.learning_rate,
+    )
+    update_seconds = time.perf_counter() - start
+
+    with open(version_path / "config.json", "r") as f:
+        config = json.load(f)
+    extract = (
+        extract_feature_matrix
+        if config["packed_inputs"]
+        else extract_features_and_target
+    )
+
+    val_data = load_table(args.validation_data_path)
+    X_val, y_val = extract(val_data, config["feature_names"], "h_win")
+
+    report = {
+        "updated": {
+            **validation_metrics(model, X_val, y_val, args.num_samples),
+            "seconds": update_seconds,
+        }
+    }
+
+    if args.full_training_data_path is not None:
+        full_data = load_table(args.full_training_data_path)
+        X_full, y_full = extract(full_data, config["feature_names"], "h_win")
+
+        start = time.perf_counter()
+        retrained_model = fit_bnn_model(
+            X_full,
+            y_full,
+            config["feature_names"],
+            hidden_units=config["hidden_units"],
+            learning_rate=args.learning_rate,
+            num_epochs=args.retrain_epochs,
+            posterior=config["posterior"],
+            posterior_rank=config["posterior_rank"],
+            prior_scale=config["prior_scale"],
+            kl_use_exact=config["kl_use_exact"],
+            layer_type=config["layer_type"],
+        )
+        report["retrained"] = {
+            **validation_metrics(
+                retrained_model, X_val, y_val, args.num_samples
+            ),
+            "seconds": time.perf_counter() - start,
+        }
+
+    logger.info(f"{version_path}: {json.dumps(report, indent=4)}")
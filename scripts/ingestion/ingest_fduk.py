@@ -1,6 +1,14 @@
 import argparse
+import json
 
-from src.ingestion import get_data_fduk
+from src.incremental import affected_teams, ingest_fduk_incremental
+from src.ingestion import FDUK_BASE_URL, get_data_fduk
+from src.profiling import Profiler, set_profiler
+from src.storage import (
+    PARTITION_COLUMNS,
+    apply_fduk_dtypes,
+    write_partitioned,
+)
 
 LEAGUES = ["E0"]
 
@@ -52,13 +60,175 @@ if __name__ == "__main__":
         help="Whether or not to add game numbers and season halves as columns for home and away team",
     )
 
+    parser.add_argument(
+        "--format",
+        type=str,
+        default="parquet",
+        choices=["parquet", "csv"],
+        help="Write a parquet store partitioned by league and season under "
+        + "data/<save_filename>, or a single csv",
+    )
+
+    parser.add_argument(
+        "--max_workers",
+        type=int,
+        default=8,
+        help="Number of concurrent downloads",
+    )
+
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=3,
+        help="Retries with backoff for transient download failures",
+    )
+
+    parser.add_argument(
+        "--base_url",
+        type=str,
+        default=FDUK_BASE_URL,
+        help="Base URL the season CSVs are fetched from",
+    )
+
+    parser.add_argument(
+        "--cache_dir",
+        type=str,
+        default="data/http_cache",
+        help="Directory of the local HTTP cache of season CSVs",
+    )
+
+    parser.add_argument(
+        "--no_cache",
+        action="store_true",
+        help="Download every season without using the local cache",
+    )
+
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Only read season CSVs from the local cache",
+    )
+
+    parser.add_argument(
+        "--max_cache_mb",
+        type=float,
+        default=None,
+        help="Evict least recently used CSVs beyond this cache size",
+    )
+
+    parser.add_argument(
+        "--summary_path",
+        type=str,
+        default=None,
+        help="Write a JSON summary of loaded and failed partitions here",
+    )
+
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only fetch partitions that may have changed since the last "
+        + "run and upsert them into the parquet store",
+    )
+
+    parser.add_argument(
+        "--changes_path",
+        type=str,
+        default=None,
+        help="Write a JSON report of inserted and updated fixtures here",
+    )
+
+    parser.add_argument(
+        "--profile_path",
+        type=str,
+        default=None,
+        help="Write a JSON report of time and memory per stage to this path",
+    )
+
+    parser.add_argument(
+        "--profile_stage",
+        type=str,
+        default=None,
+        help="Stage to capture with cProfile, e.g. download or enrich",
+    )
+
     args = parser.parse_args()
 
-    data = get_data_fduk(
-        range(args.start_year, args.end_year),
-        args.leagues,
-        args.columns,
-        args.enrich,
+    if args.profile_path is not None:
+        profiler = Profiler(profile_stage=args.profile_stage)
+        set_profiler(profiler)
+
+    columns = args.columns
+    if args.format == "parquet" and columns is not None:
+        columns = [
+            col for col in PARTITION_COLUMNS if col not in columns
+        ] + columns
+
+    cache_dir = None if args.no_cache else args.cache_dir
+    max_cache_bytes = (
+        None if args.max_cache_mb is None else int(args.max_cache_mb * 2**20)
     )
 
-    data.to_csv(f"data/{args.save_filename}.csv")
+    if args.incremental:
+        if args.format != "parquet":
+            parser.error("--incremental needs --format parquet")
+
+        changes, summary = ingest_fduk_incremental(
+            f"data/{args.save_filename}",
+            range(args.start_year, args.end_year),
+            args.leagues,
+            columns,
+            enrich=args.enrich,
+            max_workers=args.max_workers,
+            retries=args.retries,
+            base_url=args.base_url,
+            cache_dir=cache_dir,
+            offline=args.offline,
+            max_cache_bytes=max_cache_bytes,
+        )
+
+        if args.changes_path is not None:
+            report = {
+                "changes": json.loads(
+                    changes.to_json(orient="records", date_format="iso")
+                ),
+                "affected_teams": [
+                    {
+                        "division": division,
+                        "season": season,
+                        "teams": sorted(teams),
+                    }
+                    for (division, season), teams in affected_teams(
+                        changes
+                    ).items()
+                ],
+            }
+            with open(args.changes_path, "w") as f:
+                json.dump(report, f, indent=2)
+    else:
+        data, summary = get_data_fduk(
+            range(args.start_year, args.end_year),
+            args.leagues,
+            columns,
+            args.enrich,
+            max_workers=args.max_workers,
+            retries=args.retries,
+            base_url=args.base_url,
+            return_summary=True,
+            cache_dir=cache_dir,
+            offline=args.offline,
+            max_cache_bytes=max_cache_bytes,
+        )
+
+        if args.format == "parquet":
+            write_partitioned(
+                apply_fduk_dtypes(data), f"data/{args.save_filename}"
+            )
+        else:
+            data.to_csv(f"data/{args.save_filename}.csv", index=False)
+
+    if args.summary_path is not None:
+        with open(args.summary_path, "w") as f:
+            json.dump(summary.to_dict(), f, indent=2)
+
+    if args.profile_path is not None:
+        profiler.save(args.profile_path)
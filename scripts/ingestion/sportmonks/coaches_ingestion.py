@@ -1,71 +1,63 @@
 import calendar
-import json
-import os
 import re
 import time
 from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List
 
 import pandas as pd
-import requests
-from loguru import logger
 
-from scripts.ingestion.sportmonks.config import BASE_URL, HEADERS, SAVE_LOCATION
+from scripts.ingestion.sportmonks.config import BASE_URL
+from scripts.ingestion.sportmonks.pagination import (
+    iter_pages,
+    ndjson_path,
+    stream_pages,
+)
 
 
-def get_all_coaches_populate():
-    all_coaches = []
-    page = 1
+def iter_coaches_populate(start_page: int = 1) -> Iterator[List[Dict]]:
+    return iter_pages(
+        f"{BASE_URL}/coaches?filters=populate",
+        per_page=1000,
+        start_page=start_page,
+    )
 
-    while True:
-        endpoint_url = (
-            f"{BASE_URL}/coaches?filters=populate&page={page}&per_page=1000"
-        )
-        response = requests.get(endpoint_url, headers=HEADERS)
 
-        if response.status_code == 200:
-            coaches = response.json()
-            coaches = coaches.get("data", [])
-
-            if not coaches:
-                break
-
-            all_coaches.extend(coaches)
-
-            logger.info(f"Page {page} retrieved with {len(coaches)}.")
-            page += 1
-
-    os.makedirs(f"{SAVE_LOCATION}", exist_ok=True)
-    with open(f"{SAVE_LOCATION}all_coaches.json", "w") as f:
-        json.dump(all_coaches, f)
-
-
-def get_all_coaches_with_statistics():
+def iter_coaches_with_statistics(
+    start_page: int = 1,
+) -> Iterator[List[Dict]]:
     include = "country;teams;statistics;nationality;trophies;player"
-
-    all_coaches = []
-    page = 1
-
-    while True:
-        endpoint_url = (
-            f"{BASE_URL}/coaches?include={include}&page={page}&per_page=50"
-        )
-        response = requests.get(endpoint_url, headers=HEADERS)
-
-        if response.status_code == 200:
-            coaches = response.json()
-            coaches = coaches.get("data", [])
-
-            if not coaches:
-                break
-
-            all_coaches.extend(coaches)
-
-            logger.info(f"Page {page} retrieved with {len(coaches)}.")
-            page += 1
-
-    os.makedirs(f"{SAVE_LOCATION}", exist_ok=True)
-    with open(f"{SAVE_LOCATION}all_coaches_with_stats.json", "w") as f:
-        json.dump(all_coaches, f)
+    return iter_pages(
+        f"{BASE_URL}/coaches?include={include}",
+        per_page=50,
+        start_page=start_page,
+    )
+
+
+def get_all_coaches_populate(
+    compress: bool = False, start_page: int = 1
+) -> Path:
+    path = ndjson_path("all_coaches", compress)
+    stream_pages(
+        iter_coaches_populate(start_page),
+        path,
+        compress=compress,
+        append=start_page > 1,
+    )
+    return path
+
+
+def get_all_coaches_with_statistics(
+    compress: bool = False, start_page: int = 1
+) -> Path:
+    path = ndjson_path("all_coaches_with_stats", compress)
+    stream_pages(
+        iter_coaches_with_statistics(start_page),
+        path,
+        compress=compress,
+        append=start_page > 1,
+    )
+    return path
 
 
 if __name__ == "__main__":
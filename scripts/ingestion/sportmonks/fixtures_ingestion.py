@@ -1,87 +1,108 @@
 import calendar
-import json
 import os
 import re
+import shutil
 import time
 from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List
 
 import pandas as pd
 import requests
 from loguru import logger
 
-from scripts.ingestion.sportmonks.config import BASE_URL, HEADERS, SAVE_LOCATION
+from scripts.ingestion.sportmonks.config import BASE_URL, SAVE_LOCATION
 from scripts.ingestion.sportmonks.league_codes_ingestion import get_leagues
+from scripts.ingestion.sportmonks.pagination import (
+    iter_pages,
+    ndjson_path,
+    stream_pages,
+)
+from src.http_session import make_session
 
 
-def get_fixtures_from_period(league_id, start_date, end_date):
-    fixtures = []
-    current_year = datetime.now().year
-
+def iter_fixtures_from_period(
+    league_id, start_date, end_date, session: requests.Session = None
+) -> Iterator[List[Dict]]:
     filters = f"fixtureLeagues:{league_id}"
     include = "  participants;round;stage;group;league;season;venue;state;weatherReport;lineups;coaches;periods;participants;statistics;metadata;formations;sidelined;scores"
     endpoint = f"/fixtures/between/{start_date}/{end_date}"
 
-    page = 1
-    while True:
-        endpoint_url = f"{BASE_URL}{endpoint}?filters={filters}&include={include}&page={page}&per_page=50"
-        response = requests.get(endpoint_url, headers=HEADERS)
-
-        if response.status_code == 200:
-            data = response.json()
-            fixtures_by_page = data.get("data", [])
+    return iter_pages(
+        f"{BASE_URL}{endpoint}?filters={filters}&include={include}",
+        per_page=50,
+        session=session,
+    )
 
-            if not fixtures_by_page:
-                break
-
-            fixtures.extend(fixtures_by_page)
-            page += 1
-        else:
-            logger.error(
-                f"Failed to retrieve data. Status code:", response.status_code
-            )
-            break
 
-    return fixtures
+def get_fixtures_from_period(
+    league_id, start_date, end_date, session: requests.Session = None
+) -> List[Dict]:
+    return [
+        fixture
+        for fixtures in iter_fixtures_from_period(
+            league_id, start_date, end_date, session=session
+        )
+        for fixture in fixtures
+    ]
 
 
-def get_all_fixtures_by_league(league_id):
-    fixtures = []
+def iter_fixtures_by_league(
+    league_id, start_year: int = 2000
+) -> Iterator[List[Dict]]:
     current_year = datetime.now().year
+    session = make_session(pool_size=1)
 
-    for year in range(2000, current_year + 1):
+    for year in range(start_year, current_year + 1):
         for month in range(1, 13):
             start_date = f"{year}-{str(month).zfill(2)}-01"
             last_day = calendar.monthrange(year, month)[1]
             end_date = f"{year}-{str(month).zfill(2)}-{last_day}"
 
-            fixtures_by_period = get_fixtures_from_period(
-                league_id, start_date, end_date
-            )
+            num_fixtures = 0
+            for fixtures in iter_fixtures_from_period(
+                league_id, start_date, end_date, session=session
+            ):
+                num_fixtures += len(fixtures)
+                yield fixtures
+
             logger.info(
-                f"Ingested for league: {league_id} between {start_date} and {end_date} with {len(fixtures_by_period)} games"
+                f"Ingested for league: {league_id} between {start_date} and {end_date} with {num_fixtures} games"
             )
 
-            fixtures.extend(fixtures_by_period)
-
-    os.makedirs(f"{SAVE_LOCATION}fixtures", exist_ok=True)
-    with open(f"data/fixtures/{league_id}_fixtures.json", "w") as f:
-        json.dump(fixtures, f)
 
-    return fixtures
+def get_all_fixtures_by_league(
+    league_id, compress: bool = False, start_year: int = 2000
+) -> Path:
+    path = ndjson_path(f"fixtures/{league_id}_fixtures", compress)
+    stream_pages(
+        iter_fixtures_by_league(league_id, start_year),
+        path,
+        compress=compress,
+    )
+    return path
 
 
 def merge_fixtures_by_league(
     split_fixture_location=f"{SAVE_LOCATION}fixtures",
-):
-    all_fixtures = []
-    for fixtures_file in os.listdir(f"{SAVE_LOCATION}fixtures"):
-        with open(f"{SAVE_LOCATION}fixtures/{fixtures_file}", "r") as file:
-            fixtures = json.load(file)
-            all_fixtures.extend(fixtures)
-
-    os.makedirs(f"{SAVE_LOCATION}", exist_ok=True)
-    with open(f"{SAVE_LOCATION}all_fixtures.json", "w") as f:
-        json.dump(all_fixtures, f)
+    compress: bool = False,
+) -> Path:
+    suffix = ".jsonl.gz" if compress else ".jsonl"
+    path = ndjson_path("all_fixtures", compress)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # JSON lines and gzip members both stay valid when concatenated, so
+    # the league files are copied across in fixed-size chunks
+    with open(path, "wb") as f:
+        for fixtures_file in sorted(os.listdir(split_fixture_location)):
+            if not fixtures_file.endswith(suffix):
+                continue
+            with open(
+                f"{split_fixture_location}/{fixtures_file}", "rb"
+            ) as file:
+                shutil.copyfileobj(file, f)
+
+    return path
 
 
 def get_league_ids():
@@ -93,19 +114,14 @@ def get_league_ids():
     return league_ids
 
 
-def get_all_fixtures():
+def get_all_fixtures(compress: bool = False) -> Path:
     # This function breaks because of limits in the API requests
-    fixtures = []
-
     league_ids = get_league_ids()
     logger.info(f"League ids: {league_ids}")
     for league_id in league_ids:
-        fixtures_by_league = get_all_fixtures_by_league(league_id)
-        fixtures.extend(fixtures_by_league)
+        get_all_fixtures_by_league(league_id, compress=compress)
 
-    os.makedirs(f"{SAVE_LOCATION}", exist_ok=True)
-    with open(f"{SAVE_LOCATION}all_fixtures.json", "w") as f:
-        json.dump(fixtures, f)
+    return merge_fixtures_by_league(compress=compress)
 
 
 if __name__ == "__main__":
@@ -115,4 +131,4 @@ if __name__ == "__main__":
 
     # Manually feed in random IDs
     league_id = league_ids[0]
-    fixtures_by_league = get_all_fixtures_by_league(league_id)
+    get_all_fixtures_by_league(league_id)
@@ -0,0 +1,122 @@
+import gzip
+import json
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List
+
+import requests
+from loguru import logger
+
+from scripts.ingestion.sportmonks.config import HEADERS, SAVE_LOCATION
+from src.http_session import make_session
+
+
+def iter_pages(
+    endpoint_url: str,
+    per_page: int = 50,
+    start_page: int = 1,
+    session: requests.Session = None,
+) -> Iterator[List[Dict]]:
+    session = session or make_session(pool_size=1)
+    separator = "&" if "?" in endpoint_url else "?"
+
+    page = start_page
+    while True:
+        page_url = f"{endpoint_url}{separator}page={page}&per_page={per_page}"
+        try:
+            response = session.get(page_url, headers=HEADERS)
+        except requests.exceptions.RequestException as e:
+            # Retries are exhausted, e.g. a rate limit that outlasts the
+            # backoff, so this listing stops here and the caller carries on
+            # with the next one
+            logger.error(
+                f"Failed to retrieve page {page} of {endpoint_url}: {e}"
+            )
+            break
+
+        if response.status_code != 200:
+            logger.error(
+                f"Failed to retrieve page {page} of {endpoint_url}. "
+                f"Status code: {response.status_code}"
+            )
+            break
+
+        # Only one page is held at a time; the caller writes it out before
+        # the next one is requested
+        body = response.json()
+        records = body.get("data", [])
+        if not records:
+            break
+
+        logger.info(f"Page {page} retrieved with {len(records)}.")
+        yield records
+
+        if not body.get("pagination", {}).get("has_more", True):
+            break
+        page += 1
+
+
+def ndjson_path(name: str, compress: bool = False) -> Path:
+    return Path(SAVE_LOCATION) / (
+        f"{name}.jsonl.gz" if compress else f"{name}.jsonl"
+    )
+
+
+class NDJSONWriter:
+    def __init__(
+        self, path: str | Path, compress: bool = False, append: bool = False
+    ):
+        self.path = Path(path)
+        self.compress = compress
+        self.num_pages = 0
+        self.num_records = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "ab" if append else "wb")
+
+    def write_page(self, records: List[Dict]) -> None:
+        payload = "".join(json.dumps(record) + "\n" for record in records)
+        payload = payload.encode()
+        # Each page is its own gzip member, so everything written before a
+        # crash can still be read back
+        if self.compress:
+            payload = gzip.compress(payload)
+
+        self._file.write(payload)
+        self._file.flush()
+        self.num_pages += 1
+        self.num_records += len(records)
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "NDJSONWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def stream_pages(
+    pages: Iterable[List[Dict]],
+    path: str | Path,
+    compress: bool = False,
+    append: bool = False,
+) -> int:
+    with NDJSONWriter(path, compress=compress, append=append) as writer:
+        for records in pages:
+            writer.write_page(records)
+
+    logger.info(
+        f"Wrote {writer.num_records} records from {writer.num_pages} pages "
+        f"to {path}"
+    )
+    return writer.num_records
+
+
+def read_ndjson(path: str | Path) -> Iterator[Dict]:
+    path = Path(path)
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
@@ -1,72 +1,66 @@
 import calendar
-import json
-import os
 import re
 import time
 from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List
 
 import pandas as pd
-import requests
-from loguru import logger
 
-from scripts.ingestion.sportmonks.config import BASE_URL, HEADERS, SAVE_LOCATION
+from scripts.ingestion.sportmonks.config import BASE_URL
 from scripts.ingestion.sportmonks.league_codes_ingestion import get_leagues
-
-
-def get_all_players_populate():
-    all_players = []
-    page = 1
-
-    while True:
-        endpoint_url = (
-            f"{BASE_URL}/players?filters=populate&page={page}&per_page=1000"
-        )
-        response = requests.get(endpoint_url, headers=HEADERS)
-
-        if response.status_code == 200:
-            players = response.json()
-            players = players.get("data", [])
-
-            if not players:
-                break
-
-            all_players.extend(players)
-
-            logger.info(f"Page {page} retrieved with {len(players)}.")
-            page += 1
-
-    os.makedirs(f"{SAVE_LOCATION}", exist_ok=True)
-    with open(f"{SAVE_LOCATION}all_players.json", "w") as f:
-        json.dump(all_players, f)
-
-
-def get_all_players_with_statistics():
-    include = "country;city;nationality;transfers;pendingTransfers;teams;statistics;latest;position;detailedPosition;lineups;trophies;metadata "
-
-    all_players = []
-    page = 1
-
-    while True:
-        endpoint_url = endpoint_url = (
-            f"{BASE_URL}/players?include={include}&page={page}&per_page=50"
-        )
-        response = requests.get(endpoint_url, headers=HEADERS)
-
-        if response.status_code == 200:
-            players = response.json()
-            players = players.get("data", [])
-
-            if not players:
-                break
-
-            all_players.extend(players)
-
-            logger.info(f"Page {page} retrieved with {len(players)}.")
-            page += 1
-
-    os.makedirs(f"{SAVE_LOCATION}", exist_ok=True)
-    with open(f"{SAVE_LOCATION}/all_players_with_stats.json", "w") as f:
-        json.dump(all_players, f)
+from scripts.ingestion.sportmonks.pagination import (
+    iter_pages,
+    ndjson_path,
+    stream_pages,
+)
+
+
+def iter_players_populate(start_page: int = 1) -> Iterator[List[Dict]]:
+    return iter_pages(
+        f"{BASE_URL}/players?filters=populate",
+        per_page=1000,
+        start_page=start_page,
+    )
+
+
+def iter_players_with_statistics(
+    start_page: int = 1,
+) -> Iterator[List[Dict]]:
+    include = "country;city;nationality;transfers;pendingTransfers;teams;statistics;latest;position;detailedPosition;lineups;trophies;metadata"
+    return iter_pages(
+        f"{BASE_URL}/players?include={include}",
+        per_page=50,
+        start_page=start_page,
+    )
+
+
+def get_all_players_populate(
+    compress: bool = False, start_page: int = 1
+) -> Path:
+    path = ndjson_path("all_players", compress)
+    stream_pages(
+        iter_players_populate(start_page),
+        path,
+        compress=compress,
+        append=start_page > 1,
+    )
+    return path
+
+
+def get_all_players_with_statistics(
+    compress: bool = False, start_page: int = 1
+) -> Path:
+    # The include expansions make these pages large, so they go straight
+    # to disk rather than accumulating in memory
+    path = ndjson_path("all_players_with_stats", compress)
+    stream_pages(
+        iter_players_with_statistics(start_page),
+        path,
+        compress=compress,
+        append=start_page > 1,
+    )
+    return path
 
 
 if __name__ == "__main__":
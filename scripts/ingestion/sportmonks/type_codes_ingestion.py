@@ -1,34 +1,39 @@
 import calendar
-import json
+import os
 import re
 import time
 from datetime import datetime
+from typing import Dict, Iterator, List
 
 import pandas as pd
-import requests
 from loguru import logger
 
-from scripts.ingestion.sportmonks.config import BASE_URL, HEADERS, SAVE_LOCATION
+from scripts.ingestion.sportmonks.config import BASE_URL, SAVE_LOCATION
+from scripts.ingestion.sportmonks.pagination import (
+    iter_pages,
+    ndjson_path,
+    read_ndjson,
+    stream_pages,
+)
 
 
-def get_types():
-    logger.info("Getting type lookup codes")
-    all_types = []
+def iter_types(start_page: int = 1) -> Iterator[List[Dict]]:
+    return iter_pages(
+        "https://api.sportmonks.com/v3/core/types",
+        per_page=50,
+        start_page=start_page,
+    )
 
-    page = 1
-    while True:
-        endpoint_url = f"https://api.sportmonks.com/v3/core/types?&page={page}&per_page=50"
-        response = requests.get(endpoint_url, headers=HEADERS)
-        types = response.json()
-        types = types.get("data", [])
-        all_types.extend(types)
 
-        page += 1
+def get_types(compress: bool = False):
+    logger.info("Getting type lookup codes")
 
-        if not types:
-            break
+    path = ndjson_path("types_lookup", compress)
+    stream_pages(iter_types(), path, compress=compress)
 
-    all_types = pd.json_normalize(all_types)
+    # The lookup is a few thousand short records, so flattening it to csv
+    # in one go is cheap once the pages are on disk
+    all_types = pd.json_normalize(list(read_ndjson(path)))
 
     os.makedirs(f"{SAVE_LOCATION}", exist_ok=True)
     all_types.to_csv(f"{SAVE_LOCATION}/types_lookup.csv", index=False)
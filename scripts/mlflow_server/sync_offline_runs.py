@@ -0,0 +1,28 @@
+import argparse
+
+from loguru import logger
+
+from src.tracking import DEFAULT_OFFLINE_DIR, sync_offline_runs
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--tracking_uri",
+        type=str,
+        default=None,
+        help="MLflow tracking URI, defaults to $MLFLOW_TRACKING_URI or "
+        + "http://localhost:5001",
+    )
+    parser.add_argument(
+        "--offline_dir",
+        type=str,
+        default=DEFAULT_OFFLINE_DIR,
+        help="Directory runs were spooled to while the server was down",
+    )
+
+    args = parser.parse_args()
+
+    synced = sync_offline_runs(args.tracking_uri, args.offline_dir)
+    logger.info(f"Synced {synced} offline runs")
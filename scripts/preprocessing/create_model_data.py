@@ -0,0 +1,101 @@
+import argparse
+
+from loguru import logger
+
+from src.preprocess import create_dataframe, load_ingested_data
+
+# Identifiers and odds that are kept in the model data for backtesting but
+# are not model features
+NON_FEATURE_COLUMNS = [
+    "div",
+    "date",
+    "h_team",
+    "a_team",
+    "b365h",
+    "b365d",
+    "b365a",
+    "ftr",
+    "bookies_prob",
+]
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--data_path",
+        type=str,
+        default="data/ingested_fduk_data",
+        help="Parquet store or csv written by ingest_fduk.py, with the "
+        + "season halves from --enrich",
+    )
+    parser.add_argument(
+        "--leagues",
+        nargs="+",
+        type=str,
+        default=None,
+        help="Leagues to load, all of them by default",
+    )
+    parser.add_argument(
+        "--season_range",
+        nargs=2,
+        type=str,
+        default=None,
+        help="First and last season to load, e.g. 15_16 22_23",
+    )
+    parser.add_argument(
+        "--exclude_seasons",
+        nargs="+",
+        type=str,
+        default=None,
+        help="Seasons to leave out of the model data",
+    )
+    parser.add_argument(
+        "--save_path",
+        type=str,
+        default="data/model_data.csv",
+        help="Where to write the model data, as used by backtest.py",
+    )
+    parser.add_argument(
+        "--val_seasons",
+        nargs="+",
+        type=str,
+        default=None,
+        help="If given, also write training and validation features for "
+        + "experiment.py, validating on these seasons",
+    )
+    parser.add_argument(
+        "--training_data_path",
+        type=str,
+        default="data/train_data.csv",
+        help="Where to write the training features",
+    )
+    parser.add_argument(
+        "--validation_data_path",
+        type=str,
+        default="data/val_data.csv",
+        help="Where to write the validation features",
+    )
+
+    args = parser.parse_args()
+
+    data = create_dataframe(
+        load_ingested_data(
+            args.data_path,
+            leagues=args.leagues,
+            season_range=args.season_range,
+        ),
+        exclude_seasons=args.exclude_seasons,
+    )
+    data.to_csv(args.save_path, index=False)
+    logger.info(f"Wrote {len(data)} rows of model data to {args.save_path}")
+
+    if args.val_seasons is not None:
+        features = data.drop(columns=NON_FEATURE_COLUMNS)
+        is_val = features["season"].isin(args.val_seasons)
+        features[~is_val].to_csv(args.training_data_path, index=False)
+        features[is_val].to_csv(args.validation_data_path, index=False)
+        logger.info(
+            f"Wrote {(~is_val).sum()} training and {is_val.sum()} validation "
+            + "rows"
+        )
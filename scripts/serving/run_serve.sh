@@ -0,0 +1,13 @@
+#!/bin/bash
+
+# This file is intended as a quick means of running serve.py
+# This file can be editted and ran using `bash scripts/serving/run_serve.sh`
+# Please do not push any changes to this file 
+
+poetry run python scripts/serving/serve.py \
+    --weight_bank_path 'data/weight_bank' \
+    --port 8080 \
+    --max_batch_size 256 \
+    --max_latency_ms 5 \
+    --request_queue_size 512 \
+    --quantiles 0.05 0.5 0.95
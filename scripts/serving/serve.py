@@ -0,0 +1,64 @@
+import argparse
+
+from src.serving import serve
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--weight_bank_path",
+        type=str,
+        required=True,
+        help="Directory of a weight bank exported with export_weight_bank",
+    )
+    parser.add_argument(
+        "--host", type=str, default="127.0.0.1", help="Host to bind to"
+    )
+    parser.add_argument(
+        "--port", type=int, default=8080, help="Port to listen on"
+    )
+    parser.add_argument(
+        "--max_batch_size",
+        type=int,
+        default=256,
+        help="Largest number of fixtures scored in one micro-batch",
+    )
+    parser.add_argument(
+        "--max_latency_ms",
+        type=float,
+        default=5.0,
+        help="How long to wait for a micro-batch to fill up",
+    )
+    parser.add_argument(
+        "--num_samples",
+        type=int,
+        default=None,
+        help="Number of weight samples per prediction, defaults to all",
+    )
+    parser.add_argument(
+        "--quantiles",
+        nargs="+",
+        type=float,
+        default=[0.05, 0.5, 0.95],
+        help="Quantiles of the predictive distribution to return",
+    )
+    parser.add_argument(
+        "--request_queue_size",
+        type=int,
+        default=512,
+        help="Listen backlog of connections waiting to be accepted",
+    )
+
+    args = parser.parse_args()
+
+    serve(
+        args.weight_bank_path,
+        host=args.host,
+        port=args.port,
+        max_batch_size=args.max_batch_size,
+        max_latency_ms=args.max_latency_ms,
+        num_samples=args.num_samples,
+        quantiles=tuple(args.quantiles),
+        request_queue_size=args.request_queue_size,
+    )
@@ -0,0 +1,240 @@
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import pandas as pd
+from loguru import logger
+
+from src.seasons import season_start_year
+from src.shared_data import (
+    dataframe_fingerprint,
+    limit_tf_threads,
+    load_shared_dataframe,
+    share_dataframe,
+)
+from src.tracking import ExperimentTracker
+
+
+def walk_forward_folds(
+    seasons: List[str],
+    min_train_seasons: int = 3,
+    window: str = "expanding",
+    window_size: int = None,
+) -> List[Tuple[List[str], str]]:
+    if window not in ["expanding", "sliding"]:
+        raise ValueError(f"Unknown window '{window}'")
+
+    ordered = sorted(set(seasons), key=season_start_year)
+    window_size = window_size or min_train_seasons
+
+    folds = []
+    for t in range(min_train_seasons, len(ordered)):
+        start = 0 if window == "expanding" else max(0, t - window_size)
+        folds.append((ordered[start:t], ordered[t]))
+
+    return folds
+
+
+def prepare_folds(
+    data: pd.DataFrame,
+    folds: List[Tuple[List[str], str]],
+    cache_dir: str | Path,
+) -> List[Path]:
+    cache_dir = Path(cache_dir)
+
+    fold_dirs = []
+    for train_seasons, val_season in folds:
+        fold_name = f"{train_seasons[0]}-{train_seasons[-1]}_{val_season}"
+        fold_dir = cache_dir / fold_name
+
+        train_data = data.loc[data["season"].isin(train_seasons)].drop(
+            columns="bookies_prob"
+        )
+        val_data = data.loc[data["season"] == val_season]
+        fold = {
+            "train_seasons": train_seasons,
+            "val_season": val_season,
+            "train_fingerprint": dataframe_fingerprint(train_data),
+            "val_fingerprint": dataframe_fingerprint(val_data),
+        }
+
+        # Prepared once and reused by every configuration and rerun, as
+        # long as the same seasons hold the same data
+        cached = None
+        if (fold_dir / "fold.json").exists():
+            with open(fold_dir / "fold.json", "r") as f:
+                cached = json.load(f)
+        if cached != fold:
+            if cached is not None:
+                logger.info(f"Rebuilding fold {fold_name}, its data changed")
+            share_dataframe(train_data, fold_dir / "train")
+            share_dataframe(val_data, fold_dir / "val")
+            with open(fold_dir / "fold.json", "w") as f:
+                json.dump(fold, f)
+        fold_dirs.append(fold_dir)
+
+    return fold_dirs
+
+
+def _init_worker(num_threads: int) -> None:
+    limit_tf_threads(num_threads)
+
+
+def _run_fold(
+    experiment_name: str,
+    fold_dir: str,
+    config: Dict[str, Any],
+    run_id: str,
+    run_kwargs: Dict[str, Any],
+) -> Dict[str, float]:
+    # Imported here so the worker's thread limits apply to TensorFlow
+    from src.experimentation import run_experiment
+
+    tracker = ExperimentTracker(
+        experiment_name, run_kwargs.get("tracking_uri")
+    )
+    run_experiment(
+        experiment_name,
+        load_shared_dataframe(Path(fold_dir) / "train"),
+        load_shared_dataframe(Path(fold_dir) / "val"),
+        run_id=run_id,
+        run_description=f"walk-forward fold {Path(fold_dir).name}",
+        tracker=tracker,
+        **config,
+        **run_kwargs,
+    )
+
+    return tracker.metrics
+
+
+def run_backtest(
+    experiment_name: str,
+    data: pd.DataFrame,
+    configs: List[Dict[str, Any]],
+    cache_dir: str | Path,
+    min_train_seasons: int = 3,
+    window: str = "expanding",
+    window_size: int = None,
+    num_workers: int = 4,
+    threads_per_worker: int = 1,
+    backtest_id: str = "backtest",
+    **run_kwargs,
+) -> pd.DataFrame:
+    folds = walk_forward_folds(
+        list(data["season"].unique()), min_train_seasons, window, window_size
+    )
+    fold_dirs = prepare_folds(data, folds, cache_dir)
+    logger.info(
+        f"Walk-forward backtest over {len(folds)} folds and "
+        f"{len(configs)} configurations"
+    )
+
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=num_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(threads_per_worker,),
+    ) as executor:
+        futures = {}
+        for config_index, config in enumerate(configs):
+            for fold_index, fold_dir in enumerate(fold_dirs):
+                run_id = f"{backtest_id}_config_{config_index}_{fold_dir.name}"
+                future = executor.submit(
+                    _run_fold,
+                    experiment_name,
+                    str(fold_dir),
+                    config,
+                    run_id,
+                    run_kwargs,
+                )
+                futures[future] = (config_index, fold_index)
+
+        for future in as_completed(futures):
+            config_index, fold_index = futures[future]
+            try:
+                metrics = future.result()
+            except Exception as e:
+                logger.error(
+                    f"Fold {fold_dirs[fold_index].name} of configuration "
+                    f"{config_index} failed: {e}"
+                )
+                continue
+
+            results.append(
+                {
+                    "config_index": config_index,
+                    "fold_index": fold_index,
+                    "val_season": folds[fold_index][1],
+                    **metrics,
+                }
+            )
+
+    if not results:
+        logger.error("Every fold of every configuration failed")
+        return pd.DataFrame(
+            columns=["config_index", "fold_index", "val_season"]
+        )
+
+    results = pd.DataFrame(results).sort_values(["config_index", "fold_index"])
+    _log_aggregates(
+        experiment_name,
+        configs,
+        folds,
+        results,
+        backtest_id,
+        run_kwargs.get("tracking_uri"),
+    )
+
+    return results
+
+
+def _log_aggregates(
+    experiment_name: str,
+    configs: List[Dict[str, Any]],
+    folds: List[Tuple[List[str], str]],
+    results: pd.DataFrame,
+    backtest_id: str,
+    tracking_uri: str = None,
+) -> None:
+
+    metric_columns = [
+        col
+        for col in results.columns
+        if col not in ["config_index", "fold_index", "val_season"]
+    ]
+    for config_index, config_results in results.groupby("config_index"):
+        with ExperimentTracker(experiment_name, tracking_uri) as tracker:
+            tracker.set_tags(
+                {
+                    "run_id": f"{backtest_id}_config_{config_index}",
+                    "run_description": "walk-forward backtest aggregate",
+                }
+            )
+            tracker.log_params(
+                {
+                    **configs[config_index],
+                    "num_folds": len(folds),
+                    "num_completed_folds": len(config_results),
+                    "val_seasons": list(config_results["val_season"]),
+                }
+            )
+            tracker.log_metrics(
+                {
+                    **{
+                        f"{col}_mean": config_results[col].mean()
+                        for col in metric_columns
+                    },
+                    **{
+                        f"{col}_std": config_results[col].std()
+                        for col in metric_columns
+                    },
+                }
+            )
+            for _, row in config_results.iterrows():
+                tracker.log_metrics(
+                    {f"fold_{col}": row[col] for col in metric_columns},
+                    step=int(row["fold_index"]),
+                )
@@ -1,15 +1,39 @@
+import json
+import weakref
+from pathlib import Path
 import numpy as np
 import tensorflow as tf
 import tf_keras as tfk
 import tensorflow_probability as tfp
 import pandas as pd
 from tqdm import tqdm
-from typing import List, Dict, Tuple
+from loguru import logger
+from typing import List, Dict, Iterator, Tuple
 
+from src.numpy_predictor import NumpyPredictor
+from src.priors_posteriors import (
+    get_posterior,
+    make_normal_layer_prior,
+    make_normal_prior,
+)
+from src.profiling import profiled
+from src.streaming import PredictiveAccumulator
 
 tfd = tfp.distributions
 tfpl = tfp.layers
 
+PER_EXAMPLE_LAYERS = {
+    "flipout": tfpl.DenseFlipout,
+    "local_reparameterization": tfpl.DenseLocalReparameterization,
+}
+VARIATIONAL_LAYERS = (tfpl.DenseVariational,) + tuple(
+    PER_EXAMPLE_LAYERS.values()
+)
+
+_SAMPLERS = weakref.WeakKeyDictionary()
+
+Features = Dict[str, np.ndarray] | np.ndarray
+
 
 def extract_features_and_target(
     data: pd.DataFrame, feature_names: List[str], target: str
@@ -23,26 +47,161 @@ def extract_features_and_target(
     return X, y
 
 
-def make_dataset(
-    X: Dict[str, np.ndarray], y: np.ndarray, buffer_size: int, batch_size: int
+def extract_feature_matrix(
+    data: pd.DataFrame, feature_names: List[str], target: str
+) -> Tuple[np.ndarray, np.ndarray]:
+    # One contiguous (N, F) buffer whose columns follow feature_names
+    X = np.ascontiguousarray(data[feature_names].to_numpy(dtype=np.float32))
+    y = data[target].values.astype(np.float32)
+
+    return X, y
+
+
+def _shuffled_dataset(
+    X: Features,
+    y: np.ndarray,
+    buffer_size: int,
+    reshuffle_each_iteration: bool,
 ) -> tf.data.Dataset:
-    dataset = (
+    # Cache the raw slices before shuffling so every epoch is reshuffled
+    # rather than replaying the first epoch's batches
+    return (
         tf.data.Dataset.from_tensor_slices((X, y))
-        .shuffle(buffer_size=buffer_size)
-        .batch(batch_size)
         .cache()
+        .shuffle(
+            buffer_size=buffer_size,
+            reshuffle_each_iteration=reshuffle_each_iteration,
+        )
     )
 
+
+def _select_rows(X: Features, mask: np.ndarray) -> Features:
+    if isinstance(X, np.ndarray):
+        return X[mask]
+
+    return {feature: values[mask] for feature, values in X.items()}
+
+
+@profiled("make_dataset")
+def make_dataset(
+    X: Features,
+    y: np.ndarray,
+    buffer_size: int,
+    batch_size: int,
+    reshuffle_each_iteration: bool = True,
+    prefetch: bool = True,
+    shards: np.ndarray = None,
+) -> tf.data.Dataset:
+    if shards is None:
+        dataset = _shuffled_dataset(
+            X, y, buffer_size, reshuffle_each_iteration
+        )
+    else:
+        shard_datasets = []
+        shard_weights = []
+        for shard in np.unique(shards):
+            mask = shards == shard
+            shard_datasets.append(
+                _shuffled_dataset(
+                    _select_rows(X, mask),
+                    y[mask],
+                    min(buffer_size, int(mask.sum())),
+                    reshuffle_each_iteration,
+                )
+            )
+            shard_weights.append(mask.mean())
+
+        dataset = tf.data.Dataset.sample_from_datasets(
+            shard_datasets,
+            weights=shard_weights,
+            rerandomize_each_iteration=reshuffle_each_iteration,
+        )
+
+    dataset = dataset.batch(batch_size)
+
+    if prefetch:
+        dataset = dataset.prefetch(tf.data.AUTOTUNE)
+
     return dataset
 
 
-def create_bnn_model(
-    feature_names: List[str],
-    hidden_units: List[int],
+def _variational_dense(
+    units: int,
+    layer_type: str,
     prior: callable,
     posterior: callable,
-    n_train: int,
-) -> tfk.Model:
+    kl_weight: float,
+    kl_use_exact: bool,
+) -> tfk.layers.Layer:
+    if layer_type == "dense_variational":
+        return tfpl.DenseVariational(
+            units=units,
+            make_prior_fn=prior,
+            make_posterior_fn=posterior,
+            kl_weight=kl_weight,
+            kl_use_exact=kl_use_exact,
+            activation="sigmoid",
+        )
+
+    if layer_type not in PER_EXAMPLE_LAYERS:
+        raise ValueError(
+            f"Unknown layer type '{layer_type}', expected one of "
+            f"{['dense_variational'] + list(PER_EXAMPLE_LAYERS)}"
+        )
+
+    def divergence_fn(q, p, q_sample):
+        if kl_use_exact:
+            return tfd.kl_divergence(q, p) * kl_weight
+        # The kernel is never sampled whole by these layers, so the sampled
+        # KL takes its own draw
+        if q_sample is None:
+            q_sample = q.sample()
+        return (q.log_prob(q_sample) - p.log_prob(q_sample)) * kl_weight
+
+    return PER_EXAMPLE_LAYERS[layer_type](
+        units=units,
+        activation="sigmoid",
+        kernel_prior_fn=prior,
+        kernel_posterior_fn=posterior,
+        kernel_divergence_fn=divergence_fn,
+        bias_prior_fn=prior,
+        bias_posterior_fn=posterior,
+        bias_divergence_fn=divergence_fn,
+    )
+
+
+def layer_prior_posterior(
+    layer_type: str,
+    prior_scale: float = 1.0,
+    posterior: str = "std_normal",
+    posterior_rank: int = 2,
+) -> Tuple[callable, callable]:
+    if layer_type not in PER_EXAMPLE_LAYERS:
+        return make_normal_prior(prior_scale), get_posterior(
+            posterior, rank=posterior_rank
+        )
+
+    # Both layers perturb a factorised normal kernel per example, so a
+    # correlated posterior cannot be expressed
+    if posterior != "mean_field":
+        raise ValueError(
+            f"The {layer_type} layer only supports the mean_field "
+            f"posterior, got '{posterior}'"
+        )
+
+    return make_normal_layer_prior(prior_scale), (
+        tfpl.default_mean_field_normal_fn()
+    )
+
+
+def create_model_inputs(
+    feature_names: List[str], packed_inputs: bool = False
+) -> Tuple[Dict[str, tf.Tensor] | tf.Tensor, tf.Tensor]:
+    if packed_inputs:
+        inputs = tfk.layers.Input(
+            name="features", shape=(len(feature_names),), dtype=tf.float32
+        )
+        return inputs, inputs
 
     inputs = {}
     for feature_name in feature_names:
@@ -50,47 +209,489 @@ def create_bnn_model(
             name=feature_name, shape=(1,), dtype=tf.float32
         )
 
-    features = tfk.layers.concatenate(list(inputs.values()))
+    return inputs, tfk.layers.concatenate(list(inputs.values()))
+
+
+def create_bnn_model(
+    feature_names: List[str],
+    hidden_units: List[int],
+    prior: callable,
+    posterior: callable,
+    n_train: int,
+    kl_use_exact: bool = False,
+    layer_type: str = "dense_variational",
+    packed_inputs: bool = False,
+) -> tfk.Model:
+
+    inputs, features = create_model_inputs(feature_names, packed_inputs)
     features = tfk.layers.BatchNormalization()(features)
 
     if hidden_units is not None:
         for units in hidden_units:
-            features = tfp.layers.DenseVariational(
+            features = _variational_dense(
                 units=units,
-                make_prior_fn=prior,
-                make_posterior_fn=posterior,
+                layer_type=layer_type,
+                prior=prior,
+                posterior=posterior,
                 kl_weight=1 / n_train,
-                activation="sigmoid",
+                kl_use_exact=kl_use_exact,
             )(features)
 
-    outputs = tfp.layers.DenseVariational(
+    outputs = _variational_dense(
         units=1,
-        make_prior_fn=prior,
-        make_posterior_fn=posterior,
+        layer_type=layer_type,
+        prior=prior,
+        posterior=posterior,
         kl_weight=1 / n_train,
-        activation="sigmoid",
+        kl_use_exact=kl_use_exact,
     )(features)
 
     return tfk.Model(inputs=inputs, outputs=outputs)
 
 
-def model_inference(
+def _variational_layers(model: tfk.Model) -> List[tfk.layers.Layer]:
+    return [
+        layer
+        for layer in model.layers
+        if isinstance(layer, VARIATIONAL_LAYERS)
+    ]
+
+
+def _deterministic_features(model: tfk.Model, X: Features) -> tf.Tensor:
+    # Everything before the first variational layer is deterministic, so it
+    # is evaluated once and shared by every weight sample. training=True
+    # keeps the batch-statistics behaviour of the looped sampler.
+    first_variational = _variational_layers(model)[0]
+    trunk = tfk.Model(inputs=model.inputs, outputs=first_variational.input)
+
+    return trunk(X, training=True)
+
+
+def _sample_layer_weights(
+    layer: tfk.layers.Layer, inputs: tf.Tensor, num_samples: int
+) -> Tuple[tf.Tensor, tf.Tensor]:
+    if not isinstance(layer, tfpl.DenseVariational):
+        kernel = layer.kernel_posterior.sample(num_samples)
+        bias = layer.bias_posterior.sample(num_samples)
+        return kernel, bias
+
+    posterior = layer._posterior(inputs)
+    weights = posterior.sample(num_samples)
+
+    prev_units = layer.input_spec.axes[-1]
+    if layer.use_bias:
+        kernel, bias = tf.split(
+            weights, [prev_units * layer.units, layer.units], axis=-1
+        )
+    else:
+        kernel, bias = weights, tf.zeros([num_samples, layer.units])
+
+    kernel = tf.reshape(kernel, [num_samples, prev_units, layer.units])
+
+    return kernel, bias
+
+
+def _batched_forward(
+    layers: List[tfk.layers.Layer], features: tf.Tensor, num_samples: int
+) -> tf.Tensor:
+    outputs = features
+    for layer in layers:
+        kernel, bias = _sample_layer_weights(layer, features, num_samples)
+        # (N, F) @ (S, F, U) broadcasts to (S, N, U); later layers are
+        # already (S, N, F) so each sample keeps its own activations.
+        outputs = tf.matmul(outputs, kernel) + bias[:, tf.newaxis, :]
+        if layer.activation is not None:
+            outputs = layer.activation(outputs)
+
+    return tf.reshape(outputs, [num_samples, -1])
+
+
+def posterior_distributions(model: tfk.Model) -> List[tfd.Distribution]:
+    # Frozen copies of each DenseVariational posterior, e.g. to serve as
+    # the prior of a later update
+    distributions = []
+    for layer in _variational_layers(model):
+        if not isinstance(layer, tfpl.DenseVariational):
+            raise ValueError(
+                "Posterior distributions can only be read from "
+                "DenseVariational layers"
+            )
+
+        posterior = layer._posterior(tf.zeros([1, 1]))
+        if isinstance(posterior.scale, tf.linalg.LinearOperatorDiag):
+            distributions.append(
+                tfd.MultivariateNormalDiag(
+                    loc=tf.constant(posterior.mean()),
+                    scale_diag=tf.constant(posterior.stddev()),
+                )
+            )
+        else:
+            distributions.append(
+                tfd.MultivariateNormalTriL(
+                    loc=tf.constant(posterior.mean()),
+                    scale_tril=tf.constant(
+                        tf.linalg.cholesky(posterior.covariance())
+                    ),
+                )
+            )
+
+    return distributions
+
+
+def _get_sampler(model: tfk.Model, kind: str, jit_compile: bool) -> callable:
+    samplers = _SAMPLERS.setdefault(model, {})
+    if (kind, jit_compile) not in samplers:
+        if kind == "batched":
+            layers = _variational_layers(model)
+
+            def sampler(features, num_samples):
+                return _batched_forward(layers, features, num_samples)
+
+        else:
+            # A weak reference, so the cache entry does not keep its own
+            # key alive
+            model_ref = weakref.ref(model)
+
+            def sampler(X):
+                return model_ref()(X, training=True)
+
+        samplers[(kind, jit_compile)] = tf.function(
+            sampler, jit_compile=jit_compile
+        )
+
+    return samplers[(kind, jit_compile)]
+
+
+def _call_sampler(
+    model: tfk.Model, kind: str, jit_compile: bool, *args
+) -> tf.Tensor:
+    try:
+        return _get_sampler(model, kind, jit_compile)(*args)
+    except (tf.errors.InvalidArgumentError, tf.errors.UnimplementedError) as e:
+        if not jit_compile:
+            raise
+        logger.warning(f"XLA compilation failed, using graph mode: {e}")
+        _SAMPLERS[model][(kind, True)] = _get_sampler(model, kind, False)
+        return _SAMPLERS[model][(kind, True)](*args)
+
+
+def _sample_chunks(
     model: tfk.Model,
-    X: Dict[str, np.ndarray],
-    num_samples: str,
-    tag: str = None,
-) -> np.array:
+    X: Features,
+    num_samples: int,
+    tag: str,
+    batched: bool,
+    sample_batch_size: int,
+    jit_compile: bool,
+) -> Iterator[np.ndarray]:
     if tag is not None:
         tag = tag.title()
         tag += " "
 
-    sampled_probs = np.stack(
-        [
-            model(X, training=True).numpy().flatten()
-            for _ in tqdm(
-                range(num_samples), desc=f"{tag}Output Sampling Progress"
+    if sample_batch_size is None:
+        sample_batch_size = num_samples
+
+    if batched:
+        features = _deterministic_features(model, X)
+
+        for start in tqdm(
+            range(0, num_samples, sample_batch_size),
+            desc=f"{tag}Batched Output Sampling Progress",
+        ):
+            batch_samples = min(sample_batch_size, num_samples - start)
+            yield _call_sampler(
+                model, "batched", jit_compile, features, batch_samples
+            ).numpy()
+
+        return
+
+    if jit_compile:
+
+        def forward(X):
+            return _call_sampler(model, "forward", True, X)
+
+    else:
+
+        def forward(X):
+            return model(X, training=True)
+
+    sample_batch = []
+    for _ in tqdm(range(num_samples), desc=f"{tag}Output Sampling Progress"):
+        sample_batch.append(forward(X).numpy().flatten())
+        if len(sample_batch) == sample_batch_size:
+            yield np.stack(sample_batch)
+            sample_batch = []
+
+    if sample_batch:
+        yield np.stack(sample_batch)
+
+
+def model_inference(
+    model: tfk.Model,
+    X: Features,
+    num_samples: str,
+    tag: str = None,
+    batched: bool = False,
+    sample_batch_size: int = None,
+    jit_compile: bool = False,
+) -> np.array:
+    sampled_probs = np.concatenate(
+        list(
+            _sample_chunks(
+                model,
+                X,
+                num_samples,
+                tag,
+                batched,
+                sample_batch_size,
+                jit_compile,
             )
-        ]
+        ),
+        axis=0,
     )
 
     return sampled_probs
+
+
+def model_inference_stats(
+    model: tfk.Model,
+    X: Features,
+    num_samples: int,
+    tag: str = None,
+    batched: bool = False,
+    sample_batch_size: int = 100,
+    jit_compile: bool = False,
+    quantiles: List[float] = (0.05, 0.5, 0.95),
+    thresholds: List[float] = None,
+    num_bins: int = 100,
+) -> Dict[str, np.ndarray]:
+    accumulator = None
+    for samples in _sample_chunks(
+        model, X, num_samples, tag, batched, sample_batch_size, jit_compile
+    ):
+        if accumulator is None:
+            accumulator = PredictiveAccumulator(
+                samples.shape[1], num_bins=num_bins, thresholds=thresholds
+            )
+        accumulator.update(samples)
+
+    stats = {
+        "mean": accumulator.mean,
+        "variance": accumulator.variance,
+        "quantiles": accumulator.quantiles(quantiles),
+    }
+    if thresholds is not None:
+        stats["exceedance"] = accumulator.exceedance_probabilities()
+
+    return stats
+
+
+def _layer_weight_moments(
+    layer: tfk.layers.Layer, inputs: tf.Tensor
+) -> Tuple[tf.Tensor, tf.Tensor]:
+    if not isinstance(layer, tfpl.DenseVariational):
+        # Mean-field kernel and bias, so the covariance is diagonal
+        unit_means = tf.concat(
+            [
+                tf.transpose(layer.kernel_posterior.mean()),
+                layer.bias_posterior.mean()[:, tf.newaxis],
+            ],
+            axis=1,
+        )
+        unit_variances = tf.concat(
+            [
+                tf.transpose(layer.kernel_posterior.variance()),
+                layer.bias_posterior.variance()[:, tf.newaxis],
+            ],
+            axis=1,
+        )
+        return unit_means, tf.linalg.diag(unit_variances)
+
+    posterior = layer._posterior(inputs)
+    mean = posterior.mean()
+    try:
+        covariance = posterior.covariance()
+    except NotImplementedError:
+        covariance = tf.linalg.diag(posterior.variance())
+
+    # Gather, for every output unit, the weights feeding it (kernel column
+    # followed by its bias) and the covariance between those weights.
+    prev_units = layer.input_spec.axes[-1]
+    unit_index = (
+        np.arange(prev_units)[None, :] * layer.units
+        + np.arange(layer.units)[:, None]
+    )
+    if layer.use_bias:
+        bias_index = prev_units * layer.units + np.arange(layer.units)
+        unit_index = np.concatenate([unit_index, bias_index[:, None]], axis=1)
+
+    unit_means = tf.gather(mean, unit_index)
+    unit_covariances = tf.gather(
+        tf.gather(covariance, unit_index), unit_index, axis=2, batch_dims=1
+    )
+
+    return unit_means, unit_covariances
+
+
+def _propagate_moments(
+    layer: tfk.layers.Layer, mean: tf.Tensor, variance: tf.Tensor
+) -> Tuple[tf.Tensor, tf.Tensor]:
+    unit_means, unit_covariances = _layer_weight_moments(layer, mean)
+
+    if unit_means.shape[-1] == mean.shape[-1] + 1:
+        ones = tf.ones_like(mean[:, :1])
+        mean = tf.concat([mean, ones], axis=-1)
+        variance = tf.concat([variance, tf.zeros_like(ones)], axis=-1)
+
+    pre_mean = tf.matmul(mean, unit_means, transpose_b=True)
+    pre_variance = tf.einsum(
+        "nf,ufg,ng->nu", mean, unit_covariances, mean
+    ) + tf.matmul(
+        variance,
+        tf.square(unit_means) + tf.linalg.diag_part(unit_covariances),
+        transpose_b=True,
+    )
+
+    activation = getattr(layer.activation, "__name__", None)
+    if activation == "sigmoid":
+        # Probit approximation to the logistic-Gaussian integral
+        kappa = tf.math.rsqrt(1.0 + np.pi * pre_variance / 8.0)
+        out_mean = tf.sigmoid(kappa * pre_mean)
+        out_variance = out_mean * (1.0 - out_mean) * (1.0 - kappa)
+    elif activation in (None, "linear"):
+        out_mean, out_variance = pre_mean, pre_variance
+    else:
+        raise ValueError(
+            f"Moment propagation does not support {activation} activations"
+        )
+
+    return out_mean, out_variance
+
+
+def model_moments(
+    model: tfk.Model, X: Features
+) -> Tuple[np.ndarray, np.ndarray]:
+    mean = _deterministic_features(model, X)
+    variance = tf.zeros_like(mean)
+
+    for layer in _variational_layers(model):
+        mean, variance = _propagate_moments(layer, mean, variance)
+
+    return mean.numpy().flatten(), variance.numpy().flatten()
+
+
+def moment_drift(
+    sampled_probs: np.ndarray,
+    moment_mean: np.ndarray,
+    moment_variance: np.ndarray,
+) -> Dict[str, float]:
+    sampled_mean = sampled_probs.mean(axis=0)
+    sampled_std = sampled_probs.std(axis=0)
+    moment_std = np.sqrt(moment_variance)
+
+    return {
+        "mean_abs_diff": float(np.mean(np.abs(sampled_mean - moment_mean))),
+        "mean_max_abs_diff": float(np.max(np.abs(sampled_mean - moment_mean))),
+        "mean_correlation": float(
+            np.corrcoef(sampled_mean, moment_mean)[0, 1]
+        ),
+        "std_abs_diff": float(np.mean(np.abs(sampled_std - moment_std))),
+        "std_ratio": float(np.mean(moment_std) / np.mean(sampled_std)),
+    }
+
+
+def _feature_matrix(X: Features, feature_names: List[str]) -> np.ndarray:
+    if isinstance(X, np.ndarray):
+        return X
+
+    return np.column_stack([X[name] for name in feature_names])
+
+
+def export_weight_bank(
+    model: tfk.Model,
+    feature_names: List[str],
+    path: str | Path,
+    X_train: Features,
+    num_samples: int = 1000,
+    float16: bool = False,
+) -> Path:
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    dtype = np.float16 if float16 else np.float32
+
+    layers = _variational_layers(model)
+    for i, layer in enumerate(layers):
+        kernel, bias = _sample_layer_weights(
+            layer, tf.zeros([1, 1]), num_samples
+        )
+        np.save(path / f"kernel_{i}.npy", kernel.numpy().astype(dtype))
+        np.save(path / f"bias_{i}.npy", bias.numpy().astype(dtype))
+
+    batch_norm = next(
+        layer
+        for layer in model.layers
+        if isinstance(layer, tfk.layers.BatchNormalization)
+    )
+    for name in ["gamma", "beta"]:
+        np.save(
+            path / f"batch_norm_{name}.npy",
+            getattr(batch_norm, name).numpy().astype(np.float32),
+        )
+
+    # The model only ever normalises with batch statistics, which for
+    # full-batch training are exactly these. The moving statistics lag
+    # behind and drift towards whatever was last scored with training=True.
+    features = _feature_matrix(X_train, feature_names).astype(np.float64)
+    np.save(
+        path / "feature_mean.npy", features.mean(axis=0).astype(np.float32)
+    )
+    np.save(
+        path / "feature_variance.npy", features.var(axis=0).astype(np.float32)
+    )
+
+    metadata = {
+        "feature_names": list(feature_names),
+        "num_samples": num_samples,
+        "num_layers": len(layers),
+        "activations": [
+            getattr(layer.activation, "__name__", None) for layer in layers
+        ],
+        "batch_norm_epsilon": float(batch_norm.epsilon),
+        "dtype": np.dtype(dtype).name,
+    }
+    with open(path / "metadata.json", "w") as f:
+        json.dump(metadata, f, indent=4)
+
+    return path
+
+
+def weight_bank_parity(
+    model: tfk.Model,
+    path: str | Path,
+    X: Features,
+    num_samples: int = None,
+) -> Dict[str, float]:
+    predictor = NumpyPredictor(path, mmap=False)
+    num_samples = num_samples or predictor.num_samples
+    features = _feature_matrix(X, predictor.feature_names)
+
+    # On the training features the population statistics are the batch
+    # statistics model_inference normalises with, so both paths must agree
+    normalised = predictor.normalise(features, use_batch_statistics=False)
+    model_normalised = _deterministic_features(model, X).numpy()
+
+    mean_probs = predictor.predict(
+        features, num_samples=num_samples, use_batch_statistics=False
+    ).mean(axis=0)
+    model_mean_probs = model_inference(
+        model, X, num_samples, tag="parity", batched=True
+    ).mean(axis=0)
+    prob_diff = np.abs(mean_probs - model_mean_probs)
+
+    return {
+        "max_normalisation_error": float(
+            np.abs(normalised - model_normalised).max()
+        ),
+        "max_mean_prob_diff": float(prob_diff.max()),
+        "mean_abs_mean_prob_diff": float(prob_diff.mean()),
+    }
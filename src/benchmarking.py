@@ -0,0 +1,221 @@
+import json
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from src.bayesian_nn import extract_features_and_target, model_inference
+from src.experimentation import fit_bnn_model
+from src.helper_functions import EpochTimer, find_repo_root
+from src.ingestion import _enrich_data_fduk
+from src.preprocess import create_dataframe
+from src.synthetic import generate_fduk_data, rename_fduk_columns
+
+TIERS = {
+    "small": {"num_leagues": 1, "num_seasons": 5, "num_teams": 20},
+    "medium": {"num_leagues": 5, "num_seasons": 15, "num_teams": 20},
+    "large": {"num_leagues": 20, "num_seasons": 25, "num_teams": 20},
+}
+
+
+def current_commit() -> str:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=find_repo_root(),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=find_repo_root(),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
+
+
+def time_call(func: Callable, repeats: int = 3) -> Tuple[float, Any]:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)), result
+
+
+def benchmark_tier(
+    num_leagues: int,
+    num_seasons: int,
+    num_teams: int,
+    hidden_units: List[int] = None,
+    num_epochs: int = 5,
+    num_batches: int = 1,
+    num_samples: int = 100,
+    repeats: int = 3,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    timings = {}
+
+    raw = generate_fduk_data(num_leagues, num_seasons, num_teams, seed=seed)
+    ingested = rename_fduk_columns(raw, "config")
+    timings["enrich"], enriched = time_call(
+        lambda: _enrich_data_fduk(ingested), repeats
+    )
+
+    # create_dataframe works on the lowercase football-data.co.uk names
+    preprocess_input = rename_fduk_columns(raw, "lowercase")
+    preprocess_input["season_half_h"] = enriched["season_half_h"].values
+    preprocess_input["season_half_a"] = enriched["season_half_a"].values
+    timings["create_dataframe"], model_data = time_call(
+        lambda: create_dataframe(preprocess_input), repeats
+    )
+
+    feature_names = [
+        col for col in model_data.columns if col.startswith(("h_avg", "a_avg"))
+    ]
+    model_data = model_data[feature_names + ["h_win"]]
+    timings["extract_features_and_target"], (X, y) = time_call(
+        lambda: extract_features_and_target(
+            model_data, feature_names, "h_win"
+        ),
+        repeats,
+    )
+
+    epoch_timer = EpochTimer()
+    model = fit_bnn_model(
+        X,
+        y,
+        feature_names,
+        hidden_units=hidden_units,
+        num_epochs=num_epochs,
+        num_batches=num_batches,
+        callbacks=[epoch_timer],
+    )
+    # The first epoch includes tracing, so it is reported on its own
+    epoch_times = np.diff(epoch_timer.epoch_ends, prepend=0.0)
+    timings["first_epoch"] = float(epoch_times[0])
+    if num_epochs > 1:
+        timings["epoch"] = float(np.median(epoch_times[1:]))
+
+    model_inference(model, X, num_samples, tag="warmup", batched=True)
+    timings["model_inference"], _ = time_call(
+        lambda: model_inference(
+            model, X, num_samples, tag="benchmark", batched=True
+        ),
+        repeats,
+    )
+
+    return {
+        "size": {
+            "num_leagues": num_leagues,
+            "num_seasons": num_seasons,
+            "num_teams": num_teams,
+        },
+        "raw_rows": len(raw),
+        "model_rows": len(model_data),
+        "num_features": len(feature_names),
+        "timings": timings,
+    }
+
+
+def run_benchmarks(
+    tiers: List[str] = None,
+    hidden_units: List[int] = None,
+    num_epochs: int = 5,
+    num_batches: int = 1,
+    num_samples: int = 100,
+    repeats: int = 3,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    results = {
+        "commit": current_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "settings": {
+            "hidden_units": hidden_units,
+            "num_epochs": num_epochs,
+            "num_batches": num_batches,
+            "num_samples": num_samples,
+            "repeats": repeats,
+            "seed": seed,
+        },
+        "tiers": {},
+    }
+    for tier in tiers or list(TIERS):
+        logger.info(f"Benchmarking the {tier} tier: {TIERS[tier]}")
+        results["tiers"][tier] = benchmark_tier(
+            **TIERS[tier],
+            hidden_units=hidden_units,
+            num_epochs=num_epochs,
+            num_batches=num_batches,
+            num_samples=num_samples,
+            repeats=repeats,
+            seed=seed,
+        )
+        logger.info(results["tiers"][tier]["timings"])
+    return results
+
+
+def save_results(results: Dict[str, Any], output_dir: str | Path) -> Path:
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    path = output_dir / f"{results['commit']}.json"
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+    return path
+
+
+COMPARISON_COLUMNS = [
+    "tier",
+    "stage",
+    "baseline",
+    "current",
+    "ratio",
+    "status",
+    "regression",
+]
+
+
+def compare_results(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    threshold: float = 0.1,
+) -> pd.DataFrame:
+    rows = []
+    for tier in dict.fromkeys([*current["tiers"], *baseline["tiers"]]):
+        baseline_timings = baseline["tiers"].get(tier, {}).get("timings", {})
+        current_timings = current["tiers"].get(tier, {}).get("timings", {})
+        for stage in dict.fromkeys([*current_timings, *baseline_timings]):
+            before = baseline_timings.get(stage)
+            after = current_timings.get(stage)
+            ratio = np.nan
+            # A stage timed at zero before has nothing to be compared to,
+            # the same as one the baseline never ran
+            if after is None:
+                status = "missing"
+            elif not before:
+                status = "new"
+            else:
+                ratio = after / before
+                status = "regression" if ratio > 1 + threshold else "ok"
+            rows.append(
+                {
+                    "tier": tier,
+                    "stage": stage,
+                    "baseline": before,
+                    "current": after,
+                    "ratio": ratio,
+                    "status": status,
+                    "regression": status == "regression",
+                }
+            )
+    return pd.DataFrame(rows, columns=COMPARISON_COLUMNS)
@@ -0,0 +1,108 @@
+import numpy as np
+from typing import Dict, Tuple
+
+
+def bootstrap_indices(
+    n: int, num_replicates: int, seed: int = None
+) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, n, size=(num_replicates, n), dtype=np.int32)
+
+
+def _auc_labels(
+    y_true: np.ndarray, scores: np.ndarray
+) -> Tuple[np.ndarray, int]:
+    # Label every row by its rank group among the distinct scores and its
+    # class, so a replicate's AUC needs a bincount rather than a sort
+    sorted_scores, groups = np.unique(scores, return_inverse=True)
+    labels = 2 * groups + y_true.astype(bool)
+
+    return labels, len(sorted_scores)
+
+
+def _weighted_auc(
+    indices: np.ndarray, labels: np.ndarray, num_groups: int
+) -> np.ndarray:
+    # Mann-Whitney AUC, with each rank group weighted by how many of its
+    # positive and negative rows each resample drew
+    offsets = np.arange(len(indices))[:, np.newaxis] * 2 * num_groups
+    weights = np.bincount(
+        (labels[indices] + offsets).ravel(),
+        minlength=len(indices) * 2 * num_groups,
+    ).reshape(len(indices), num_groups, 2)
+    neg_weights = weights[..., 0].astype(np.float64)
+    pos_weights = weights[..., 1].astype(np.float64)
+
+    neg_below = np.cumsum(neg_weights, axis=1) - neg_weights
+    numerator = np.sum(pos_weights * (neg_below + 0.5 * neg_weights), axis=1)
+    denominator = pos_weights.sum(axis=1) * neg_weights.sum(axis=1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return numerator / denominator
+
+
+def bootstrap_compare(
+    y_true: np.ndarray,
+    model_probs: np.ndarray,
+    bookies_probs: np.ndarray,
+    num_replicates: int = 2000,
+    chunk_size: int = 250,
+    alpha: float = 0.1,
+    seed: int = None,
+) -> Dict[str, float]:
+    y_true = np.asarray(y_true, dtype=np.float64)
+    model_probs = np.asarray(model_probs, dtype=np.float64)
+    bookies_probs = np.asarray(bookies_probs, dtype=np.float64)
+
+    indices = bootstrap_indices(len(y_true), num_replicates, seed)
+    model_errors = (model_probs - y_true) ** 2
+    bookies_errors = (bookies_probs - y_true) ** 2
+    model_labels = _auc_labels(y_true, model_probs)
+    bookies_labels = _auc_labels(y_true, bookies_probs)
+
+    replicates = {
+        name: np.empty(num_replicates)
+        for name in ["mse", "auc", "bookies_mse", "bookies_auc"]
+    }
+    # Chunked so the intermediate (chunk, n) arrays bound peak memory
+    for start in range(0, num_replicates, chunk_size):
+        stop = min(start + chunk_size, num_replicates)
+        chunk = indices[start:stop]
+
+        replicates["mse"][start:stop] = model_errors[chunk].mean(axis=1)
+        replicates["bookies_mse"][start:stop] = bookies_errors[chunk].mean(
+            axis=1
+        )
+        replicates["auc"][start:stop] = _weighted_auc(chunk, *model_labels)
+        replicates["bookies_auc"][start:stop] = _weighted_auc(
+            chunk, *bookies_labels
+        )
+
+    replicates["mse_diff"] = replicates["mse"] - replicates["bookies_mse"]
+    replicates["auc_diff"] = replicates["auc"] - replicates["bookies_auc"]
+
+    results = {}
+    for name, values in replicates.items():
+        lower, upper = np.nanpercentile(
+            values, [100 * alpha / 2, 100 * (1 - alpha / 2)]
+        )
+        results[f"{name}_lower"] = lower
+        results[f"{name}_upper"] = upper
+
+    # Paired and two-sided: the replicate differences are shifted to be
+    # centred on zero, as under no difference from the bookies, and the
+    # observed difference is compared against them
+    full_sample = np.arange(len(y_true))[np.newaxis]
+    observed = {
+        "mse_diff": model_errors.mean() - bookies_errors.mean(),
+        "auc_diff": (
+            _weighted_auc(full_sample, *model_labels)
+            - _weighted_auc(full_sample, *bookies_labels)
+        )[0],
+    }
+    for name, diff in observed.items():
+        null = replicates[name][~np.isnan(replicates[name])] - diff
+        results[name] = diff
+        results[f"{name}_pvalue"] = np.mean(np.abs(null) >= np.abs(diff))
+
+    return results
@@ -0,0 +1,141 @@
+import numpy as np
+import tensorflow as tf
+import tf_keras as tfk
+import tensorflow_probability as tfp
+from tqdm import tqdm
+from typing import List
+
+from src.bayesian_nn import Features, create_model_inputs
+
+tfd = tfp.distributions
+
+
+class EnsembleDenseVariational(tfk.layers.Layer):
+    def __init__(
+        self,
+        units: int,
+        num_replicas: int,
+        make_prior_fn: callable,
+        make_posterior_fn: callable,
+        kl_weight: float,
+        kl_use_exact: bool = False,
+        activation: str = "sigmoid",
+        seed: int = None,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.units = units
+        self.num_replicas = num_replicas
+        self._make_prior_fn = make_prior_fn
+        self._make_posterior_fn = make_posterior_fn
+        self.kl_weight = kl_weight
+        self.kl_use_exact = kl_use_exact
+        self.activation = tfk.activations.get(activation)
+        self.seed = seed
+
+    def build(self, input_shape):
+        self.prev_units = int(input_shape[-1])
+        kernel_size = self.prev_units * self.units
+
+        # The posterior parameters of all K replicas live in one (K, n)
+        # variable, so the graph and the sampling cost do not grow with K.
+        # Replicas still share nothing, since each row only feeds its own
+        # replica, and each row is initialised from its own seed. The prior
+        # holds no variables and broadcasts over K.
+        self._posterior = self._make_posterior_fn(
+            kernel_size,
+            self.units,
+            self.dtype,
+            batch_shape=(self.num_replicas,),
+            seed=self.seed,
+        )
+        self._prior = self._make_prior_fn(kernel_size, self.units, self.dtype)
+        self.built = True
+
+    def call(self, inputs):
+        q = self._posterior(inputs)
+        r = self._prior(inputs)
+        weights = tf.convert_to_tensor(q)
+
+        if self.kl_use_exact:
+            kl = tfd.kl_divergence(q, r)
+        else:
+            kl = q.log_prob(weights) - r.log_prob(weights)
+        self.add_loss(tf.reduce_sum(kl) * self.kl_weight)
+
+        kernel, bias = tf.split(
+            weights, [self.prev_units * self.units, self.units], axis=-1
+        )
+        kernel = tf.reshape(
+            kernel, [self.num_replicas, self.prev_units, self.units]
+        )
+
+        # (N, K, F) x (K, F, U) -> (N, K, U) in a single batched contraction
+        outputs = tf.einsum("nkf,kfu->nku", inputs, kernel) + bias
+
+        return self.activation(outputs)
+
+
+def replica_squared_error(y_true: tf.Tensor, y_pred: tf.Tensor) -> tf.Tensor:
+    # Summed over replicas so each replica's gradient is that of its own
+    # mean squared error
+    y_true = tf.reshape(tf.cast(y_true, y_pred.dtype), [-1, 1])
+    return tf.reduce_sum(tf.square(y_true - y_pred), axis=-1)
+
+
+def create_bnn_ensemble_model(
+    feature_names: List[str],
+    hidden_units: List[int],
+    prior: callable,
+    posterior: callable,
+    n_train: int,
+    num_replicas: int,
+    kl_use_exact: bool = False,
+    packed_inputs: bool = False,
+    seed: int = None,
+) -> tfk.Model:
+    num_features = len(feature_names)
+    inputs, features = create_model_inputs(feature_names, packed_inputs)
+
+    # Tile the features so every replica has its own batch normalisation
+    # parameters, then lay them out as (N, K, F)
+    if num_replicas > 1:
+        features = tfk.layers.concatenate([features] * num_replicas)
+    features = tfk.layers.BatchNormalization()(features)
+    features = tfk.layers.Reshape((num_replicas, num_features))(features)
+
+    for layer_index, units in enumerate((hidden_units or []) + [1]):
+        features = EnsembleDenseVariational(
+            units=units,
+            num_replicas=num_replicas,
+            make_prior_fn=prior,
+            make_posterior_fn=posterior,
+            kl_weight=1 / n_train,
+            kl_use_exact=kl_use_exact,
+            seed=None if seed is None else seed + layer_index * num_replicas,
+        )(features)
+
+    outputs = tfk.layers.Reshape((num_replicas,))(features)
+
+    return tfk.Model(inputs=inputs, outputs=outputs)
+
+
+def ensemble_inference(
+    model: tfk.Model,
+    X: Features,
+    num_samples: int,
+    tag: str = None,
+) -> np.ndarray:
+    if tag is not None:
+        tag = tag.title()
+        tag += " "
+
+    return np.stack(
+        [
+            model(X, training=True).numpy()
+            for _ in tqdm(
+                range(num_samples),
+                desc=f"{tag}Ensemble Output Sampling Progress",
+            )
+        ]
+    )
@@ -1,19 +1,137 @@
+from pathlib import Path
+
 import numpy as np
+import tensorflow as tf
 import tf_keras as tfk
 import pandas as pd
 from sklearn.metrics import roc_auc_score, brier_score_loss
-import mlflow
+from loguru import logger
 from scipy.stats import ttest_1samp
 from typing import List
 
 from src.bayesian_nn import (
+    Features,
     extract_features_and_target,
+    extract_feature_matrix,
     make_dataset,
     create_bnn_model,
+    layer_prior_posterior,
     model_inference,
+    model_inference_stats,
+    export_weight_bank,
+    weight_bank_parity,
+)
+from src.ensemble import (
+    create_bnn_ensemble_model,
+    ensemble_inference,
+    replica_squared_error,
+)
+from src.online_update import save_model_version
+from src.priors_posteriors import get_posterior, make_normal_prior
+from src.bootstrap import bootstrap_compare
+from src.tracking import ExperimentTracker
+from src.profiling import Profiler, get_profiler, set_profiler, stage
+from src.helper_functions import (
+    ELBOEarlyStopping,
+    EpochProgressBar,
+    PipelineTimer,
+    SampledBrierScore,
 )
-from src.priors_posteriors import std_normal_prior, std_normal_posterior
-from src.helper_functions import EpochProgressBar  # , bootstrap_mse
+
+
+def _compile_model(
+    model: tfk.Model, learning_rate: float, jit_compile: bool
+) -> None:
+    model.compile(
+        optimizer=tfk.optimizers.legacy.RMSprop(learning_rate=learning_rate),
+        loss=tfk.losses.MeanSquaredError(),
+        metrics=[tfk.metrics.MeanSquaredError()],
+        jit_compile=jit_compile,
+    )
+
+
+def fit_bnn_model(
+    X_train: Features,
+    y_train: np.ndarray,
+    feature_names: List[str],
+    hidden_units: List[int] = None,
+    learning_rate: float = 0.001,
+    num_epochs: int = 100,
+    num_batches: int = 1,
+    posterior: str = "std_normal",
+    posterior_rank: int = 2,
+    prior_scale: float = 1.0,
+    kl_use_exact: bool = False,
+    layer_type: str = "dense_variational",
+    callbacks: List[tfk.callbacks.Callback] = None,
+    shuffle_buffer_size: int = None,
+    reshuffle_each_iteration: bool = True,
+    prefetch: bool = True,
+    shards: np.ndarray = None,
+    log_pipeline_timing: bool = False,
+    log_step_timing: bool = False,
+    jit_compile: bool = False,
+) -> tfk.Model:
+    n_train = len(y_train)
+    batch_size = int(n_train / num_batches)
+
+    train_dataset = make_dataset(
+        X_train,
+        y_train,
+        shuffle_buffer_size or n_train,
+        batch_size,
+        reshuffle_each_iteration=reshuffle_each_iteration,
+        prefetch=prefetch,
+        shards=shards,
+    )
+
+    callbacks = [EpochProgressBar()] + (callbacks or [])
+    if log_pipeline_timing or log_step_timing:
+        callbacks.append(
+            PipelineTimer(train_dataset if log_pipeline_timing else None)
+        )
+
+    prior, posterior = layer_prior_posterior(
+        layer_type, prior_scale, posterior, posterior_rank
+    )
+    model = create_bnn_model(
+        feature_names=feature_names,
+        hidden_units=hidden_units,
+        prior=prior,
+        posterior=posterior,
+        n_train=n_train,
+        kl_use_exact=kl_use_exact,
+        layer_type=layer_type,
+        packed_inputs=isinstance(X_train, np.ndarray),
+    )
+
+    _compile_model(model, learning_rate, jit_compile)
+
+    with stage("fit"):
+        try:
+            model.fit(
+                train_dataset,
+                epochs=num_epochs,
+                callbacks=callbacks,
+                verbose=0,
+            )
+        except (
+            tf.errors.InvalidArgumentError,
+            tf.errors.UnimplementedError,
+        ) as e:
+            if not jit_compile:
+                raise
+            # XLA fails while compiling the first step, before any update
+            logger.warning(f"XLA compilation failed, using graph mode: {e}")
+            _compile_model(model, learning_rate, jit_compile=False)
+            model.fit(
+                train_dataset,
+                epochs=num_epochs,
+                callbacks=callbacks,
+                verbose=0,
+            )
+
+    return model
 
 
 def run_experiment(
@@ -29,11 +147,362 @@ def run_experiment(
     run_id: str = None,
     run_description: str = None,
     return_model: bool = False,
+    batched_inference: bool = False,
+    posterior: str = "std_normal",
+    posterior_rank: int = 2,
+    prior_scale: float = 1.0,
+    kl_use_exact: bool = False,
+    layer_type: str = "dense_variational",
+    weight_bank_path: str = None,
+    shuffle_buffer_size: int = None,
+    reshuffle_each_iteration: bool = True,
+    prefetch: bool = True,
+    shard_by: str = None,
+    log_pipeline_timing: bool = False,
+    packed_inputs: bool = False,
+    jit_compile: bool = False,
+    early_stopping: bool = False,
+    early_stopping_window: int = 10,
+    early_stopping_tolerance: float = 1e-3,
+    early_stopping_holdout: float = 0.1,
+    models_dir: str = None,
+    model_name: str = None,
+    num_bootstrap_replicates: int = 2000,
+    samples_path: str = None,
+    tracking_uri: str = None,
+    tracker: ExperimentTracker = None,
+    profile: bool = False,
+    profile_stage: str = None,
+    profile_dir: str = "profiles",
 ) -> None | tfk.Model:
 
-    mlflow.set_tracking_uri("http://localhost:5001")
-    mlflow.set_experiment(experiment_name)
-    mlflow.start_run()
+    tracker = tracker or ExperimentTracker(experiment_name, tracking_uri)
+    tracker.start_run()
+
+    if profile:
+        set_profiler(
+            Profiler(profile_stage=profile_stage, profile_dir=profile_dir)
+        )
+    profiler = get_profiler()
+
+    train_seasons = list(train_data["season"].drop_duplicates())
+    val_seasons = list(val_data["season"].drop_duplicates())
+
+    # Early stopping is judged on rows held out of the training data, so
+    # the validation metrics stay untouched by model selection
+    holdout_data = None
+    if early_stopping:
+        holdout_data = train_data.sample(
+            frac=early_stopping_holdout, random_state=0
+        )
+        train_data = train_data.drop(index=holdout_data.index)
+
+    shards = None
+    if shard_by is not None:
+        shards = train_data[shard_by].values
+
+    drop_columns = list({"season", shard_by} - {None})
+    train_data = train_data.drop(columns=drop_columns)
+    val_data = val_data.drop(columns=drop_columns)
+
+    feature_names = [col for col in train_data.columns if col != "h_win"]
+    n_train = len(train_data)
+
+    extract = (
+        extract_feature_matrix
+        if packed_inputs
+        else extract_features_and_target
+    )
+    with stage("extract_features"):
+        X_train, y_train = extract(train_data, feature_names, "h_win")
+        X_val, y_val = extract(
+            val_data.drop(columns="bookies_prob"), feature_names, "h_win"
+        )
+
+    callbacks = []
+    if early_stopping:
+        X_holdout, y_holdout = extract(
+            holdout_data.drop(columns=drop_columns), feature_names, "h_win"
+        )
+        stopper = ELBOEarlyStopping(
+            window=early_stopping_window, tolerance=early_stopping_tolerance
+        )
+        callbacks = [SampledBrierScore(X_holdout, y_holdout), stopper]
+
+    model = fit_bnn_model(
+        X_train,
+        y_train,
+        feature_names,
+        hidden_units=hidden_units,
+        learning_rate=learning_rate,
+        num_epochs=num_epochs,
+        num_batches=num_batches,
+        posterior=posterior,
+        posterior_rank=posterior_rank,
+        prior_scale=prior_scale,
+        kl_use_exact=kl_use_exact,
+        layer_type=layer_type,
+        shuffle_buffer_size=shuffle_buffer_size,
+        reshuffle_each_iteration=reshuffle_each_iteration,
+        prefetch=prefetch,
+        shards=shards,
+        log_pipeline_timing=log_pipeline_timing,
+        # The profiler records per-epoch step times without the extra
+        # input pipeline pass
+        log_step_timing=profile,
+        jit_compile=jit_compile,
+        callbacks=callbacks,
+    )
+
+    # Only the full validation samples are ever kept, and only on request;
+    # everything else streams through running statistics
+    with stage("train_inference", items=len(y_train) * num_samples):
+        mean_train_probs = model_inference_stats(
+            model,
+            X_train,
+            num_samples,
+            tag="training",
+            batched=batched_inference,
+            jit_compile=jit_compile,
+        )["mean"]
+    with stage("metrics"):
+        train_mse = brier_score_loss(y_train, mean_train_probs)
+        train_auc = roc_auc_score(y_train, mean_train_probs)
+
+    with stage("val_inference", items=len(y_val) * num_samples):
+        if samples_path is not None:
+            sampled_val_probs = model_inference(
+                model,
+                X_val,
+                num_samples,
+                tag="validation",
+                batched=batched_inference,
+                jit_compile=jit_compile,
+            )
+            np.save(samples_path, sampled_val_probs)
+            mean_val_probs = np.mean(sampled_val_probs, axis=0)
+            val_std_probs = np.std(sampled_val_probs, axis=0)
+        else:
+            val_stats = model_inference_stats(
+                model,
+                X_val,
+                num_samples,
+                tag="validation",
+                batched=batched_inference,
+                jit_compile=jit_compile,
+            )
+            mean_val_probs = val_stats["mean"]
+            val_std_probs = np.sqrt(val_stats["variance"])
+    with stage("metrics"):
+        val_mse = brier_score_loss(val_data["h_win"], mean_val_probs)
+        val_auc = roc_auc_score(val_data["h_win"], mean_val_probs)
+
+        bookies_val_mse = brier_score_loss(
+            val_data["h_win"], val_data["bookies_prob"]
+        )
+        bookies_val_auc = roc_auc_score(
+            val_data["h_win"], val_data["bookies_prob"]
+        )
+        val_mse_diff = val_mse - bookies_val_mse
+        val_auc_diff = val_auc - bookies_val_auc
+
+        val_squared_errors = (mean_val_probs - val_data["h_win"]) ** 2
+        bookies_squared_errors = (
+            val_data["bookies_prob"] - val_data["h_win"]
+        ) ** 2
+        pairwise_differences = bookies_squared_errors - val_squared_errors
+
+        _, p_val_two_tailed = ttest_1samp(
+            pairwise_differences, 0, alternative="greater"
+        )
+
+        val_ci = bootstrap_compare(
+            val_data["h_win"],
+            mean_val_probs,
+            val_data["bookies_prob"],
+            num_replicates=num_bootstrap_replicates,
+            seed=0,
+        )
+
+    tracker.set_tags(
+        {
+            "run_id": run_id,
+            "run_description": run_description,
+            "league": league_tag,
+        }
+    )
+
+    tracker.log_params(
+        {
+            "model_type": "bayesian_nn",
+            "prior": "normal",
+            "prior_scale": prior_scale,
+            "posterior": posterior,
+            "posterior_rank": posterior_rank,
+            "kl_use_exact": kl_use_exact,
+            "layer_type": layer_type,
+            "shuffle_buffer_size": shuffle_buffer_size or n_train,
+            "reshuffle_each_iteration": reshuffle_each_iteration,
+            "prefetch": prefetch,
+            "shard_by": shard_by,
+            "packed_inputs": packed_inputs,
+            "jit_compile": jit_compile,
+            "early_stopping": early_stopping,
+            "early_stopping_window": early_stopping_window,
+            "early_stopping_tolerance": early_stopping_tolerance,
+            "early_stopping_holdout": early_stopping_holdout,
+            "feature_names": feature_names,
+            "num_features": len(feature_names),
+            "train_seasons": train_seasons,
+            "num_train_seasons": len(train_seasons),
+            "val_seasons": val_seasons,
+            "num_val_seasons": len(val_seasons),
+            "n_train": n_train,
+            "num_batches": num_batches,
+            "hidden_units": hidden_units,
+            "num_epochs": num_epochs,
+            "learning_rate": learning_rate,
+            "num_samples": num_samples,
+            "batched_inference": batched_inference,
+            "num_bootstrap_replicates": num_bootstrap_replicates,
+        }
+    )
+
+    tracker.log_metrics(
+        {
+            "train_mse": train_mse,
+            "train_auc": train_auc,
+            "val_mse": val_mse,
+            "val_mse_5_percentile": val_ci["mse_lower"],
+            "val_mse_95_percentile": val_ci["mse_upper"],
+            "val_auc": val_auc,
+            "val_auc_5_percentile": val_ci["auc_lower"],
+            "val_mean_predictive_std": np.mean(val_std_probs),
+            "val_auc_95_percentile": val_ci["auc_upper"],
+            "bookies_val_mse": bookies_val_mse,
+            "bookies_val_auc": bookies_val_auc,
+            "val_mse_diff": val_mse_diff,
+            "val_auc_diff": val_auc_diff,
+            "beat_bookies_pvalue": p_val_two_tailed,
+            "val_mse_diff_5_percentile": val_ci["mse_diff_lower"],
+            "val_mse_diff_95_percentile": val_ci["mse_diff_upper"],
+            "val_auc_diff_5_percentile": val_ci["auc_diff_lower"],
+            "val_auc_diff_95_percentile": val_ci["auc_diff_upper"],
+            "val_mse_diff_bootstrap_pvalue": val_ci["mse_diff_pvalue"],
+            "val_auc_diff_bootstrap_pvalue": val_ci["auc_diff_pvalue"],
+        }
+    )
+
+    if early_stopping:
+        tracker.set_tag("stopping_reason", stopper.stopping_reason)
+        tracker.log_metrics(
+            {
+                "epochs_run": stopper.epochs_run,
+                "epochs_saved": num_epochs - stopper.epochs_run,
+                "best_epoch": stopper.best_epoch,
+                "best_holdout_brier": stopper.best_brier,
+            }
+        )
+
+    tracker.log_history(model.history.history, ["loss"])
+    tracker.log_history(
+        model.history.history,
+        [
+            key
+            for key in ["input_time", "step_time"]
+            if key in model.history.history
+        ],
+    )
+
+    if samples_path is not None:
+        tracker.log_param("samples_path", samples_path)
+
+    if weight_bank_path is not None:
+        export_weight_bank(
+            model,
+            feature_names,
+            weight_bank_path,
+            X_train,
+            num_samples=num_samples,
+        )
+        tracker.log_param("weight_bank_path", weight_bank_path)
+
+        parity = weight_bank_parity(model, weight_bank_path, X_train)
+        tracker.log_metrics(
+            {f"weight_bank_{name}": value for name, value in parity.items()}
+        )
+        if parity["max_normalisation_error"] > 1e-3:
+            logger.warning(
+                f"Weight bank normalisation differs from the model: {parity}"
+            )
+
+    if models_dir is not None:
+        version_path = save_model_version(
+            model,
+            {
+                "feature_names": feature_names,
+                "hidden_units": hidden_units,
+                "posterior": posterior,
+                "posterior_rank": posterior_rank,
+                "prior_scale": prior_scale,
+                "kl_use_exact": kl_use_exact,
+                "layer_type": layer_type,
+                "packed_inputs": packed_inputs,
+                "n_train": n_train,
+                "train_seasons": train_seasons,
+                "parent_version": None,
+            },
+            models_dir,
+            model_name or experiment_name,
+        )
+        tracker.log_param("model_version_path", str(version_path))
+
+    if profiler.enabled:
+        profiler.record_epochs(model.history.history)
+        tracker.log_metrics(profiler.stage_metrics())
+        tracker.log_artifact(
+            profiler.save(
+                Path(profile_dir) / f"{run_id or 'run'}_profile.json"
+            )
+        )
+        if profile:
+            set_profiler(None)
+
+    tracker.end_run()
+
+    if return_model:
+        return model
+
+
+def run_ensemble_experiment(
+    experiment_name: str,
+    train_data: pd.DataFrame,
+    val_data: pd.DataFrame,
+    num_replicas: int = 5,
+    hidden_units: List[int] = None,
+    learning_rate: float = 0.001,
+    num_epochs: int = 100,
+    num_samples: int = 100,
+    num_batches: int = 1,
+    league_tag: str = None,
+    run_id: str = None,
+    run_description: str = None,
+    return_model: bool = False,
+    posterior: str = "std_normal",
+    posterior_rank: int = 2,
+    prior_scale: float = 1.0,
+    kl_use_exact: bool = False,
+    packed_inputs: bool = False,
+    seed: int = None,
+    tracking_uri: str = None,
+    tracker: ExperimentTracker = None,
+) -> None | tfk.Model:
+
+    tracker = tracker or ExperimentTracker(experiment_name, tracking_uri)
+    tracker.start_run()
+
+    if seed is not None:
+        tf.random.set_seed(seed)
 
     train_seasons = list(train_data["season"].drop_duplicates())
     val_seasons = list(val_data["season"].drop_duplicates())
@@ -43,73 +512,67 @@ def run_experiment(
 
     feature_names = [col for col in train_data.columns if col != "h_win"]
     n_train = len(train_data)
-    batch_size = int(len(train_data) / num_batches)
+    batch_size = int(n_train / num_batches)
 
-    X_train, y_train = extract_features_and_target(
-        train_data, feature_names, "h_win"
+    extract = (
+        extract_feature_matrix
+        if packed_inputs
+        else extract_features_and_target
     )
-    X_val, y_val = extract_features_and_target(
+    X_train, y_train = extract(train_data, feature_names, "h_win")
+    X_val, y_val = extract(
         val_data.drop(columns="bookies_prob"), feature_names, "h_win"
     )
 
-    train_dataset = make_dataset(X_train, y_train, n_train, batch_size)
-
-    model = create_bnn_model(
+    model = create_bnn_ensemble_model(
         feature_names=feature_names,
         hidden_units=hidden_units,
-        prior=std_normal_prior,
-        posterior=std_normal_posterior,
+        prior=make_normal_prior(prior_scale),
+        posterior=get_posterior(posterior, rank=posterior_rank),
         n_train=n_train,
+        num_replicas=num_replicas,
+        kl_use_exact=kl_use_exact,
+        packed_inputs=packed_inputs,
+        seed=seed,
     )
 
     model.compile(
         optimizer=tfk.optimizers.legacy.RMSprop(learning_rate=learning_rate),
-        loss=tfk.losses.MeanSquaredError(),
-        metrics=[tfk.metrics.MeanSquaredError()],
+        loss=replica_squared_error,
     )
 
     model.fit(
-        train_dataset,
+        make_dataset(X_train, y_train, n_train, batch_size),
         epochs=num_epochs,
         callbacks=[EpochProgressBar()],
         verbose=0,
     )
 
-    sampled_train_probs = model_inference(
-        model, X_train, num_samples, tag="training"
-    )
-    mean_train_probs = np.mean(sampled_train_probs, axis=0)
-    train_mse = brier_score_loss(y_train, mean_train_probs)
-    train_auc = roc_auc_score(y_train, mean_train_probs)
-
-    sampled_val_probs = model_inference(
+    # (num_samples, N, num_replicas)
+    sampled_val_probs = ensemble_inference(
         model, X_val, num_samples, tag="validation"
     )
-    mean_val_probs = np.mean(sampled_val_probs, axis=0)
-    val_mse = brier_score_loss(val_data["h_win"], mean_val_probs)
-    # val_mse_ci = bootstrap_mse(val_data["h_win"], mean_val_probs)
-    val_auc = roc_auc_score(val_data["h_win"], mean_val_probs)
-
-    bookies_val_mse = brier_score_loss(
-        val_data["h_win"], val_data["bookies_prob"]
-    )
-    bookies_val_auc = roc_auc_score(
-        val_data["h_win"], val_data["bookies_prob"]
-    )
-    val_mse_diff = val_mse - bookies_val_mse
-    val_auc_diff = val_auc - bookies_val_auc
+    replica_val_probs = np.mean(sampled_val_probs, axis=0)
+    pooled_val_probs = np.mean(replica_val_probs, axis=1)
 
-    val_squared_errors = (mean_val_probs - val_data["h_win"]) ** 2
-    bookies_squared_errors = (
-        val_data["bookies_prob"] - val_data["h_win"]
-    ) ** 2
-    pairwise_differences = bookies_squared_errors - val_squared_errors
+    replica_metrics = {}
+    for k in range(num_replicas):
+        replica_metrics[f"val_mse_replica_{k}"] = brier_score_loss(
+            y_val, replica_val_probs[:, k]
+        )
+        replica_metrics[f"val_auc_replica_{k}"] = roc_auc_score(
+            y_val, replica_val_probs[:, k]
+        )
+    replica_mses = [
+        replica_metrics[f"val_mse_replica_{k}"] for k in range(num_replicas)
+    ]
 
-    _, p_val_two_tailed = ttest_1samp(
-        pairwise_differences, 0, alternative="greater"
-    )
+    val_mse = brier_score_loss(y_val, pooled_val_probs)
+    val_auc = roc_auc_score(y_val, pooled_val_probs)
+    bookies_val_mse = brier_score_loss(y_val, val_data["bookies_prob"])
+    bookies_val_auc = roc_auc_score(y_val, val_data["bookies_prob"])
 
-    mlflow.set_tags(
+    tracker.set_tags(
         {
             "run_id": run_id,
             "run_description": run_description,
@@ -117,11 +580,17 @@ def run_experiment(
         }
     )
 
-    mlflow.log_params(
+    tracker.log_params(
         {
-            "model_type": "bayesian_nn",
-            "prior": std_normal_prior.__name__,
-            "posterior": std_normal_posterior.__name__,
+            "model_type": "bayesian_nn_ensemble",
+            "num_replicas": num_replicas,
+            "seed": seed,
+            "prior": "normal",
+            "prior_scale": prior_scale,
+            "posterior": posterior,
+            "posterior_rank": posterior_rank,
+            "kl_use_exact": kl_use_exact,
+            "packed_inputs": packed_inputs,
             "feature_names": feature_names,
             "num_features": len(feature_names),
             "train_seasons": train_seasons,
@@ -137,23 +606,21 @@ def run_experiment(
         }
     )
 
-    mlflow.log_metrics(
+    tracker.log_metrics(
         {
-            "train_mse": train_mse,
-            "train_auc": train_auc,
+            **replica_metrics,
+            "val_mse_replica_mean": np.mean(replica_mses),
+            "val_mse_replica_std": np.std(replica_mses),
             "val_mse": val_mse,
-            # "val_mse_5_percentile": val_mse_ci[0],
-            # "val_mse_95_percentile": val_mse_ci[1],
             "val_auc": val_auc,
             "bookies_val_mse": bookies_val_mse,
             "bookies_val_auc": bookies_val_auc,
-            "val_mse_diff": val_mse_diff,
-            "val_auc_diff": val_auc_diff,
-            "beat_bookies_pvalue": p_val_two_tailed,
+            "val_mse_diff": val_mse - bookies_val_mse,
+            "val_auc_diff": val_auc - bookies_val_auc,
         }
     )
 
-    mlflow.end_run()
+    tracker.end_run()
 
     if return_model:
         return model
@@ -1,9 +1,12 @@
+import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
-from typing import Tuple
+from typing import Dict, Tuple
+import tensorflow as tf
 import tf_keras as tfk
 from tqdm import tqdm
 import random
+import time
 import string
 from pathlib import Path
 
@@ -22,6 +25,129 @@ class EpochProgressBar(tfk.callbacks.Callback):
         self.progress_bar.close()
 
 
+class EpochTimer(tfk.callbacks.Callback):
+    def on_train_begin(self, logs=None):
+        self.epoch_ends = []
+        self.start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.epoch_ends.append(time.perf_counter() - self.start)
+
+
+class PipelineTimer(tfk.callbacks.Callback):
+    def __init__(self, dataset: tf.data.Dataset = None):
+        super().__init__()
+        self.dataset = dataset
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.step_time = 0.0
+
+    def on_train_batch_begin(self, batch, logs=None):
+        self._batch_start = time.perf_counter()
+
+    def on_train_batch_end(self, batch, logs=None):
+        self.step_time += time.perf_counter() - self._batch_start
+
+    def on_epoch_end(self, epoch, logs=None):
+        if logs is None:
+            return
+        logs["step_time"] = self.step_time
+        if self.dataset is None:
+            return
+
+        # Keras pulls batches inside the compiled train step, so the input
+        # cost is measured by draining one more epoch of the pipeline on its
+        # own. That doubles the input work, so it only runs when asked for.
+        start = time.perf_counter()
+        for _ in self.dataset:
+            pass
+        logs["input_time"] = time.perf_counter() - start
+
+
+class SampledBrierScore(tfk.callbacks.Callback):
+    def __init__(
+        self,
+        X: Dict[str, np.ndarray] | np.ndarray,
+        y: np.ndarray,
+        num_samples: int = 20,
+    ):
+        super().__init__()
+        self.X = X
+        self.y = y
+        self.num_samples = num_samples
+
+    def on_epoch_end(self, epoch, logs=None):
+        mean_probs = np.mean(
+            [
+                self.model(self.X, training=True).numpy().flatten()
+                for _ in range(self.num_samples)
+            ],
+            axis=0,
+        )
+        brier = float(np.mean((mean_probs - self.y) ** 2))
+
+        if logs is not None:
+            logs["val_brier"] = brier
+
+
+class ELBOEarlyStopping(tfk.callbacks.Callback):
+    def __init__(
+        self,
+        window: int = 10,
+        tolerance: float = 1e-3,
+        restore_best_weights: bool = True,
+    ):
+        super().__init__()
+        self.window = window
+        self.tolerance = tolerance
+        self.restore_best_weights = restore_best_weights
+
+    def on_train_begin(self, logs=None):
+        self.losses = []
+        self.briers = []
+        self.best_brier = np.inf
+        self.best_epoch = None
+        self.best_weights = None
+        self.epochs_run = 0
+        self.stopping_reason = "max_epochs"
+
+    def _converged(self, values):
+        # Compare the mean of the latest window with the one before it
+        previous = np.mean(values[-2 * self.window : -self.window])
+        current = np.mean(values[-self.window :])
+        return previous - current < self.tolerance * abs(previous)
+
+    def on_epoch_end(self, epoch, logs=None):
+        logs = logs or {}
+        self.epochs_run = epoch + 1
+
+        # The loss is the negative ELBO per training example
+        self.losses.append(logs["loss"])
+        brier = logs.get("val_brier")
+        if brier is not None:
+            self.briers.append(brier)
+            if brier < self.best_brier:
+                self.best_brier = brier
+                self.best_epoch = epoch
+                self.best_weights = self.model.get_weights()
+
+        if len(self.losses) < 2 * self.window:
+            return
+
+        if self._converged(self.losses) and (
+            brier is None or self._converged(self.briers)
+        ):
+            self.stopping_reason = (
+                f"improvement below {self.tolerance} over "
+                f"{self.window} epochs"
+            )
+            self.model.stop_training = True
+
+    def on_train_end(self, logs=None):
+        if self.restore_best_weights and self.best_weights is not None:
+            self.model.set_weights(self.best_weights)
+
+
 def get_train_test(
     data: pd.DataFrame, test_size: int = 2, random_state: int = None
 ) -> Tuple[pd.DataFrame, pd.DataFrame]:
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import date
+from pathlib import Path
+from typing import Dict, Tuple
+
+import requests
+from loguru import logger
+
+from src.seasons import season_start_year
+
+
+def is_closed_season(season_tag: str, today: date = None) -> bool:
+    # football-data.co.uk seasons roll over in the summer, so anything
+    # that started before the current season's July is finished
+    today = today or date.today()
+    current_start = today.year if today.month >= 7 else today.year - 1
+    return season_start_year(season_tag) < current_start
+
+
+def _atomic_write(path: Path, content: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent)
+    with os.fdopen(fd, "wb") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+# Payloads are stored once per SHA-256 under objects/, and index.json maps
+# each URL to its payload and validators
+class HTTPCache:
+    def __init__(
+        self,
+        cache_dir: str | Path = "data/http_cache",
+        max_bytes: int = None,
+        offline: bool = False,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self._index_path = self.cache_dir / "index.json"
+        self._lock = threading.Lock()
+
+        if self._index_path.exists():
+            with open(self._index_path, "r") as f:
+                self._index = json.load(f)
+        else:
+            self._index = {}
+
+    def _object_path(self, digest: str) -> Path:
+        return self.cache_dir / "objects" / digest[:2] / digest
+
+    def _save_index(self) -> None:
+        _atomic_write(
+            self._index_path, json.dumps(self._index, indent=1).encode()
+        )
+
+    def _read(self, entry: Dict) -> bytes | None:
+        with self._lock:
+            entry["last_access"] = time.time()
+        try:
+            return self._object_path(entry["sha256"]).read_bytes()
+        except FileNotFoundError:
+            # Evicted by another thread since the index lookup, so a miss
+            return None
+
+    def save(self) -> None:
+        # Access times from cache hits are only persisted here
+        with self._lock:
+            self._evict()
+            self._save_index()
+
+    def get(
+        self,
+        session: requests.Session,
+        url: str,
+        timeout: float = 30.0,
+        closed: bool = False,
+    ) -> Tuple[bytes, str]:
+        with self._lock:
+            entry = self._index.get(url)
+
+        # Files fetched after their season closed never change again
+        if entry is not None and (entry["closed"] or self.offline):
+            content = self._read(entry)
+            if content is not None:
+                return content, "cache"
+            entry = None
+        if self.offline:
+            raise FileNotFoundError(f"{url} is not cached and offline")
+
+        headers = {}
+        if entry is not None and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry is not None and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = session.get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304 and entry is not None:
+            content = self._read(entry)
+            if content is not None:
+                with self._lock:
+                    entry["closed"] = closed
+                    entry["validated_at"] = time.time()
+                    self._save_index()
+                return content, "not_modified"
+            response = session.get(url, timeout=timeout)
+        response.raise_for_status()
+
+        self.put(
+            url,
+            response.content,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            closed=closed,
+        )
+        return response.content, "network"
+
+    def put(
+        self,
+        url: str,
+        content: bytes,
+        etag: str = None,
+        last_modified: str = None,
+        closed: bool = False,
+    ) -> str:
+        digest = hashlib.sha256(content).hexdigest()
+        if self.max_bytes is not None and len(content) > self.max_bytes:
+            # It would only evict everything else and then itself
+            logger.info(f"{url} is larger than the HTTP cache, not caching")
+            return digest
+
+        object_path = self._object_path(digest)
+        if not object_path.exists():
+            _atomic_write(object_path, content)
+
+        now = time.time()
+        with self._lock:
+            self._index[url] = {
+                "sha256": digest,
+                "size": len(content),
+                "etag": etag,
+                "last_modified": last_modified,
+                "closed": closed,
+                "fetched_at": now,
+                "validated_at": now,
+                "last_access": now,
+            }
+            self._evict()
+            self._save_index()
+        return digest
+
+    def size(self) -> int:
+        with self._lock:
+            sizes = {
+                entry["sha256"]: entry["size"]
+                for entry in self._index.values()
+            }
+        return sum(sizes.values())
+
+    def _evict(self) -> None:
+        if self.max_bytes is None:
+            return
+
+        sizes = {}
+        for entry in self._index.values():
+            sizes[entry["sha256"]] = entry["size"]
+        total = sum(sizes.values())
+
+        # Least recently used URLs go first; a payload is only deleted
+        # once no remaining URL refers to it
+        for url, entry in sorted(
+            self._index.items(), key=lambda item: item[1]["last_access"]
+        ):
+            if total <= self.max_bytes:
+                break
+            del self._index[url]
+            digest = entry["sha256"]
+            if not any(e["sha256"] == digest for e in self._index.values()):
+                self._object_path(digest).unlink(missing_ok=True)
+                total -= sizes[digest]
+                logger.info(f"Evicted {url} from the HTTP cache")
@@ -0,0 +1,23 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def make_session(
+    pool_size: int = 8, retries: int = 3, backoff_factor: float = 0.5
+) -> requests.Session:
+    # Transient failures are retried with exponential backoff; a 404, e.g.
+    # a league with no file for that season, fails straight away
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET", "HEAD"],
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
@@ -0,0 +1,217 @@
+import json
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Set, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from src.http_cache import is_closed_season
+from src.ingestion import (
+    ENRICH_COLUMNS,
+    FDUK_BASE_URL,
+    FetchSummary,
+    _enrich_data_fduk,
+    fetch_fduk_partitions,
+    load_column_mapping,
+    make_cache,
+    season_codes,
+)
+from src.storage import apply_fduk_dtypes, load_table, write_partitioned
+
+NATURAL_KEY = ["division", "date", "home_team", "away_team"]
+WATERMARKS_FILE = "_watermarks.json"
+
+
+def load_watermarks(store_root: str | Path) -> Dict[str, Dict]:
+    path = Path(store_root) / WATERMARKS_FILE
+    if not path.exists():
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_watermarks(store_root: str | Path, watermarks: Dict) -> None:
+    path = Path(store_root) / WATERMARKS_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(watermarks, f, indent=2, sort_keys=True)
+
+
+def _partition_key(league: str, season_tag: str) -> str:
+    return f"{league}/{season_tag}"
+
+
+def partitions_to_fetch(
+    seasons: Iterable[int], leagues: List[str], watermarks: Dict
+) -> List[Tuple[str, int]]:
+    # A partition can only change while its season is running, or if the
+    # last fetch happened before the season closed
+    partitions = []
+    for start_y in seasons:
+        _, season_tag = season_codes(start_y)
+        for league in leagues:
+            watermark = watermarks.get(_partition_key(league, season_tag))
+            if watermark is None or not watermark["closed"]:
+                partitions.append((league, start_y))
+    return partitions
+
+
+def _row_hashes(data: pd.DataFrame, columns: List[str]) -> pd.Series:
+    # Compared as strings so categorical and nullable dtypes from the store
+    # match freshly parsed values
+    return pd.util.hash_pandas_object(data[columns].astype(str), index=False)
+
+
+def upsert_partition(
+    existing: pd.DataFrame, incoming: pd.DataFrame
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    columns = [col for col in incoming.columns if col in existing.columns]
+    incoming_keys = pd.MultiIndex.from_frame(incoming[NATURAL_KEY].astype(str))
+    existing_keys = pd.MultiIndex.from_frame(existing[NATURAL_KEY].astype(str))
+
+    existing_hashes = pd.Series(
+        _row_hashes(existing, columns).to_numpy(), index=existing_keys
+    )
+    existing_hashes = existing_hashes[
+        ~existing_hashes.index.duplicated(keep="last")
+    ]
+    incoming_hashes = _row_hashes(incoming, columns).to_numpy()
+
+    positions = existing_hashes.index.get_indexer(incoming_keys)
+    is_new = positions == -1
+    is_updated = np.zeros(len(incoming), dtype=bool)
+    is_updated[~is_new] = (
+        existing_hashes.to_numpy()[positions[~is_new]]
+        != incoming_hashes[~is_new]
+    )
+    changed = is_new | is_updated
+    changes = incoming.loc[changed, NATURAL_KEY].assign(
+        season=incoming.loc[changed, "season"],
+        change=np.where(is_new[changed], "inserted", "updated"),
+    )
+
+    # Rows the source no longer lists are kept, since an upsert never
+    # deletes
+    kept = existing.loc[~existing_keys.isin(incoming_keys), columns]
+    merged = pd.concat([incoming[columns], kept], ignore_index=True)
+    return merged, changes
+
+
+def affected_teams(changes: pd.DataFrame) -> Dict[Tuple[str, str], Set[str]]:
+    teams = {}
+    for (division, season), group in changes.groupby(
+        ["division", "season"], observed=True
+    ):
+        teams[(division, season)] = set(group["home_team"]) | set(
+            group["away_team"]
+        )
+    return teams
+
+
+def ingest_fduk_incremental(
+    store_root: str | Path,
+    seasons: Iterable[int],
+    leagues: List[str],
+    columns: List[str] = None,
+    enrich: bool = False,
+    max_workers: int = 8,
+    retries: int = 3,
+    timeout: float = 30.0,
+    base_url: str = FDUK_BASE_URL,
+    cache_dir: str = None,
+    offline: bool = False,
+    max_cache_bytes: int = None,
+) -> Tuple[pd.DataFrame, FetchSummary]:
+    store_root = Path(store_root)
+    watermarks = load_watermarks(store_root)
+    seasons = list(seasons)
+    partitions = partitions_to_fetch(seasons, leagues, watermarks)
+    logger.info(
+        f"Fetching {len(partitions)} of {len(seasons) * len(leagues)} "
+        "partitions, the rest are closed and up to date"
+    )
+
+    column_mapping = load_column_mapping()
+    if columns is None:
+        columns = ["season"] + list(column_mapping.values())
+    keep_columns = columns + NATURAL_KEY + ENRICH_COLUMNS
+
+    results, summary = fetch_fduk_partitions(
+        partitions,
+        keep_columns,
+        column_mapping,
+        max_workers=max_workers,
+        retries=retries,
+        timeout=timeout,
+        base_url=base_url,
+        cache=make_cache(cache_dir, offline, max_cache_bytes),
+    )
+    digests = {
+        (record["league"], record["season"]): record["sha256"]
+        for record in summary.succeeded
+    }
+
+    all_changes = []
+    for index in sorted(results):
+        league, start_y = partitions[index]
+        _, season_tag = season_codes(start_y)
+        partition_key = _partition_key(league, season_tag)
+        digest = digests[(league, season_tag)]
+        now = time.strftime("%Y-%m-%dT%H:%M:%S")
+
+        # The same payload as last time, e.g. a 304 from the HTTP cache,
+        # cannot hold any changes, so it is not enriched or diffed
+        previous = watermarks.get(partition_key, {})
+        if previous.get("sha256") == digest:
+            watermarks[partition_key] = {
+                **previous,
+                "closed": is_closed_season(season_tag),
+                "checked_at": now,
+            }
+            logger.info(f"{partition_key}: unchanged")
+            continue
+
+        incoming = results[index]
+        if enrich:
+            incoming = _enrich_data_fduk(incoming)
+        incoming = apply_fduk_dtypes(incoming)
+
+        partition_dir = (
+            store_root / f"division={league}" / f"season={season_tag}"
+        )
+        if partition_dir.exists():
+            existing = load_table(
+                store_root, leagues=[league], seasons=[season_tag]
+            )
+        else:
+            existing = incoming.iloc[:0]
+
+        merged, changes = upsert_partition(existing, incoming)
+        if len(changes):
+            write_partitioned(apply_fduk_dtypes(merged), store_root)
+            all_changes.append(changes)
+        logger.info(
+            f"{partition_key}: "
+            f"{(changes['change'] == 'inserted').sum()} inserted, "
+            f"{(changes['change'] == 'updated').sum()} updated"
+        )
+
+        watermarks[partition_key] = {
+            "sha256": digest,
+            "last_date": str(merged["date"].max().date()),
+            "row_count": len(merged),
+            "previous_row_count": previous.get("row_count", 0),
+            "closed": is_closed_season(season_tag),
+            "updated_at": now,
+            "checked_at": now,
+        }
+
+    save_watermarks(store_root, watermarks)
+
+    if all_changes:
+        changes = pd.concat(all_changes, ignore_index=True)
+    else:
+        changes = pd.DataFrame(columns=NATURAL_KEY + ["season", "change"])
+    return changes, summary
@@ -1,101 +1,320 @@
+import hashlib
+import io
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
 import pandas as pd
-from typing import Iterable, List
+import requests
 from loguru import logger
-from collections import Counter
-import json
 
 from src.helper_functions import find_repo_root
+from src.seasons import season_start_year
+from src.http_cache import HTTPCache, is_closed_season
+from src.http_session import make_session
+from src.profiling import profiled, stage
 
+FDUK_BASE_URL = "https://www.football-data.co.uk/mmz4281"
+ENRICH_COLUMNS = ["division", "season", "home_team", "away_team"]
 
-def _enrich_data_fduk(data: pd.DataFrame) -> pd.DataFrame:
+
+@profiled("enrich")
+def _enrich_data_fduk(
+    data: pd.DataFrame,
+    partition_columns: List[str] = None,
+) -> pd.DataFrame:
     output_data = data.copy()
+    n = len(output_data)
+
+    keys = [
+        col
+        for col in partition_columns or ["division", "season"]
+        if col in output_data.columns
+    ]
+    if keys:
+        partition = (
+            output_data.groupby(keys, sort=False, dropna=False)
+            .ngroup()
+            .to_numpy()
+        )
+    else:
+        partition = np.zeros(n, dtype=int)
 
-    teams = list(output_data["home_team"].drop_duplicates())
-    half_way_point = len(teams) - 1
-
-    team_counter = Counter()
-    game_num_h = []
-    game_num_a = []
-    for _, row in output_data.iterrows():
-        team_counter[row["home_team"]] += 1
-        game_num_h.append(team_counter[row["home_team"]])
-        team_counter[row["away_team"]] += 1
-        game_num_a.append(team_counter[row["away_team"]])
-    output_data["game_num_h"] = game_num_h
-    output_data["game_num_a"] = game_num_a
-
-    output_data["season_half_h"] = 1
-    output_data["season_half_a"] = 1
-    output_data.loc[
-        output_data["game_num_h"] > half_way_point, "season_half_h"
-    ] = 2
-    output_data.loc[
-        output_data["game_num_a"] > half_way_point, "season_half_a"
-    ] = 2
+    # Long format with one row per (fixture, side), home before away, so
+    # a cumulative count per team follows the fixture order
+    teams, _ = pd.factorize(
+        np.column_stack(
+            [output_data["home_team"], output_data["away_team"]]
+        ).ravel()
+    )
+    sides = pd.DataFrame({"partition": np.repeat(partition, 2), "team": teams})
+    game_num = (
+        sides.groupby(["partition", "team"], sort=False).cumcount().to_numpy()
+        + 1
+    ).reshape(n, 2)
+    output_data["game_num_h"] = game_num[:, 0]
+    output_data["game_num_a"] = game_num[:, 1]
+
+    # Each league-season turns at the end of its own first round robin
+    num_teams = sides.groupby("partition")["team"].nunique().to_numpy()
+    half_way_point = num_teams[partition] - 1
+    output_data["season_half_h"] = np.where(
+        game_num[:, 0] > half_way_point, 2, 1
+    )
+    output_data["season_half_a"] = np.where(
+        game_num[:, 1] > half_way_point, 2, 1
+    )
 
     return output_data
 
 
-def get_data_fduk(
-    seasons: Iterable[int],
-    leagues: List[str],
-    columns: List[str] | None = None,
-    enrich: bool = False,
-) -> None:
+def season_codes(start_y: int) -> Tuple[str, str]:
+    start_y_str = ("0" + str(start_y))[-2:]
+    end_y_str = ("0" + str(start_y + 1))[-2:]
+    return start_y_str + end_y_str, start_y_str + "_" + end_y_str
 
-    repo_root = find_repo_root()
-    config_path = repo_root / "config" / "config.json"
-    with open(config_path, "r") as f:
-        column_mapping = json.load(f)
 
-    if columns is None:
-        columns = ["season"] + list(column_mapping.values())
+class FetchSummary:
+    def __init__(self):
+        self.succeeded = []
+        self.failed = []
+        self.started = time.perf_counter()
+        self.elapsed = None
 
-    data_list = []
-    for start_y in seasons:
-        start_y_str = ("0" + str(start_y))[-2:]
-        end_y_str = ("0" + str(start_y + 1))[-2:]
-        season = start_y_str + end_y_str
-        season_tag = start_y_str + "_" + end_y_str
-
-        for league in leagues:
-            url = (
-                "https://www.football-data.co.uk/mmz4281/"
-                + f"{season}/{league}.csv"
+    def record_success(
+        self,
+        league: str,
+        season_tag: str,
+        rows: int,
+        source: str,
+        sha256: str = None,
+    ):
+        self.succeeded.append(
+            {
+                "league": league,
+                "season": season_tag,
+                "rows": rows,
+                "source": source,
+                "sha256": sha256,
+            }
+        )
+
+    def record_failure(self, league: str, season_tag: str, error: str):
+        self.failed.append(
+            {"league": league, "season": season_tag, "error": error}
+        )
+
+    def finish(self) -> "FetchSummary":
+        self.elapsed = time.perf_counter() - self.started
+        # Downloads complete in any order, the summary should not
+        for records in (self.succeeded, self.failed):
+            records.sort(
+                key=lambda r: (season_start_year(r["season"]), r["league"])
             )
-            try:
-                data = pd.read_csv(url)
-                data = data.rename(columns=column_mapping)
-                data["season"] = season_tag
+        return self
+
+    def to_dict(self) -> Dict:
+        sources = [record["source"] for record in self.succeeded]
+        return {
+            "num_succeeded": len(self.succeeded),
+            "num_downloaded": sources.count("network"),
+            "num_not_modified": sources.count("not_modified"),
+            "num_from_cache": sources.count("cache"),
+            "num_failed": len(self.failed),
+            "elapsed_seconds": self.elapsed,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+        }
+
+
+def fetch_fduk_csv(
+    session: requests.Session,
+    url: str,
+    timeout: float = 30.0,
+    cache: HTTPCache = None,
+    closed: bool = False,
+) -> Tuple[bytes, str]:
+    if cache is not None:
+        return cache.get(session, url, timeout=timeout, closed=closed)
+    response = session.get(url, timeout=timeout)
+    response.raise_for_status()
+    return response.content, "network"
+
+
+def _parse_fduk_csv(
+    content: bytes,
+    league: str,
+    season_tag: str,
+    column_mapping: Dict[str, str],
+    keep_columns: List[str],
+) -> pd.DataFrame:
+    data = pd.read_csv(io.BytesIO(content))
+    data = data.rename(columns=column_mapping)
+    data["season"] = season_tag
+    if "division" not in data.columns:
+        data["division"] = league
+
+    include_columns = [
+        col for col in dict.fromkeys(keep_columns) if col in data.columns
+    ]
+    return data[include_columns]
+
+
+def load_column_mapping() -> Dict[str, str]:
+    config_path = find_repo_root() / "config" / "config.json"
+    with open(config_path, "r") as f:
+        return json.load(f)
 
-                include_columns = [
-                    col for col in columns if col in data.columns
-                ]
 
-                data = data[include_columns]
+def make_cache(
+    cache_dir: str = None, offline: bool = False, max_cache_bytes: int = None
+) -> HTTPCache | None:
+    if cache_dir is None and not offline:
+        return None
+    return HTTPCache(
+        cache_dir or "data/http_cache",
+        max_bytes=max_cache_bytes,
+        offline=offline,
+    )
 
-                if enrich:
-                    data = _enrich_data_fduk(data)
 
-                data_list.append(data)
+def fetch_fduk_partitions(
+    partitions: List[Tuple[str, int]],
+    keep_columns: List[str],
+    column_mapping: Dict[str, str],
+    max_workers: int = 8,
+    retries: int = 3,
+    timeout: float = 30.0,
+    base_url: str = FDUK_BASE_URL,
+    cache: HTTPCache = None,
+) -> Tuple[Dict[int, pd.DataFrame], FetchSummary]:
+    targets = []
+    for league, start_y in partitions:
+        season, season_tag = season_codes(start_y)
+        url = f"{base_url.rstrip('/')}/{season}/{league}.csv"
+        targets.append((league, season_tag, url))
 
-                logger.info(
-                    f"Sucessfully loaded data for {league} in {season_tag}"
+    summary = FetchSummary()
+    results = {}
+    sources = {}
+    session = make_session(pool_size=max_workers, retries=retries)
+    # The stage wraps the whole fetch phase on the calling thread rather
+    # than each download, which run concurrently in the workers
+    with (
+        stage("download", items=len(targets)),
+        session,
+        ThreadPoolExecutor(max_workers=max_workers) as executor,
+    ):
+        futures = {
+            executor.submit(
+                fetch_fduk_csv,
+                session,
+                url,
+                timeout,
+                cache,
+                is_closed_season(season_tag),
+            ): index
+            for index, (_, season_tag, url) in enumerate(targets)
+        }
+        # Partitions are parsed as they arrive; callers reassemble them in
+        # request order from the returned indices
+        for future in as_completed(futures):
+            index = futures[future]
+            league, season_tag, _ = targets[index]
+            try:
+                content, sources[index] = future.result()
+                results[index] = _parse_fduk_csv(
+                    content,
+                    league,
+                    season_tag,
+                    column_mapping,
+                    keep_columns,
                 )
             except Exception as e:
-                logger.info(
+                summary.record_failure(league, season_tag, str(e))
+                logger.warning(
                     f"Error loading data for {league} in {season_tag}: {e}"
                 )
                 continue
 
-    data_full = pd.concat(data_list).reset_index()
+            summary.record_success(
+                league,
+                season_tag,
+                len(results[index]),
+                sources[index],
+                hashlib.sha256(content).hexdigest(),
+            )
+            logger.info(
+                f"Sucessfully loaded data for {league} in {season_tag}"
+            )
+
+    summary.finish()
+    if cache is not None:
+        cache.save()
+    logger.info(
+        f"Loaded {len(summary.succeeded)} of {len(targets)} partitions "
+        f"in {summary.elapsed:.1f}s, "
+        f"{list(sources.values()).count('network')} downloaded, "
+        f"{len(summary.failed)} failed"
+    )
 
-    reorder_columns = [col for col in columns if col in data_full.columns] + [
-        "game_num_h",
-        "game_num_a",
-        "season_half_h",
-        "season_half_a",
-    ]
+    return results, summary
+
+
+def get_data_fduk(
+    seasons: Iterable[int],
+    leagues: List[str],
+    columns: List[str] | None = None,
+    enrich: bool = False,
+    max_workers: int = 8,
+    retries: int = 3,
+    timeout: float = 30.0,
+    base_url: str = FDUK_BASE_URL,
+    return_summary: bool = False,
+    cache_dir: str = None,
+    offline: bool = False,
+    max_cache_bytes: int = None,
+) -> pd.DataFrame | Tuple[pd.DataFrame, FetchSummary]:
+
+    column_mapping = load_column_mapping()
+
+    if columns is None:
+        columns = ["season"] + list(column_mapping.values())
+
+    # Enrichment runs once over every partition, so it needs the keys and
+    # teams even when they are not requested
+    keep_columns = columns + (ENRICH_COLUMNS if enrich else [])
+
+    results, summary = fetch_fduk_partitions(
+        [(league, start_y) for start_y in seasons for league in leagues],
+        keep_columns,
+        column_mapping,
+        max_workers=max_workers,
+        retries=retries,
+        timeout=timeout,
+        base_url=base_url,
+        cache=make_cache(cache_dir, offline, max_cache_bytes),
+    )
+    if not results:
+        raise ValueError(f"No data could be loaded: {summary.failed}")
+
+    data_full = pd.concat(
+        [results[index] for index in sorted(results)]
+    ).reset_index()
+
+    reorder_columns = [col for col in columns if col in data_full.columns]
+    if enrich:
+        data_full = _enrich_data_fduk(data_full)
+        reorder_columns += [
+            "game_num_h",
+            "game_num_a",
+            "season_half_h",
+            "season_half_a",
+        ]
     data_full = data_full[reorder_columns]
 
+    if return_summary:
+        return data_full, summary
     return data_full
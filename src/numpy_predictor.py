@@ -0,0 +1,115 @@
+import json
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 0.5 * (1.0 + np.tanh(0.5 * x))
+
+
+ACTIVATIONS = {"sigmoid": _sigmoid, "linear": lambda x: x, None: lambda x: x}
+
+
+class NumpyPredictor:
+    def __init__(self, path: str | Path, mmap: bool = True):
+        path = Path(path)
+        mmap_mode = "r" if mmap else None
+
+        with open(path / "metadata.json", "r") as f:
+            self.metadata = json.load(f)
+
+        self.kernels = [
+            np.load(path / f"kernel_{i}.npy", mmap_mode=mmap_mode)
+            for i in range(self.metadata["num_layers"])
+        ]
+        self.biases = [
+            np.load(path / f"bias_{i}.npy", mmap_mode=mmap_mode)
+            for i in range(self.metadata["num_layers"])
+        ]
+        self.batch_norm = {
+            name: np.load(path / f"batch_norm_{name}.npy")
+            for name in ["gamma", "beta"]
+        }
+        self.feature_mean = np.load(path / "feature_mean.npy")
+        self.feature_variance = np.load(path / "feature_variance.npy")
+        self.activations = [
+            ACTIVATIONS[name] for name in self.metadata["activations"]
+        ]
+
+    @property
+    def feature_names(self) -> List[str]:
+        return self.metadata["feature_names"]
+
+    @property
+    def num_samples(self) -> int:
+        return self.metadata["num_samples"]
+
+    def feature_matrix(
+        self, X: Dict[str, np.ndarray] | pd.DataFrame | np.ndarray
+    ) -> np.ndarray:
+        if isinstance(X, np.ndarray):
+            return np.ascontiguousarray(X, dtype=np.float32)
+
+        return np.column_stack(
+            [
+                np.asarray(X[name], dtype=np.float32)
+                for name in self.feature_names
+            ]
+        )
+
+    def normalise(
+        self, features: np.ndarray, use_batch_statistics: bool = True
+    ) -> np.ndarray:
+        # Batch statistics match model_inference, which samples with
+        # training=True. Small slates should use the training population
+        # statistics, which is what the model was fitted against.
+        if use_batch_statistics:
+            mean = features.mean(axis=0)
+            variance = features.var(axis=0)
+        else:
+            mean = self.feature_mean
+            variance = self.feature_variance
+
+        scale = self.batch_norm["gamma"] / np.sqrt(
+            variance + self.metadata["batch_norm_epsilon"]
+        )
+        return (features - mean) * scale + self.batch_norm["beta"]
+
+    def predict(
+        self,
+        X: Dict[str, np.ndarray] | pd.DataFrame | np.ndarray,
+        num_samples: int = None,
+        use_batch_statistics: bool = True,
+        sample_batch_size: int = None,
+    ) -> np.ndarray:
+        if num_samples is None:
+            num_samples = self.num_samples
+        if num_samples > self.num_samples:
+            raise ValueError(
+                f"Requested {num_samples} samples but the weight bank only "
+                f"holds {self.num_samples}"
+            )
+        if sample_batch_size is None:
+            sample_batch_size = num_samples
+
+        features = self.normalise(
+            self.feature_matrix(X), use_batch_statistics
+        ).astype(np.float32)
+
+        sample_batches = []
+        for start in range(0, num_samples, sample_batch_size):
+            stop = min(start + sample_batch_size, num_samples)
+            outputs = features
+            for kernel, bias, activation in zip(
+                self.kernels, self.biases, self.activations
+            ):
+                outputs = activation(
+                    np.matmul(outputs, kernel[start:stop].astype(np.float32))
+                    + bias[start:stop, np.newaxis, :].astype(np.float32)
+                )
+            sample_batches.append(outputs[..., 0])
+
+        return np.concatenate(sample_batches, axis=0)
@@ -0,0 +1,217 @@
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+import tensorflow_probability as tfp
+import tf_keras as tfk
+from loguru import logger
+
+from src.bayesian_nn import (
+    create_bnn_model,
+    extract_feature_matrix,
+    extract_features_and_target,
+    layer_prior_posterior,
+    make_dataset,
+    posterior_distributions,
+)
+from src.helper_functions import EpochProgressBar
+from src.priors_posteriors import make_fixed_prior
+
+tfd = tfp.distributions
+
+
+def latest_version(models_dir: str | Path, name: str) -> int | None:
+    model_path = Path(models_dir) / name
+    if not model_path.exists():
+        return None
+
+    versions = [
+        int(path.name[1:])
+        for path in model_path.iterdir()
+        if path.is_dir() and path.name.startswith("v")
+    ]
+    return max(versions) if versions else None
+
+
+def save_prior(
+    distributions: List[tfd.Distribution], path: str | Path
+) -> None:
+    arrays = {}
+    for index, distribution in enumerate(distributions):
+        arrays[f"loc_{index}"] = distribution.mean().numpy()
+        if isinstance(distribution, tfd.MultivariateNormalDiag):
+            arrays[f"scale_diag_{index}"] = distribution.stddev().numpy()
+        else:
+            arrays[f"scale_tril_{index}"] = (
+                distribution.scale.to_dense().numpy()
+            )
+    np.savez(path, **arrays)
+
+
+def load_prior(path: str | Path) -> List[tfd.Distribution]:
+    arrays = np.load(path)
+    distributions = []
+    for index in range(len(arrays.files) // 2):
+        loc = arrays[f"loc_{index}"]
+        if f"scale_diag_{index}" in arrays:
+            distributions.append(
+                tfd.MultivariateNormalDiag(
+                    loc=loc, scale_diag=arrays[f"scale_diag_{index}"]
+                )
+            )
+        else:
+            distributions.append(
+                tfd.MultivariateNormalTriL(
+                    loc=loc, scale_tril=arrays[f"scale_tril_{index}"]
+                )
+            )
+    return distributions
+
+
+def save_model_version(
+    model: tfk.Model,
+    config: Dict[str, Any],
+    models_dir: str | Path,
+    name: str,
+    prior: List[tfd.Distribution] = None,
+) -> Path:
+    version = (latest_version(models_dir, name) or 0) + 1
+    version_path = Path(models_dir) / name / f"v{version}"
+    version_path.mkdir(parents=True)
+
+    model.save_weights(str(version_path / "weights"))
+    if prior is not None:
+        save_prior(prior, version_path / "prior.npz")
+
+    config = {
+        **config,
+        "prior": None if prior is None else "prior.npz",
+        "version": version,
+        "created_at": datetime.now().isoformat(),
+    }
+    with open(version_path / "config.json", "w") as f:
+        json.dump(config, f, indent=4)
+
+    logger.info(f"Saved {name} v{version} to {version_path}")
+
+    return version_path
+
+
+def _build_model(
+    config: Dict[str, Any], n_train: int, prior: callable = None
+) -> tfk.Model:
+    default_prior, posterior = layer_prior_posterior(
+        config["layer_type"],
+        config["prior_scale"],
+        config["posterior"],
+        config["posterior_rank"],
+    )
+    model = create_bnn_model(
+        feature_names=config["feature_names"],
+        hidden_units=config["hidden_units"],
+        prior=prior or default_prior,
+        posterior=posterior,
+        n_train=n_train,
+        kl_use_exact=config["kl_use_exact"],
+        layer_type=config["layer_type"],
+        packed_inputs=config["packed_inputs"],
+    )
+    if config.get("freeze_batch_norm", False):
+        # A frozen layer always normalises with its moving statistics
+        for layer in model.layers:
+            if isinstance(layer, tfk.layers.BatchNormalization):
+                layer.trainable = False
+
+    return model
+
+
+def load_model_version(
+    models_dir: str | Path, name: str, version: int = None
+) -> Tuple[tfk.Model, Dict[str, Any]]:
+    if version is None:
+        version = latest_version(models_dir, name)
+    if version is None:
+        raise FileNotFoundError(f"No saved versions of {name} in {models_dir}")
+
+    version_path = Path(models_dir) / name / f"v{version}"
+    with open(version_path / "config.json", "r") as f:
+        config = json.load(f)
+
+    # Updated versions were fitted against the previous posterior, so they
+    # are rebuilt with that prior and the KL weight of their own update
+    prior = None
+    if config.get("prior") is not None:
+        prior = make_fixed_prior(load_prior(version_path / config["prior"]))
+    model = _build_model(config, config["n_train"], prior=prior)
+    model.load_weights(str(version_path / "weights")).expect_partial()
+
+    return model, config
+
+
+def update_posterior(
+    models_dir: str | Path,
+    name: str,
+    new_data: pd.DataFrame,
+    num_epochs: int = 10,
+    learning_rate: float = 0.001,
+    num_batches: int = 1,
+    version: int = None,
+) -> Tuple[tfk.Model, Path]:
+    previous_model, config = load_model_version(models_dir, name, version)
+    if config["layer_type"] != "dense_variational":
+        raise ValueError(
+            f"Posterior updates need dense_variational layers, {name} "
+            f"v{config['version']} uses {config['layer_type']}"
+        )
+
+    new_data = new_data.drop(
+        columns=[col for col in ["season", "bookies_prob"] if col in new_data]
+    )
+    extract = (
+        extract_feature_matrix
+        if config["packed_inputs"]
+        else extract_features_and_target
+    )
+    X_new, y_new = extract(new_data, config["feature_names"], "h_win")
+    n_new = len(y_new)
+
+    # The previous posterior becomes the prior, so only the new fixtures
+    # need to be seen, weighted against everything already learnt
+    prior = posterior_distributions(previous_model)
+    # A matchweek is far too small a batch to normalise with, and the prior
+    # was fitted on inputs scaled by the training population statistics, so
+    # updated versions keep batch normalisation frozen
+    config = {**config, "freeze_batch_norm": True}
+    model = _build_model(config, n_new, prior=make_fixed_prior(prior))
+    model.set_weights(previous_model.get_weights())
+
+    model.compile(
+        optimizer=tfk.optimizers.legacy.RMSprop(learning_rate=learning_rate),
+        loss=tfk.losses.MeanSquaredError(),
+        metrics=[tfk.metrics.MeanSquaredError()],
+    )
+    model.fit(
+        make_dataset(X_new, y_new, n_new, int(np.ceil(n_new / num_batches))),
+        epochs=num_epochs,
+        callbacks=[EpochProgressBar()],
+        verbose=0,
+    )
+
+    version_path = save_model_version(
+        model,
+        {
+            **config,
+            "n_train": n_new,
+            "n_seen": config.get("n_seen", config["n_train"]) + n_new,
+            "parent_version": config["version"],
+            "update_epochs": num_epochs,
+        },
+        models_dir,
+        name,
+        prior=prior,
+    )
+
+    return model, version_path
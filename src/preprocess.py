@@ -1,9 +1,31 @@
 import pandas as pd
-from typing import List
+from pathlib import Path
+from typing import List, Tuple
 from loguru import logger
 from src.helper_functions import get_train_test
+from src.ingestion import load_column_mapping
+from src.profiling import profiled
+from src.storage import load_fduk
 
 
+def load_ingested_data(
+    path: str | Path,
+    leagues: List[str] = None,
+    seasons: List[str] = None,
+    season_range: Tuple[str, str] = None,
+) -> pd.DataFrame:
+    # The store uses the config/config.json names while create_dataframe
+    # works on the lowercase football-data.co.uk ones
+    data = load_fduk(
+        path, leagues=leagues, seasons=seasons, season_range=season_range
+    )
+    lowercase = {
+        column: raw.lower() for raw, column in load_column_mapping().items()
+    }
+    return data.rename(columns=lowercase)
+
+
+@profiled("create_dataframe")
 def create_dataframe(
     data: pd.DataFrame, exclude_seasons: List[str] = None
 ) -> pd.DataFrame:
@@ -113,7 +135,9 @@ def create_dataframe(
 
     all_h1_data = pd.concat([home_h1_data, away_h1_data])
     stats_h1 = (
-        all_h1_data.groupby(["season", "div", "team"]).mean().reset_index()
+        all_h1_data.groupby(["season", "div", "team"], observed=True)
+        .mean()
+        .reset_index()
     )
     logger.info("Home and away dataframes succesfully combined and grouped")
 
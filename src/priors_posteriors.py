@@ -1,3 +1,5 @@
+from typing import List, Tuple
+
 import tensorflow as tf
 import tf_keras as tfk
 import tensorflow_probability as tfp
@@ -18,17 +20,190 @@ def std_normal_prior(kernel_size: int, bias_size: int, dtype=None) -> callable:
     return prior_model
 
 
+def make_normal_prior(scale: float = 1.0) -> callable:
+    def normal_prior(kernel_size: int, bias_size: int, dtype=None):
+        n = kernel_size + bias_size
+        prior_model = tfk.Sequential(
+            [
+                tfp.layers.DistributionLambda(
+                    lambda t: tfp.distributions.MultivariateNormalDiag(
+                        loc=tf.zeros(n), scale_diag=scale * tf.ones(n)
+                    )
+                )
+            ],
+            name="prior_seq",
+        )
+        return prior_model
+
+    return normal_prior
+
+
+def make_normal_layer_prior(scale: float = 1.0) -> callable:
+    # Flipout and local reparameterization layers build their prior from the
+    # kernel shape instead of the flattened weight count
+    def normal_layer_prior(dtype, shape, name, trainable, add_variable_fn):
+        return tfp.distributions.Independent(
+            tfp.distributions.Normal(
+                loc=tf.zeros(shape, dtype), scale=scale * tf.ones(shape, dtype)
+            ),
+            reinterpreted_batch_ndims=tf.size(shape),
+        )
+
+    return normal_layer_prior
+
+
+def make_fixed_prior(
+    distributions: List[tfp.distributions.Distribution],
+) -> callable:
+    # Layers are built in order, so each call takes the next distribution
+    remaining = iter(distributions)
+
+    def fixed_prior(kernel_size: int, bias_size: int, dtype=None):
+        distribution = next(remaining)
+        prior_model = tfk.Sequential(
+            [tfp.layers.DistributionLambda(lambda t: distribution)],
+            name="prior_seq",
+        )
+        return prior_model
+
+    return fixed_prior
+
+
+def replica_initializer(stddev: float, seed: int = None) -> callable:
+    # Every slice along the leading replica axis draws with its own seed, so
+    # ensemble replicas start from different points
+    def initializer(shape, dtype=None):
+        return tf.stack(
+            [
+                tfk.initializers.RandomNormal(
+                    stddev=stddev, seed=None if seed is None else seed + k
+                )(shape[1:], dtype=dtype)
+                for k in range(shape[0])
+            ]
+        )
+
+    return initializer
+
+
+# Posteriors take a batch_shape so that an ensemble keeps every replica's
+# parameters in one variable and samples them in one op
 def std_normal_posterior(
-    kernel_size: int, bias_size: int, dtype=None
+    kernel_size: int,
+    bias_size: int,
+    dtype=None,
+    batch_shape: Tuple[int, ...] = (),
+    seed: int = None,
 ) -> callable:
     n = kernel_size + bias_size
     posterior_model = tfk.Sequential(
         [
             tfp.layers.VariableLayer(
-                tfp.layers.MultivariateNormalTriL.params_size(n), dtype=dtype
+                [
+                    *batch_shape,
+                    tfp.layers.MultivariateNormalTriL.params_size(n),
+                ],
+                dtype=dtype,
+                initializer=(
+                    replica_initializer(0.1, seed) if batch_shape else "zeros"
+                ),
             ),
             tfp.layers.MultivariateNormalTriL(n),
         ],
         name="posterior_seq",
     )
     return posterior_model
+
+
+def mean_field_posterior(
+    kernel_size: int,
+    bias_size: int,
+    dtype=None,
+    batch_shape: Tuple[int, ...] = (),
+    seed: int = None,
+) -> callable:
+    n = kernel_size + bias_size
+    posterior_model = tfk.Sequential(
+        [
+            tfp.layers.VariableLayer(
+                [*batch_shape, 2 * n],
+                dtype=dtype,
+                initializer=(
+                    replica_initializer(0.1, seed) if batch_shape else "zeros"
+                ),
+            ),
+            tfp.layers.DistributionLambda(
+                lambda t: tfp.distributions.MultivariateNormalDiag(
+                    loc=t[..., :n],
+                    scale_diag=1e-5 + tf.nn.softplus(t[..., n:]),
+                )
+            ),
+        ],
+        name="posterior_seq",
+    )
+    return posterior_model
+
+
+def make_low_rank_posterior(rank: int = 2) -> callable:
+    def low_rank_normal(t: tf.Tensor, n: int):
+        # The scale is diag(d) + U U^T, so the covariance keeps `rank`
+        # correlated directions on top of a mean-field diagonal.
+        factor = tf.reshape(
+            t[..., 2 * n :], tf.concat([tf.shape(t)[:-1], [n, rank]], axis=0)
+        )
+        scale = tf.linalg.LinearOperatorLowRankUpdate(
+            tf.linalg.LinearOperatorDiag(
+                1e-5 + tf.nn.softplus(t[..., n : 2 * n]),
+                is_positive_definite=True,
+            ),
+            u=factor,
+        )
+        return tfp.distributions.MultivariateNormalLinearOperator(
+            loc=t[..., :n], scale=scale
+        )
+
+    def low_rank_posterior(
+        kernel_size: int,
+        bias_size: int,
+        dtype=None,
+        batch_shape: Tuple[int, ...] = (),
+        seed: int = None,
+    ):
+        n = kernel_size + bias_size
+        posterior_model = tfk.Sequential(
+            [
+                # A zero factor has zero gradient, so it needs a random start
+                tfp.layers.VariableLayer(
+                    [*batch_shape, (rank + 2) * n],
+                    dtype=dtype,
+                    initializer=(
+                        replica_initializer(0.01, seed)
+                        if batch_shape
+                        else tfk.initializers.RandomNormal(stddev=0.01)
+                    ),
+                ),
+                tfp.layers.DistributionLambda(lambda t: low_rank_normal(t, n)),
+            ],
+            name="posterior_seq",
+        )
+        return posterior_model
+
+    return low_rank_posterior
+
+
+POSTERIORS = {
+    "std_normal": std_normal_posterior,
+    "mean_field": mean_field_posterior,
+    "low_rank": make_low_rank_posterior,
+}
+
+
+def get_posterior(name: str, rank: int = 2) -> callable:
+    if name not in POSTERIORS:
+        raise ValueError(
+            f"Unknown posterior '{name}', expected one of {list(POSTERIORS)}"
+        )
+
+    if name == "low_rank":
+        return make_low_rank_posterior(rank)
+
+    return POSTERIORS[name]
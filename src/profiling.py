@@ -0,0 +1,227 @@
+import cProfile
+import functools
+import io
+import json
+import pstats
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+from loguru import logger
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def current_rss_mb() -> float | None:
+    # Unlike ru_maxrss, which is a high-water mark for the whole process,
+    # this can go down again, so it shows what a single stage allocated
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+    except OSError:
+        return None
+    return pages * resource.getpagesize() / 2**20
+
+
+class Profiler:
+    def __init__(
+        self,
+        enabled: bool = True,
+        profile_stage: str = None,
+        profile_dir: str | Path = "profiles",
+        tf_profile: bool = False,
+    ):
+        self.enabled = enabled
+        self.profile_stage = profile_stage
+        self.profile_dir = Path(profile_dir)
+        self.tf_profile = tf_profile
+        self.stages = {}
+        self.epochs = []
+        self._lock = threading.Lock()
+        self._open = {}
+
+    def stage(self, name: str, items: int = None):
+        if not self.enabled:
+            return nullcontext()
+        return self._stage(name, items)
+
+    @contextmanager
+    def _stage(self, name: str, items: int = None):
+        # cProfile and the TF profiler are process wide, so only the main
+        # thread captures; worker threads are still timed
+        capture = (
+            name == self.profile_stage
+            and threading.current_thread() is threading.main_thread()
+        )
+        if capture:
+            profile = self._start_capture(name)
+
+        self._enter(name)
+        try:
+            yield
+        finally:
+            self._exit(name, items)
+            if capture:
+                self._stop_capture(name, profile)
+
+    def _enter(self, name: str) -> None:
+        with self._lock:
+            if name in self._open:
+                self._open[name]["depth"] += 1
+                return
+            self._open[name] = {
+                "depth": 1,
+                "wall_start": time.perf_counter(),
+                "cpu_start": time.process_time(),
+                "rss_before": current_rss_mb(),
+            }
+
+    def _exit(self, name: str, items: int = None) -> None:
+        with self._lock:
+            # Repeated stages, e.g. one per partition, accumulate
+            record = self.stages.setdefault(
+                name,
+                {
+                    "calls": 0,
+                    "wall_time": 0.0,
+                    "cpu_time": 0.0,
+                    "process_peak_rss_mb": 0.0,
+                },
+            )
+            record["calls"] += 1
+            if items is not None:
+                record["items"] = record.get("items", 0) + items
+
+            # Overlapping calls from several threads count the elapsed time
+            # from the first entering to the last leaving once
+            span = self._open[name]
+            span["depth"] -= 1
+            if span["depth"] > 0:
+                return
+            del self._open[name]
+
+            record["wall_time"] += time.perf_counter() - span["wall_start"]
+            record["cpu_time"] += time.process_time() - span["cpu_start"]
+            record["process_peak_rss_mb"] = max(
+                record["process_peak_rss_mb"], peak_rss_mb()
+            )
+            # Current RSS is only readable where /proc exists
+            rss_after = current_rss_mb()
+            if rss_after is not None and span["rss_before"] is not None:
+                record["rss_mb"] = max(record.get("rss_mb", 0.0), rss_after)
+                record["rss_growth_mb"] = (
+                    record.get("rss_growth_mb", 0.0)
+                    + rss_after
+                    - span["rss_before"]
+                )
+            if "items" in record:
+                record["items_per_second"] = (
+                    record["items"] / record["wall_time"]
+                )
+
+    def _start_capture(self, name: str):
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        if self.tf_profile:
+            import tensorflow as tf
+
+            tf.profiler.experimental.start(str(self.profile_dir / name))
+            return None
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def _stop_capture(self, name: str, profile: cProfile.Profile) -> None:
+        if self.tf_profile:
+            import tensorflow as tf
+
+            tf.profiler.experimental.stop()
+            logger.info(f"TF profile for {name} in {self.profile_dir}")
+            return
+        profile.disable()
+        profile_path = self.profile_dir / f"{name}.prof"
+        profile.dump_stats(profile_path)
+
+        summary = io.StringIO()
+        pstats.Stats(profile, stream=summary).sort_stats(
+            "cumulative"
+        ).print_stats(25)
+        (self.profile_dir / f"{name}.txt").write_text(summary.getvalue())
+        logger.info(f"cProfile capture for {name} saved to {profile_path}")
+
+    def record_epochs(self, history: Dict[str, list]) -> None:
+        if not self.enabled or "step_time" not in history:
+            return
+        # Input times are only there when pipeline timing was asked for
+        step_times = history["step_time"]
+        input_times = history.get("input_time", [None] * len(step_times))
+        self.epochs = [
+            {"epoch": epoch, "input_time": input_time, "step_time": step}
+            for epoch, (input_time, step) in enumerate(
+                zip(input_times, step_times)
+            )
+        ]
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "stages": self.stages,
+            "epochs": self.epochs,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+    def stage_metrics(self) -> Dict[str, float]:
+        metrics = {}
+        for name, record in self.stages.items():
+            metrics[f"{name}_wall_time"] = record["wall_time"]
+            metrics[f"{name}_cpu_time"] = record["cpu_time"]
+            if "items_per_second" in record:
+                metrics[f"{name}_items_per_second"] = record[
+                    "items_per_second"
+                ]
+        return metrics
+
+    def save(self, path: str | Path) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+        return path
+
+
+# The active profiler is module level so deep pipeline code can mark stages
+# without a profiler being threaded through every call
+_PROFILER = Profiler(enabled=False)
+
+
+def get_profiler() -> Profiler:
+    return _PROFILER
+
+
+def set_profiler(profiler: Profiler | None) -> None:
+    global _PROFILER
+    _PROFILER = profiler or Profiler(enabled=False)
+
+
+def stage(name: str, items: int = None):
+    return _PROFILER.stage(name, items)
+
+
+def profiled(name: str) -> Callable:
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _PROFILER.enabled:
+                return func(*args, **kwargs)
+            with _PROFILER.stage(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
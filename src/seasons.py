@@ -0,0 +1,4 @@
+def season_start_year(season: str) -> int:
+    # Season tags look like "15_16"; anything from the 90s is 19xx
+    start = int(season[:2])
+    return 1900 + start if start >= 90 else 2000 + start
@@ -0,0 +1,236 @@
+import json
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+import numpy as np
+from loguru import logger
+
+from src.numpy_predictor import NumpyPredictor
+
+
+class LatencyStats:
+    def __init__(self, window: int = 10000):
+        self._latencies = deque(maxlen=window)
+        self._batch_sizes = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self.num_requests = 0
+        self.num_batches = 0
+
+    def record_batch(self, latencies: List[float]):
+        with self._lock:
+            self._latencies.extend(latencies)
+            self._batch_sizes.append(len(latencies))
+            self.num_requests += len(latencies)
+            self.num_batches += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            latencies = np.array(self._latencies)
+            batch_sizes = np.array(self._batch_sizes)
+            num_requests = self.num_requests
+            num_batches = self.num_batches
+
+        elapsed = time.perf_counter() - self._started
+        if len(latencies) == 0:
+            p50_ms, p99_ms = None, None
+        else:
+            p50_ms, p99_ms = np.percentile(latencies, [50, 99]) * 1000
+
+        return {
+            "num_requests": num_requests,
+            "num_batches": num_batches,
+            "mean_batch_size": (
+                float(batch_sizes.mean()) if num_batches else None
+            ),
+            "p50_latency_ms": p50_ms,
+            "p99_latency_ms": p99_ms,
+            "throughput_per_second": num_requests / elapsed,
+        }
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        predictor: NumpyPredictor,
+        max_batch_size: int = 256,
+        max_latency_ms: float = 5.0,
+        num_samples: int = None,
+        quantiles: Tuple[float, ...] = (0.05, 0.5, 0.95),
+    ):
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000
+        self.num_samples = num_samples
+        self.quantiles = list(quantiles)
+        self.stats = LatencyStats()
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, features: np.ndarray) -> Future:
+        future = Future()
+        self._queue.put((time.perf_counter(), features, future))
+        return future
+
+    def _collect_batch(self) -> List[Tuple[float, np.ndarray, Future]]:
+        batch = [self._queue.get()]
+        deadline = batch[0][0] + self.max_latency
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            try:
+                features = np.stack([item[1] for item in batch])
+                # Training population statistics, so a fixture's prediction
+                # does not depend on whichever requests share its batch
+                sampled_probs = self.predictor.predict(
+                    features,
+                    num_samples=self.num_samples,
+                    use_batch_statistics=False,
+                )
+                means = sampled_probs.mean(axis=0)
+                variances = sampled_probs.var(axis=0)
+                quantiles = np.quantile(
+                    sampled_probs, self.quantiles, axis=0
+                ).astype(float)
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            finished = time.perf_counter()
+            for i, (_, _, future) in enumerate(batch):
+                future.set_result(
+                    {
+                        "mean": float(means[i]),
+                        "variance": float(variances[i]),
+                        "quantiles": dict(
+                            zip(map(str, self.quantiles), quantiles[:, i])
+                        ),
+                    }
+                )
+            self.stats.record_batch([finished - item[0] for item in batch])
+
+
+class PredictionServer(ThreadingHTTPServer):
+    # The default listen backlog of 5 resets connections when a matchday
+    # burst arrives faster than the accept loop drains it
+    def __init__(
+        self,
+        server_address: Tuple[str, int],
+        handler: type,
+        request_queue_size: int = 512,
+    ):
+        self.request_queue_size = request_queue_size
+        super().__init__(server_address, handler)
+
+
+def _make_handler(batcher: MicroBatcher, timeout: float) -> type:
+    feature_names = batcher.predictor.feature_names
+
+    class PredictionHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status: int, body: Dict | List):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path == "/metrics":
+                self._send_json(200, batcher.stats.snapshot())
+            elif self.path == "/health":
+                self._send_json(200, {"status": "ok"})
+            else:
+                self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self._send_json(404, {"error": f"Unknown path {self.path}"})
+                return
+
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length))
+                fixtures = payload if isinstance(payload, list) else [payload]
+                futures = [
+                    batcher.submit(
+                        np.array(
+                            [fixture[name] for name in feature_names],
+                            dtype=np.float32,
+                        )
+                    )
+                    for fixture in fixtures
+                ]
+            except (KeyError, ValueError, TypeError) as e:
+                self._send_json(400, {"error": f"Invalid payload: {e}"})
+                return
+
+            try:
+                results = [
+                    future.result(timeout=timeout) for future in futures
+                ]
+            except Exception as e:
+                self._send_json(500, {"error": str(e)})
+                return
+
+            self._send_json(
+                200, results if isinstance(payload, list) else results[0]
+            )
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    return PredictionHandler
+
+
+def serve(
+    weight_bank_path: str,
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    max_batch_size: int = 256,
+    max_latency_ms: float = 5.0,
+    num_samples: int = None,
+    quantiles: Tuple[float, ...] = (0.05, 0.5, 0.95),
+    timeout: float = 30.0,
+    request_queue_size: int = 512,
+) -> None:
+    predictor = NumpyPredictor(weight_bank_path)
+    batcher = MicroBatcher(
+        predictor,
+        max_batch_size=max_batch_size,
+        max_latency_ms=max_latency_ms,
+        num_samples=num_samples,
+        quantiles=quantiles,
+    )
+
+    server = PredictionServer(
+        (host, port),
+        _make_handler(batcher, timeout),
+        request_queue_size=request_queue_size,
+    )
+    logger.info(f"Serving predictions on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        logger.info(f"Final serving stats: {batcher.stats.snapshot()}")
@@ -0,0 +1,75 @@
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+def share_dataframe(data: pd.DataFrame, directory: str | Path) -> Path:
+    directory = Path(directory)
+    directory.parent.mkdir(parents=True, exist_ok=True)
+
+    # Written to a scratch directory and renamed into place, so a split
+    # that exists always has every column, even after a crash mid-write
+    partial = directory.with_name(f"{directory.name}.partial")
+    shutil.rmtree(partial, ignore_errors=True)
+    partial.mkdir()
+
+    columns = []
+    for i, column in enumerate(data.columns):
+        values = data[column].to_numpy()
+        if values.dtype == object:
+            values = values.astype(str)
+        np.save(partial / f"column_{i}.npy", values)
+        columns.append(column)
+
+    with open(partial / "columns.json", "w") as f:
+        json.dump(columns, f)
+
+    shutil.rmtree(directory, ignore_errors=True)
+    partial.rename(directory)
+    return directory
+
+
+def load_shared_dataframe(directory: str | Path) -> pd.DataFrame:
+    directory = Path(directory)
+
+    with open(directory / "columns.json", "r") as f:
+        columns = json.load(f)
+
+    # Memory-mapped read-only, so every worker shares the same pages
+    return pd.DataFrame(
+        {
+            column: np.load(directory / f"column_{i}.npy", mmap_mode="r")
+            for i, column in enumerate(columns)
+        },
+        copy=False,
+    )
+
+
+def dataframe_fingerprint(data: pd.DataFrame) -> str:
+    # Covers the column names and types as well as every value, so a
+    # reordered or retyped frame does not pass for the same data
+    digest = hashlib.sha1()
+    digest.update(
+        json.dumps(
+            [
+                [str(column), str(dtype)]
+                for column, dtype in data.dtypes.items()
+            ]
+        ).encode()
+    )
+    digest.update(
+        pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes()
+    )
+    return digest.hexdigest()[:16]
+
+
+def limit_tf_threads(num_threads: int) -> None:
+    # Only takes effect if set before TensorFlow is imported
+    os.environ["TF_NUM_INTRAOP_THREADS"] = str(num_threads)
+    os.environ["TF_NUM_INTEROP_THREADS"] = "1"
+    os.environ["OMP_NUM_THREADS"] = str(num_threads)
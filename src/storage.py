@@ -0,0 +1,226 @@
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from loguru import logger
+
+from src.seasons import season_start_year
+
+PARTITION_COLUMNS = ["division", "season"]
+
+# Compact dtypes for the config/config.json column names. Counts use
+# nullable integers because older seasons have gaps in the statistics
+FDUK_DTYPES = {
+    "division": "category",
+    "season": "category",
+    "time": "string",
+    "home_team": "category",
+    "away_team": "category",
+    "goals_h": "Int8",
+    "goals_a": "Int8",
+    "result": "category",
+    "ht_goals_h": "Int8",
+    "ht_goals_a": "Int8",
+    "ht_result": "category",
+    "referee": "category",
+    "shots_h": "Int8",
+    "shots_a": "Int8",
+    "shots_ot_h": "Int8",
+    "shots_ot_a": "Int8",
+    "fouls_h": "Int8",
+    "fouls_a": "Int8",
+    "corners_h": "Int8",
+    "corners_a": "Int8",
+    "yellows_h": "Int8",
+    "yellows_a": "Int8",
+    "reds_home": "Int8",
+    "reds_away": "Int8",
+    "odds_h_b365": "float32",
+    "odds_d_b365": "float32",
+    "odds_a_b365": "float32",
+    "game_num_h": "int16",
+    "game_num_a": "int16",
+    "season_half_h": "int8",
+    "season_half_a": "int8",
+}
+
+
+def apply_fduk_dtypes(data: pd.DataFrame) -> pd.DataFrame:
+    data = data.copy()
+    for column, dtype in FDUK_DTYPES.items():
+        if column not in data.columns:
+            continue
+        if dtype.startswith(("Int", "float")):
+            data[column] = pd.to_numeric(data[column], errors="coerce")
+        data[column] = data[column].astype(dtype)
+
+    # Older seasons use two-digit years
+    if "date" in data.columns:
+        data["date"] = pd.to_datetime(
+            data["date"], dayfirst=True, format="mixed"
+        )
+
+    return data
+
+
+def write_partitioned(
+    data: pd.DataFrame,
+    root: str | Path,
+    partition_columns: List[str] = None,
+) -> Path:
+    root = Path(root)
+    partition_columns = partition_columns or PARTITION_COLUMNS
+
+    data = data.copy()
+    for column in partition_columns:
+        data[column] = data[column].astype(str)
+
+    # Only the partitions being written are replaced, so a rerun for one
+    # season leaves the rest of the store alone
+    ds.write_dataset(
+        pa.Table.from_pandas(data, preserve_index=False),
+        root,
+        format="parquet",
+        partitioning=ds.partitioning(
+            pa.schema([(column, pa.string()) for column in partition_columns]),
+            flavor="hive",
+        ),
+        existing_data_behavior="delete_matching",
+        basename_template="part-{i}.parquet",
+    )
+    logger.info(
+        f"Wrote {len(data)} rows to {root} partitioned by {partition_columns}"
+    )
+    return root
+
+
+def season_tags_between(first: str, last: str) -> List[str]:
+    return [
+        f"{year % 100:02d}_{(year + 1) % 100:02d}"
+        for year in range(
+            season_start_year(first), season_start_year(last) + 1
+        )
+    ]
+
+
+def _filters(
+    leagues: List[str] = None,
+    seasons: List[str] = None,
+    season_range: Tuple[str, str] = None,
+    league_column: str = "division",
+) -> List[Tuple] | None:
+    if season_range is not None:
+        in_range = season_tags_between(*season_range)
+        seasons = (
+            in_range
+            if seasons is None
+            else [season for season in seasons if season in in_range]
+        )
+
+    filters = []
+    if leagues is not None:
+        filters.append((league_column, "in", list(leagues)))
+    if seasons is not None:
+        filters.append(("season", "in", list(seasons)))
+    return filters or None
+
+
+def load_table(
+    path: str | Path,
+    columns: List[str] = None,
+    leagues: List[str] = None,
+    seasons: List[str] = None,
+    season_range: Tuple[str, str] = None,
+    league_column: str = "division",
+    dtypes: Dict[str, str] = None,
+) -> pd.DataFrame:
+    path = Path(path)
+    filters = _filters(leagues, seasons, season_range, league_column)
+
+    if path.suffix == ".csv":
+        # CSVs still get column projection, but filtering needs the rows
+        # parsed first
+        filter_columns = [column for column, _, _ in filters or []]
+        usecols = (
+            None
+            if columns is None
+            else list(dict.fromkeys(columns + filter_columns))
+        )
+        data = pd.read_csv(path, usecols=usecols, dtype=dtypes)
+        for column, _, values in filters or []:
+            data = data[data[column].isin(values)]
+        if columns is not None:
+            data = data[columns]
+        return data.reset_index(drop=True)
+
+    # Partition filters prune whole files and column projection skips the
+    # rest of each row group
+    data = pd.read_parquet(
+        path, engine="pyarrow", columns=columns, filters=filters
+    )
+    for column in data.select_dtypes("category").columns:
+        data[column] = data[column].cat.remove_unused_categories()
+    if dtypes is not None:
+        data = data.astype(dtypes)
+    return data
+
+
+def missing_columns(data: pd.DataFrame) -> Dict[Tuple[str, ...], List[str]]:
+    # Columns a partition never recorded, e.g. referee in older seasons,
+    # come back from the store as all-null rather than absent
+    keys = [column for column in PARTITION_COLUMNS if column in data.columns]
+    if not keys:
+        return {}
+    columns = [column for column in data.columns if column not in keys]
+    all_null = (
+        data[columns]
+        .isna()
+        .groupby([data[key].astype(str) for key in keys], sort=False)
+        .all()
+    )
+    return {
+        partition if isinstance(partition, tuple) else (partition,): list(
+            all_null.columns[row]
+        )
+        for partition, row in zip(all_null.index, all_null.to_numpy())
+        if row.any()
+    }
+
+
+def warn_missing_columns(data: pd.DataFrame) -> None:
+    for partition, columns in missing_columns(data).items():
+        logger.warning(
+            f"No values for {columns} in {' '.join(partition)}, they will "
+            + "be null for every row"
+        )
+
+
+def load_fduk(
+    root: str | Path,
+    columns: List[str] = None,
+    leagues: List[str] = None,
+    seasons: List[str] = None,
+    season_range: Tuple[str, str] = None,
+) -> pd.DataFrame:
+    data = load_table(
+        root,
+        columns=columns,
+        leagues=leagues,
+        seasons=seasons,
+        season_range=season_range,
+    )
+
+    # Partitions are read in directory order, so restore the season-major
+    # order get_data_fduk produces; rows within a partition keep their order
+    if "season" in data.columns:
+        season_start = data["season"].astype(str).map(season_start_year)
+        keys = [season_start.to_numpy()]
+        if "division" in data.columns:
+            keys.insert(0, data["division"].astype(str).to_numpy())
+        data = data.iloc[np.lexsort(keys)]
+
+    warn_missing_columns(data)
+    return data.reset_index(drop=True)
@@ -0,0 +1,80 @@
+import numpy as np
+from typing import List
+
+
+class PredictiveAccumulator:
+    def __init__(
+        self,
+        num_fixtures: int,
+        num_bins: int = 100,
+        thresholds: List[float] = None,
+    ):
+        self.num_fixtures = num_fixtures
+        self.num_bins = num_bins
+        self.thresholds = np.asarray(thresholds or [], dtype=np.float64)
+
+        self.count = 0
+        self.mean = np.zeros(num_fixtures)
+        self._m2 = np.zeros(num_fixtures)
+        # Probabilities live in [0, 1], so a fixed histogram per fixture is
+        # a quantile sketch whose size does not grow with the samples
+        self.histogram = np.zeros((num_fixtures, num_bins), dtype=np.int64)
+        self.exceedance_counts = np.zeros(
+            (num_fixtures, len(self.thresholds)), dtype=np.int64
+        )
+
+    def update(self, samples: np.ndarray) -> None:
+        samples = np.asarray(samples, dtype=np.float64)
+        chunk_count = len(samples)
+        chunk_mean = samples.mean(axis=0)
+        chunk_m2 = ((samples - chunk_mean) ** 2).sum(axis=0)
+
+        # Chan et al.'s pairwise form of Welford's update
+        total = self.count + chunk_count
+        delta = chunk_mean - self.mean
+        self.mean += delta * chunk_count / total
+        self._m2 += chunk_m2 + delta**2 * self.count * chunk_count / total
+        self.count = total
+
+        bins = np.clip(
+            (samples * self.num_bins).astype(np.int64), 0, self.num_bins - 1
+        )
+        offsets = np.arange(self.num_fixtures) * self.num_bins
+        self.histogram += np.bincount(
+            (bins + offsets).ravel(),
+            minlength=self.num_fixtures * self.num_bins,
+        ).reshape(self.num_fixtures, self.num_bins)
+
+        if len(self.thresholds):
+            self.exceedance_counts += (
+                samples[..., np.newaxis] > self.thresholds
+            ).sum(axis=0)
+
+    @property
+    def variance(self) -> np.ndarray:
+        return self._m2 / self.count
+
+    def quantiles(self, quantiles: List[float]) -> np.ndarray:
+        # Linear interpolation within the histogram bin holding each quantile
+        cumulative = np.cumsum(self.histogram, axis=1)
+        rows = np.arange(self.num_fixtures)
+        results = np.empty((len(quantiles), self.num_fixtures))
+        for i, q in enumerate(quantiles):
+            target = q * self.count
+            bins = np.minimum(
+                (cumulative < target).sum(axis=1), self.num_bins - 1
+            )
+            in_bin = self.histogram[rows, bins]
+            below = cumulative[rows, bins] - in_bin
+            fraction = np.divide(
+                target - below,
+                in_bin,
+                out=np.zeros(self.num_fixtures),
+                where=in_bin > 0,
+            )
+            results[i] = (bins + np.clip(fraction, 0, 1)) / self.num_bins
+
+        return results
+
+    def exceedance_probabilities(self) -> np.ndarray:
+        return self.exceedance_counts / self.count
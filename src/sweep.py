@@ -0,0 +1,204 @@
+import hashlib
+import itertools
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from src.shared_data import (
+    dataframe_fingerprint,
+    limit_tf_threads,
+    load_shared_dataframe,
+    share_dataframe,
+)
+
+# Importing TensorFlow is deferred to the workers, so their thread limits
+# are set before it loads
+_worker_data = {}
+
+
+def grid_search(space: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    return [
+        dict(zip(space.keys(), values))
+        for values in itertools.product(*space.values())
+    ]
+
+
+def random_search(
+    space: Dict[str, List[Any]], num_trials: int, seed: int = 0
+) -> List[Dict[str, Any]]:
+    # Sampled without replacement from the flattened grid, so no two trials
+    # share a key; a space smaller than num_trials is returned in full
+    sizes = [len(options) for options in space.values()]
+    num_configs = int(np.prod(sizes))
+    if num_trials > num_configs:
+        logger.warning(
+            f"Only {num_configs} distinct configurations for {num_trials} "
+            "trials"
+        )
+
+    rng = np.random.default_rng(seed)
+    flat = rng.choice(num_configs, min(num_trials, num_configs), replace=False)
+    return [
+        {
+            name: options[index]
+            for (name, options), index in zip(space.items(), indices)
+        }
+        for indices in zip(*np.unravel_index(flat, sizes))
+    ]
+
+
+def trial_key(params: Dict[str, Any]) -> str:
+    payload = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()[:12]
+
+
+def _init_worker(num_threads: int, sweep_dir: str) -> None:
+    limit_tf_threads(num_threads)
+    _worker_data["train"] = load_shared_dataframe(Path(sweep_dir) / "train")
+    _worker_data["val"] = load_shared_dataframe(Path(sweep_dir) / "val")
+
+
+def _run_trial(
+    experiment_name: str, params: Dict[str, Any], run_kwargs: Dict[str, Any]
+) -> str:
+    from src.experimentation import run_experiment
+
+    key = trial_key(params)
+    run_experiment(
+        experiment_name,
+        _worker_data["train"],
+        _worker_data["val"],
+        run_id=key,
+        **params,
+        **run_kwargs,
+    )
+
+    return key
+
+
+def _completed_trials(sweep_dir: Path) -> set:
+    completed_path = sweep_dir / "completed.jsonl"
+    if not completed_path.exists():
+        return set()
+
+    with open(completed_path, "r") as f:
+        return {json.loads(line)["key"] for line in f if line.strip()}
+
+
+def _check_manifest(sweep_dir: Path, manifest: Dict[str, Any]) -> None:
+    manifest_path = sweep_dir / "manifest.json"
+    if manifest_path.exists():
+        with open(manifest_path, "r") as f:
+            previous = json.load(f)
+        if previous != manifest:
+            raise ValueError(
+                f"{sweep_dir} holds a sweep of different data or settings, "
+                f"{previous} against {manifest}; use a new sweep_dir"
+            )
+        return
+
+    # Shared data or results from before manifests existed cannot be
+    # verified, so they are never resumed into
+    if any(sweep_dir.iterdir()):
+        raise ValueError(
+            f"{sweep_dir} is not empty and has no manifest; use a new "
+            "sweep_dir"
+        )
+
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=4)
+
+
+def run_sweep(
+    experiment_name: str,
+    train_data: pd.DataFrame,
+    val_data: pd.DataFrame,
+    trials: List[Dict[str, Any]],
+    sweep_dir: str | Path,
+    num_workers: int = 4,
+    threads_per_worker: int = 1,
+    **run_kwargs,
+) -> List[str]:
+    sweep_dir = Path(sweep_dir)
+    sweep_dir.mkdir(parents=True, exist_ok=True)
+
+    # Completed trials are keyed on their params alone, so a sweep only
+    # resumes with the experiment, data and fixed settings it started with
+    _check_manifest(
+        sweep_dir,
+        {
+            "experiment_name": experiment_name,
+            "train_fingerprint": dataframe_fingerprint(train_data),
+            "val_fingerprint": dataframe_fingerprint(val_data),
+            "run_kwargs": json.loads(
+                json.dumps(
+                    {
+                        name: value
+                        for name, value in run_kwargs.items()
+                        if name not in ("tracking_uri", "tracker")
+                    },
+                    sort_keys=True,
+                    default=str,
+                )
+            ),
+        },
+    )
+    for split, data in (("train", train_data), ("val", val_data)):
+        if not (sweep_dir / split / "columns.json").exists():
+            share_dataframe(data, sweep_dir / split)
+
+    # Trials with the same params would share a run_id and completion key
+    unique = {trial_key(params): params for params in trials}
+    if len(unique) < len(trials):
+        logger.warning(
+            f"Dropping {len(trials) - len(unique)} duplicate trials"
+        )
+        trials = list(unique.values())
+
+    completed = _completed_trials(sweep_dir)
+    pending = [
+        params for params in trials if trial_key(params) not in completed
+    ]
+    logger.info(
+        f"{len(trials)} trials, {len(trials) - len(pending)} already "
+        f"completed, running {len(pending)}"
+    )
+
+    failed = []
+    with ProcessPoolExecutor(
+        max_workers=num_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(threads_per_worker, str(sweep_dir)),
+    ) as executor:
+        futures = {
+            executor.submit(
+                _run_trial, experiment_name, params, run_kwargs
+            ): params
+            for params in pending
+        }
+        for future in as_completed(futures):
+            params = futures[future]
+            try:
+                key = future.result()
+            except Exception as e:
+                logger.error(f"Trial {params} failed: {e}")
+                failed.append(trial_key(params))
+                continue
+
+            with open(sweep_dir / "completed.jsonl", "a") as f:
+                f.write(json.dumps({"key": key, "params": params}) + "\n")
+            logger.info(f"Trial {key} completed: {params}")
+
+    if failed:
+        logger.warning(
+            f"{len(failed)} trials failed and will rerun on resume: {failed}"
+        )
+
+    return failed
@@ -0,0 +1,194 @@
+import json
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.helper_functions import find_repo_root
+from src.seasons import season_start_year
+
+LEAGUE_CODES = [
+    "E0",
+    "E1",
+    "E2",
+    "E3",
+    "EC",
+    "SC0",
+    "SC1",
+    "D1",
+    "D2",
+    "I1",
+    "I2",
+    "SP1",
+    "SP2",
+    "F1",
+    "F2",
+    "N1",
+    "B1",
+    "P1",
+    "T1",
+    "G1",
+]
+
+
+def league_codes(num_leagues: int) -> List[str]:
+    num_extra = max(num_leagues - len(LEAGUE_CODES), 0)
+    extra = [f"X{i}" for i in range(num_extra)]
+    return (LEAGUE_CODES + extra)[:num_leagues]
+
+
+def season_tags(num_seasons: int, first_start_year: int = 0) -> List[str]:
+    return [
+        f"{(first_start_year + i) % 100:02d}_"
+        f"{(first_start_year + i + 1) % 100:02d}"
+        for i in range(num_seasons)
+    ]
+
+
+def round_robin(
+    num_teams: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Circle method: team 0 stays put while the others rotate, then the
+    # second half of the season repeats the first with venues swapped
+    assert num_teams % 2 == 0, "num_teams must be even"
+    rotating = np.arange(1, num_teams)
+    home, away, matchweek = [], [], []
+    for week in range(num_teams - 1):
+        order = np.concatenate([[0], np.roll(rotating, week)])
+        pairs = np.stack(
+            [order[: num_teams // 2], order[::-1][: num_teams // 2]]
+        )
+        if week % 2:
+            pairs = pairs[::-1]
+        home.append(pairs[0])
+        away.append(pairs[1])
+        matchweek.append(np.full(num_teams // 2, week))
+    home, away = np.concatenate(home), np.concatenate(away)
+    matchweek = np.concatenate(matchweek)
+    return (
+        np.concatenate([home, away]),
+        np.concatenate([away, home]),
+        np.concatenate([matchweek, matchweek + num_teams - 1]),
+    )
+
+
+def generate_fduk_data(
+    num_leagues: int = 1,
+    num_seasons: int = 10,
+    num_teams: int = 20,
+    first_start_year: int = 10,
+    columns: str = "raw",
+    seed: int = 0,
+) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    home_idx, away_idx, matchweek = round_robin(num_teams)
+    n_games = len(home_idx)
+
+    leagues = league_codes(num_leagues)
+    seasons = season_tags(num_seasons, first_start_year)
+    n_partitions = num_leagues * num_seasons
+    n = n_partitions * n_games
+
+    # One row per fixture, partitions laid out league-major like the
+    # concatenated downloads
+    partition = np.repeat(np.arange(n_partitions), n_games)
+    league = partition // num_seasons
+    season = partition % num_seasons
+    home = np.tile(home_idx, n_partitions)
+    away = np.tile(away_idx, n_partitions)
+    week = np.tile(matchweek, n_partitions)
+
+    strength = rng.normal(0.0, 0.35, size=(n_partitions, num_teams))
+    difference = strength[partition, home] - strength[partition, away]
+    attack_h = np.exp(0.3 + difference)
+    attack_a = np.exp(0.05 - difference)
+
+    goals_h = rng.poisson(attack_h)
+    goals_a = rng.poisson(attack_a)
+    ht_goals_h = rng.binomial(goals_h, 0.45)
+    ht_goals_a = rng.binomial(goals_a, 0.45)
+    shots_h = goals_h + rng.poisson(9 * attack_h)
+    shots_a = goals_a + rng.poisson(9 * attack_a)
+
+    # Formatting dates is slow, so only the (season, matchweek) grid is
+    # formatted and then indexed per fixture
+    start_dates = pd.to_datetime(
+        [f"{season_start_year(tag)}-08-10" for tag in seasons]
+    )
+    num_weeks = 2 * (num_teams - 1)
+    date_grid = (
+        np.repeat(start_dates, num_weeks)
+        + pd.to_timedelta(7 * np.tile(np.arange(num_weeks), num_seasons), "D")
+    ).strftime("%d/%m/%Y")
+    dates = np.asarray(date_grid)[season * num_weeks + week]
+
+    # Bookmaker odds from a noisy version of the true scoring rates with a
+    # five percent overround
+    p_h = 1 / (1 + np.exp(-(np.log(attack_h / attack_a) * 1.6 - 0.1)))
+    p_h = np.clip(p_h + rng.normal(0, 0.03, n), 0.05, 0.9)
+    p_d = np.clip(0.27 - 0.2 * np.abs(p_h - 0.45), 0.05, 0.35)
+    p_a = np.clip(1 - p_h - p_d, 0.03, None)
+
+    team_names = np.array(
+        [
+            [f"{code} Team {k:02d}" for k in range(num_teams)]
+            for code in leagues
+        ]
+    )
+
+    data = pd.DataFrame(
+        {
+            "Div": np.array(leagues)[league],
+            "Date": dates,
+            "Time": "15:00",
+            "HomeTeam": team_names[league, home],
+            "AwayTeam": team_names[league, away],
+            "FTHG": goals_h,
+            "FTAG": goals_a,
+            "FTR": _result(goals_h, goals_a),
+            "HTHG": ht_goals_h,
+            "HTAG": ht_goals_a,
+            "HTR": _result(ht_goals_h, ht_goals_a),
+            "Referee": np.char.add(
+                "Referee ", rng.integers(0, 40, n).astype(str)
+            ),
+            "HS": shots_h,
+            "AS": shots_a,
+            "HST": goals_h + rng.binomial(shots_h - goals_h, 0.3),
+            "AST": goals_a + rng.binomial(shots_a - goals_a, 0.3),
+            "HF": rng.poisson(11, n),
+            "AF": rng.poisson(11.5, n),
+            "HC": rng.poisson(5.5, n),
+            "AC": rng.poisson(4.5, n),
+            "HY": rng.poisson(1.6, n),
+            "AY": rng.poisson(1.8, n),
+            "HR": rng.binomial(1, 0.05, n),
+            "AR": rng.binomial(1, 0.06, n),
+            "B365H": np.round(1 / (1.05 * p_h), 2),
+            "B365D": np.round(1 / (1.05 * p_d), 2),
+            "B365A": np.round(1 / (1.05 * p_a), 2),
+        }
+    )
+    data["season"] = np.array(seasons)[season]
+
+    return rename_fduk_columns(data, columns)
+
+
+def rename_fduk_columns(data: pd.DataFrame, columns: str) -> pd.DataFrame:
+    if columns == "config":
+        with open(find_repo_root() / "config" / "config.json", "r") as f:
+            data = data.rename(columns=json.load(f))
+    elif columns == "lowercase":
+        data = data.rename(columns=str.lower)
+    elif columns != "raw":
+        raise ValueError(
+            f"Unknown columns '{columns}', use raw, config or lowercase"
+        )
+
+    return data
+
+
+def _result(goals_h: np.ndarray, goals_a: np.ndarray) -> np.ndarray:
+    return np.where(
+        goals_h > goals_a, "H", np.where(goals_h < goals_a, "A", "D")
+    )
@@ -0,0 +1,340 @@
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List
+
+import requests
+from loguru import logger
+from mlflow.entities import Metric, Param, RunTag
+from mlflow.tracking import MlflowClient
+
+DEFAULT_TRACKING_URI = "http://localhost:5001"
+DEFAULT_OFFLINE_DIR = "mlflow/offline"
+
+# MLflow's per-request limits for log_batch
+MAX_METRICS_PER_BATCH = 1000
+MAX_PARAMS_PER_BATCH = 100
+MAX_TAGS_PER_BATCH = 100
+MAX_PARAM_LENGTH = 6000
+
+# Replayed runs are tagged with their spool file, so a sync that is
+# interrupted and rerun never logs the same records twice
+SPOOL_TAG = "offline_spool"
+SYNCED_TAG = "offline_spool_synced"
+
+
+def get_tracking_uri(tracking_uri: str = None) -> str:
+    return (
+        tracking_uri
+        or os.environ.get("MLFLOW_TRACKING_URI")
+        or DEFAULT_TRACKING_URI
+    )
+
+
+def server_available(tracking_uri: str, timeout: float = 2.0) -> bool:
+    if not tracking_uri.startswith(("http://", "https://")):
+        return True
+    try:
+        response = requests.get(
+            f"{tracking_uri.rstrip('/')}/health", timeout=timeout
+        )
+    except requests.RequestException:
+        return False
+    return response.ok
+
+
+def _chunks(items: List, size: int):
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def _log_records(
+    client: MlflowClient,
+    run_id: str,
+    records: List[Dict],
+    logged: List[Dict] = None,
+) -> None:
+    # Each request's records are added to `logged` once it succeeds, so a
+    # failure part way through leaves only the rest to be retried
+    logged = [] if logged is None else logged
+    by_type = {"metric": [], "param": [], "tag": [], "artifact": []}
+    for record in records:
+        if record["type"] in by_type:
+            by_type[record["type"]].append(record)
+
+    for chunk in _chunks(by_type["metric"], MAX_METRICS_PER_BATCH):
+        metrics = [
+            Metric(r["key"], r["value"], r["timestamp"], r["step"])
+            for r in chunk
+        ]
+        client.log_batch(run_id, metrics=metrics)
+        logged.extend(chunk)
+    for chunk in _chunks(by_type["param"], MAX_PARAMS_PER_BATCH):
+        params = [
+            Param(r["key"], r["value"][:MAX_PARAM_LENGTH]) for r in chunk
+        ]
+        client.log_batch(run_id, params=params)
+        logged.extend(chunk)
+    for chunk in _chunks(by_type["tag"], MAX_TAGS_PER_BATCH):
+        tags = [RunTag(r["key"], r["value"]) for r in chunk]
+        client.log_batch(run_id, tags=tags)
+        logged.extend(chunk)
+    for record in by_type["artifact"]:
+        client.log_artifact(run_id, record["path"])
+        logged.append(record)
+
+
+def _unlogged(
+    client: MlflowClient, run_id: str, records: List[Dict]
+) -> List[Dict]:
+    # Replaying into a run that already holds some of the records, e.g.
+    # after an interrupted sync, only logs what is missing
+    run = client.get_run(run_id)
+    keys = {r["key"] for r in records if r["type"] == "metric"}
+    metrics = {
+        (metric.key, metric.step, metric.timestamp)
+        for key in keys
+        for metric in client.get_metric_history(run_id, key)
+    }
+    return [
+        record
+        for record in records
+        if not (
+            record["type"] == "metric"
+            and (record["key"], record["step"], record["timestamp"]) in metrics
+        )
+        and not (
+            record["type"] == "param"
+            and run.data.params.get(record["key"])
+            == record["value"][:MAX_PARAM_LENGTH]
+        )
+    ]
+
+
+def _get_experiment_id(client: MlflowClient, experiment_name: str) -> str:
+    experiment = client.get_experiment_by_name(experiment_name)
+    if experiment is None:
+        return client.create_experiment(experiment_name)
+    return experiment.experiment_id
+
+
+# Run data is buffered and logged from a background thread in batches. While
+# the server is unreachable, records are spooled to a local JSONL file that
+# sync_offline_runs replays later
+class ExperimentTracker:
+
+    def __init__(
+        self,
+        experiment_name: str,
+        tracking_uri: str = None,
+        offline_dir: str = DEFAULT_OFFLINE_DIR,
+        flush_interval: float = 5.0,
+        max_batch_size: int = MAX_METRICS_PER_BATCH,
+    ):
+        self.experiment_name = experiment_name
+        self.tracking_uri = get_tracking_uri(tracking_uri)
+        self.offline_dir = Path(offline_dir)
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size
+
+        self.metrics = {}
+        self.params = {}
+        self.run_id = None
+        self.spool_path = None
+
+        self._client = MlflowClient(tracking_uri=self.tracking_uri)
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def start_run(self, run_name: str = None) -> "ExperimentTracker":
+        self.metrics = {}
+        self.params = {}
+        self.run_id = None
+        self.spool_path = None
+        self._run_name = run_name
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread.start()
+        return self
+
+    def end_run(self, status: str = "FINISHED") -> None:
+        self._queue.put({"type": "end", "status": status})
+        self._thread.join()
+        self._thread = None
+
+    def __enter__(self) -> "ExperimentTracker":
+        return self.start_run()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.end_run("FAILED" if exc_type is not None else "FINISHED")
+
+    def set_tag(self, key: str, value) -> None:
+        self._queue.put({"type": "tag", "key": key, "value": str(value)})
+
+    def set_tags(self, tags: Dict) -> None:
+        for key, value in tags.items():
+            self.set_tag(key, value)
+
+    def log_param(self, key: str, value) -> None:
+        self.params[key] = value
+        self._queue.put({"type": "param", "key": key, "value": str(value)})
+
+    def log_params(self, params: Dict) -> None:
+        for key, value in params.items():
+            self.log_param(key, value)
+
+    def log_metric(self, key: str, value: float, step: int = 0) -> None:
+        self.metrics[key] = float(value)
+        self._queue.put(
+            {
+                "type": "metric",
+                "key": key,
+                "value": float(value),
+                "step": step,
+                "timestamp": int(time.time() * 1000),
+            }
+        )
+
+    def log_metrics(self, metrics: dict, step: int = 0) -> None:
+        for key, value in metrics.items():
+            self.log_metric(key, value, step=step)
+
+    def log_history(self, history: dict, keys: List[str] = None) -> None:
+        for key in keys or list(history):
+            for epoch, value in enumerate(history[key]):
+                self.log_metric(key, value, step=epoch)
+
+    def log_artifact(self, path: str | Path) -> None:
+        self._queue.put({"type": "artifact", "path": str(path)})
+
+    def _worker(self) -> None:
+        done = False
+        while not done:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    record = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                batch.append(record)
+                if record["type"] == "end":
+                    done = True
+                    break
+            if batch:
+                self._flush(batch)
+
+    def _flush(self, batch: List[Dict]) -> None:
+        if self.spool_path is None and server_available(self.tracking_uri):
+            logged = []
+            try:
+                self._log_online(batch, logged)
+                return
+            except Exception as e:
+                logger.warning(f"Tracking server error, going offline: {e}")
+            # Only what the server did not accept goes to the spool
+            logged = {id(record) for record in logged}
+            batch = [record for record in batch if id(record) not in logged]
+        self._log_offline(batch)
+
+    def _log_online(self, batch: List[Dict], logged: List[Dict]) -> None:
+        if self.run_id is None:
+            experiment_id = _get_experiment_id(
+                self._client, self.experiment_name
+            )
+            self.run_id = self._client.create_run(
+                experiment_id, run_name=self._run_name
+            ).info.run_id
+        _log_records(self._client, self.run_id, batch, logged)
+        for record in batch:
+            if record["type"] == "end":
+                self._client.set_terminated(
+                    self.run_id, status=record["status"]
+                )
+                logged.append(record)
+
+    def _log_offline(self, batch: List[Dict]) -> None:
+        if self.spool_path is None:
+            self.offline_dir.mkdir(parents=True, exist_ok=True)
+            self.spool_path = self.offline_dir / f"{uuid.uuid4().hex}.jsonl"
+            logger.warning(
+                f"Tracking server unavailable, spooling to {self.spool_path}"
+            )
+            header = {
+                "type": "run",
+                "experiment_name": self.experiment_name,
+                "run_name": self._run_name,
+                "run_id": self.run_id,
+            }
+            batch = [header] + batch
+        with open(self.spool_path, "a") as f:
+            for record in batch:
+                f.write(json.dumps(record) + "\n")
+
+
+def _synced(run, spool_name: str) -> bool:
+    return run.data.tags.get(SYNCED_TAG) == spool_name
+
+
+def sync_offline_runs(
+    tracking_uri: str = None, offline_dir: str = DEFAULT_OFFLINE_DIR
+) -> int:
+    tracking_uri = get_tracking_uri(tracking_uri)
+    if not server_available(tracking_uri):
+        logger.info(f"Tracking server at {tracking_uri} is unavailable")
+        return 0
+
+    client = MlflowClient(tracking_uri=tracking_uri)
+    synced = 0
+    for spool_path in sorted(Path(offline_dir).glob("*.jsonl")):
+        with open(spool_path) as f:
+            header, *records = [json.loads(line) for line in f]
+
+        ended = [r for r in records if r["type"] == "end"]
+        if not ended:
+            # The run is still writing to this spool file
+            continue
+
+        # Runs that went offline part way through carry on in the same run
+        run_id = header["run_id"]
+        spool_name = spool_path.stem
+        if run_id is None:
+            experiment_id = _get_experiment_id(
+                client, header["experiment_name"]
+            )
+            previous = client.search_runs(
+                [experiment_id],
+                filter_string=f"tags.{SPOOL_TAG} = '{spool_name}'",
+            )
+            # A sync that died before removing the spool file either
+            # finished the run, or left it partly logged and it carries on
+            if any(_synced(run, spool_name) for run in previous):
+                spool_path.unlink()
+                continue
+            if previous:
+                run_id = previous[0].info.run_id
+            else:
+                run_id = client.create_run(
+                    experiment_id,
+                    run_name=header["run_name"],
+                    tags={SPOOL_TAG: spool_name},
+                ).info.run_id
+        elif _synced(client.get_run(run_id), spool_name):
+            spool_path.unlink()
+            continue
+
+        _log_records(client, run_id, _unlogged(client, run_id, records))
+        client.set_tag(run_id, SYNCED_TAG, spool_name)
+        client.set_terminated(run_id, status=ended[-1]["status"])
+
+        spool_path.unlink()
+        synced += 1
+        logger.info(f"Synced offline run {spool_path.name} to {run_id}")
+
+    return synced
@@ -0,0 +1,80 @@
+import pandas as pd
+import pytest
+
+from src.backtesting import prepare_folds, walk_forward_folds
+from src.shared_data import load_shared_dataframe
+
+SEASONS = ["98_99", "99_00", "00_01", "01_02", "02_03"]
+
+
+def _model_data(offset=0.0):
+    return pd.DataFrame(
+        {
+            "season": [season for season in SEASONS for _ in range(4)],
+            "h_avg_goals_scored": [
+                i / 10 + offset for i in range(4 * len(SEASONS))
+            ],
+            "bookies_prob": 0.5,
+            "h_win": [i % 2 for i in range(4 * len(SEASONS))],
+        }
+    )
+
+
+def test_expanding_folds_follow_season_order():
+    # Shuffled, and across the turn of the century
+    folds = walk_forward_folds(SEASONS[::-1], min_train_seasons=2)
+
+    assert folds == [
+        (["98_99", "99_00"], "00_01"),
+        (["98_99", "99_00", "00_01"], "01_02"),
+        (["98_99", "99_00", "00_01", "01_02"], "02_03"),
+    ]
+
+
+def test_sliding_folds_keep_the_window_size():
+    folds = walk_forward_folds(
+        SEASONS, min_train_seasons=2, window="sliding", window_size=2
+    )
+
+    assert [train for train, _ in folds] == [
+        ["98_99", "99_00"],
+        ["99_00", "00_01"],
+        ["00_01", "01_02"],
+    ]
+    with pytest.raises(ValueError):
+        walk_forward_folds(SEASONS, window="rolling")
+
+
+def test_prepared_folds_hold_out_the_next_season(tmp_path):
+    data = _model_data()
+    folds = walk_forward_folds(SEASONS, min_train_seasons=3)
+
+    fold_dirs = prepare_folds(data, folds, tmp_path)
+
+    assert [fold_dir.name for fold_dir in fold_dirs] == [
+        "98_99-00_01_01_02",
+        "98_99-01_02_02_03",
+    ]
+    train = load_shared_dataframe(fold_dirs[-1] / "train")
+    val = load_shared_dataframe(fold_dirs[-1] / "val")
+    assert set(train["season"]) == set(SEASONS[:4])
+    assert "bookies_prob" not in train.columns
+    assert set(val["season"]) == {"02_03"}
+    assert "bookies_prob" in val.columns
+
+
+def test_folds_are_rebuilt_when_their_data_changes(tmp_path):
+    folds = walk_forward_folds(SEASONS, min_train_seasons=4)
+    (fold_dir,) = prepare_folds(_model_data(), folds, tmp_path)
+    written = (fold_dir / "train" / "columns.json").stat().st_mtime_ns
+
+    # Same data, so the cached fold is reused as is
+    prepare_folds(_model_data(), folds, tmp_path)
+    assert (fold_dir / "train" / "columns.json").stat().st_mtime_ns == written
+
+    # Same seasons with other values must not train on the stale fold
+    prepare_folds(_model_data(offset=1.0), folds, tmp_path)
+    train = load_shared_dataframe(fold_dir / "train")
+    assert train["h_avg_goals_scored"].tolist() == pytest.approx(
+        _model_data(offset=1.0)["h_avg_goals_scored"][:16].tolist()
+    )
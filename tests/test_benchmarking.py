@@ -0,0 +1,56 @@
+import numpy as np
+
+from src.benchmarking import compare_results
+
+
+def _results(tiers):
+    return {
+        "commit": "abc1234",
+        "tiers": {
+            tier: {"timings": timings} for tier, timings in tiers.items()
+        },
+    }
+
+
+def test_compare_flags_regressions_beyond_the_threshold():
+    comparison = compare_results(
+        _results({"small": {"enrich": 1.0, "fit": 2.0}}),
+        _results({"small": {"enrich": 1.05, "fit": 3.0}}),
+        threshold=0.1,
+    )
+
+    assert comparison["status"].tolist() == ["ok", "regression"]
+    assert comparison["regression"].tolist() == [False, True]
+    np.testing.assert_allclose(comparison["ratio"], [1.05, 1.5])
+
+
+def test_compare_reports_new_and_missing_stages():
+    comparison = compare_results(
+        _results({"small": {"fit": 2.0, "enrich": 0.0, "dropped": 1.0}}),
+        _results(
+            {"small": {"fit": 2.0, "enrich": 0.5}, "large": {"fit": 9.0}}
+        ),
+    )
+
+    statuses = dict(
+        zip(zip(comparison["tier"], comparison["stage"]), comparison["status"])
+    )
+    assert statuses == {
+        ("small", "fit"): "ok",
+        # A zero baseline has nothing to divide by
+        ("small", "enrich"): "new",
+        ("small", "dropped"): "missing",
+        ("large", "fit"): "new",
+    }
+    assert not comparison["regression"].any()
+    assert comparison.loc[comparison["status"] != "ok", "ratio"].isna().all()
+
+
+def test_compare_against_an_empty_baseline():
+    comparison = compare_results(
+        {"commit": "abc1234", "tiers": {}}, _results({"small": {}})
+    )
+
+    assert comparison.empty
+    assert "regression" in comparison.columns
+    assert len(comparison[comparison["status"] == "regression"]) == 0
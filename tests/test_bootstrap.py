@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+from sklearn.metrics import roc_auc_score
+
+from src.bootstrap import (
+    _auc_labels,
+    _weighted_auc,
+    bootstrap_compare,
+    bootstrap_indices,
+)
+
+
+@pytest.fixture
+def predictions():
+    rng = np.random.default_rng(0)
+    n = 300
+    bookies_probs = rng.uniform(0.2, 0.8, n)
+    y_true = (rng.uniform(size=n) < bookies_probs).astype(float)
+    # Rounded so there are plenty of tied scores within and across classes
+    model_probs = np.round(
+        np.clip(bookies_probs + rng.normal(0, 0.1, n), 0.01, 0.99), 1
+    )
+    return y_true, model_probs, bookies_probs
+
+
+def test_replicate_auc_matches_roc_auc_score(predictions):
+    y_true, model_probs, _ = predictions
+    indices = bootstrap_indices(len(y_true), 50, seed=1)
+
+    aucs = _weighted_auc(indices, *_auc_labels(y_true, model_probs))
+
+    expected = [
+        roc_auc_score(y_true[sample], model_probs[sample])
+        for sample in indices
+    ]
+    np.testing.assert_allclose(aucs, expected, rtol=1e-12)
+
+
+def test_intervals_match_direct_resampling(predictions):
+    y_true, model_probs, bookies_probs = predictions
+
+    results = bootstrap_compare(
+        y_true, model_probs, bookies_probs, num_replicates=200, seed=2
+    )
+
+    indices = bootstrap_indices(len(y_true), 200, seed=2)
+    mse = ((model_probs - y_true) ** 2)[indices].mean(axis=1)
+    auc = [
+        roc_auc_score(y_true[sample], model_probs[sample])
+        for sample in indices
+    ]
+    np.testing.assert_allclose(
+        [results["mse_lower"], results["mse_upper"]],
+        np.percentile(mse, [5, 95]),
+    )
+    np.testing.assert_allclose(
+        [results["auc_lower"], results["auc_upper"]],
+        np.percentile(auc, [5, 95]),
+    )
+    assert results["auc_diff"] == pytest.approx(
+        roc_auc_score(y_true, model_probs)
+        - roc_auc_score(y_true, bookies_probs)
+    )
+
+
+def test_pvalue_is_two_sided(predictions):
+    y_true, model_probs, bookies_probs = predictions
+
+    forward = bootstrap_compare(y_true, model_probs, bookies_probs, seed=3)
+    backward = bootstrap_compare(y_true, bookies_probs, model_probs, seed=3)
+
+    for name in ["mse_diff", "auc_diff"]:
+        assert forward[name] == pytest.approx(-backward[name])
+        assert forward[f"{name}_pvalue"] == pytest.approx(
+            backward[f"{name}_pvalue"]
+        )
+
+
+def test_pvalue_under_and_away_from_the_null(predictions):
+    y_true, _, bookies_probs = predictions
+
+    same = bootstrap_compare(y_true, bookies_probs, bookies_probs, seed=4)
+    assert same["mse_diff_pvalue"] == 1.0
+    assert same["auc_diff_pvalue"] == 1.0
+
+    # Always a coin flip, so clearly worse than the bookies
+    worse = bootstrap_compare(
+        y_true, np.full_like(y_true, 0.5), bookies_probs, seed=4
+    )
+    assert worse["mse_diff"] > 0
+    assert worse["mse_diff_pvalue"] < 0.01
+    assert worse["auc_diff_pvalue"] < 0.01
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from src.ensemble import (
+    EnsembleDenseVariational,
+    create_bnn_ensemble_model,
+    replica_squared_error,
+)
+from src.priors_posteriors import get_posterior, make_normal_prior
+
+FEATURE_NAMES = ["elo_diff", "form_diff", "goal_diff"]
+NUM_REPLICAS = 4
+
+
+def _ensemble(posterior, seed=0):
+    return create_bnn_ensemble_model(
+        FEATURE_NAMES,
+        [8],
+        make_normal_prior(1.0),
+        get_posterior(posterior),
+        n_train=64,
+        num_replicas=NUM_REPLICAS,
+        packed_inputs=True,
+        seed=seed,
+    )
+
+
+def _replica_parameters(model):
+    # One (K, n) posterior variable per ensemble layer
+    return [
+        layer._posterior.trainable_weights[0].numpy()
+        for layer in model.layers
+        if isinstance(layer, EnsembleDenseVariational)
+    ]
+
+
+def _assert_replicas_differ(model):
+    for parameters in _replica_parameters(model):
+        assert parameters.shape[0] == NUM_REPLICAS
+        for i in range(NUM_REPLICAS):
+            for j in range(i + 1, NUM_REPLICAS):
+                assert not np.allclose(parameters[i], parameters[j])
+
+
+@pytest.mark.parametrize("posterior", ["std_normal", "mean_field", "low_rank"])
+def test_replicas_start_apart(posterior):
+    model = _ensemble(posterior)
+    _assert_replicas_differ(model)
+
+    # Layers draw from different seeds too
+    hidden, output = _replica_parameters(model)
+    n = output.shape[1]
+    assert not np.allclose(hidden[:, :n], output)
+
+
+def test_seeded_initialisation_is_reproducible():
+    for first, second in zip(
+        _replica_parameters(_ensemble("mean_field", seed=3)),
+        _replica_parameters(_ensemble("mean_field", seed=3)),
+    ):
+        np.testing.assert_array_equal(first, second)
+
+
+def test_replicas_differ_after_training():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(64, len(FEATURE_NAMES))).astype(np.float32)
+    y = (X[:, 0] > 0).astype(np.float32)
+
+    model = _ensemble("mean_field")
+    model.compile(optimizer="rmsprop", loss=replica_squared_error)
+    model.fit(X, y, batch_size=64, epochs=1, verbose=0)
+
+    _assert_replicas_differ(model)
+    assert model.predict(X, verbose=0).shape == (64, NUM_REPLICAS)
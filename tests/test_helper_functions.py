@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+import tensorflow as tf
+import tf_keras as tfk
+
+from src.helper_functions import PipelineTimer
+
+
+def _counted_dataset(passes):
+    def generate():
+        passes.append(1)
+        for _ in range(4):
+            yield np.ones((8, 2), np.float32), np.ones((8, 1), np.float32)
+
+    return tf.data.Dataset.from_generator(
+        generate,
+        output_signature=(
+            tf.TensorSpec((8, 2), tf.float32),
+            tf.TensorSpec((8, 1), tf.float32),
+        ),
+    )
+
+
+@pytest.mark.parametrize("drain_input", [False, True])
+def test_pipeline_timer_only_drains_the_input_on_request(drain_input):
+    passes = []
+    dataset = _counted_dataset(passes)
+    model = tfk.Sequential([tfk.layers.Dense(1, input_shape=(2,))])
+    model.compile(optimizer="sgd", loss="mse")
+
+    history = model.fit(
+        dataset,
+        epochs=3,
+        callbacks=[PipelineTimer(dataset if drain_input else None)],
+        verbose=0,
+    ).history
+
+    assert len(passes) == (6 if drain_input else 3)
+    assert len(history["step_time"]) == 3
+    assert ("input_time" in history) == drain_input
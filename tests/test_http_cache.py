@@ -0,0 +1,156 @@
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from src.http_cache import HTTPCache
+
+
+def _payload(path):
+    # Sized by the path, e.g. /large/2000 is 2000 bytes
+    return (path.encode() * 2000)[: int(path.rsplit("/", 1)[-1])]
+
+
+class PayloadHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append((self.path, dict(self.headers)))
+        body = _payload(self.path)
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PayloadHandler)
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def session():
+    with requests.Session() as session:
+        yield session
+
+
+def _url(server, path):
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+def test_closed_seasons_are_served_from_cache(server, session, tmp_path):
+    cache = HTTPCache(tmp_path)
+    url = _url(server, "/1011/100")
+
+    assert cache.get(session, url, closed=True) == (
+        _payload("/1011/100"),
+        "network",
+    )
+    assert cache.get(session, url, closed=True) == (
+        _payload("/1011/100"),
+        "cache",
+    )
+    cache.save()
+
+    # The index persists, so a new cache over the same directory hits too
+    reopened = HTTPCache(tmp_path, offline=True)
+    assert reopened.get(session, url)[1] == "cache"
+    assert len(server.requests) == 1
+
+
+def test_open_seasons_are_revalidated(server, session, tmp_path):
+    cache = HTTPCache(tmp_path)
+    url = _url(server, "/2425/100")
+
+    assert cache.get(session, url)[1] == "network"
+    content, source = cache.get(session, url)
+
+    assert (content, source) == (_payload("/2425/100"), "not_modified")
+    _, headers = server.requests[-1]
+    assert headers["If-None-Match"].startswith('"')
+
+
+def test_least_recently_used_payloads_are_evicted(server, session, tmp_path):
+    cache = HTTPCache(tmp_path, max_bytes=250)
+    first, second, third = (
+        _url(server, f"/{season}/100") for season in ["1011", "1112", "1213"]
+    )
+
+    cache.get(session, first, closed=True)
+    cache.get(session, second, closed=True)
+    cache.get(session, first, closed=True)
+    cache.get(session, third, closed=True)
+
+    assert cache.size() == 200
+    assert cache.get(session, first, closed=True)[1] == "cache"
+    assert cache.get(session, second, closed=True)[1] == "network"
+
+
+def test_payloads_larger_than_the_cache_are_not_cached(
+    server, session, tmp_path
+):
+    cache = HTTPCache(tmp_path, max_bytes=250)
+    small = _url(server, "/1011/100")
+    cache.get(session, small, closed=True)
+
+    large = _url(server, "/1112/1000")
+    assert cache.get(session, large, closed=True)[1] == "network"
+    assert cache.get(session, large, closed=True)[1] == "network"
+    assert cache.get(session, small, closed=True)[1] == "cache"
+
+
+def test_payload_evicted_after_lookup_is_a_miss(server, session, tmp_path):
+    cache = HTTPCache(tmp_path)
+    url = _url(server, "/1011/100")
+    cache.get(session, url, closed=True)
+
+    # As if another thread evicted it between the lookup and the read
+    for path in (tmp_path / "objects").rglob("*"):
+        if path.is_file():
+            path.unlink()
+
+    assert cache.get(session, url, closed=True) == (
+        _payload("/1011/100"),
+        "network",
+    )
+
+
+def test_concurrent_reads_during_eviction(server, session, tmp_path):
+    cache = HTTPCache(tmp_path, max_bytes=1000)
+    paths = [f"/{season:02d}{season + 1:02d}/100" for season in range(30)]
+    errors = []
+
+    def read(path):
+        try:
+            for _ in range(20):
+                content, _ = cache.get(
+                    session, _url(server, path), closed=True
+                )
+                assert content == _payload(path)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=read, args=(path,)) for path in paths]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert cache.size() <= 1000
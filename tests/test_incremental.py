@@ -0,0 +1,156 @@
+import hashlib
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.incremental import ingest_fduk_incremental, load_watermarks
+from src.ingestion import season_codes
+from src.storage import load_fduk
+
+TODAY = date.today()
+OPEN_YEAR = (TODAY.year if TODAY.month >= 7 else TODAY.year - 1) % 100
+CLOSED_YEAR = OPEN_YEAR - 1
+COLUMNS = ["season", "date", "home_team", "away_team", "goals_h", "goals_a"]
+
+
+def _csv(rows):
+    lines = ["Div,Date,HomeTeam,AwayTeam,FTHG,FTAG"]
+    lines += [",".join(["E0", *map(str, row)]) for row in rows]
+    return ("\n".join(lines) + "\n").encode()
+
+
+class FDUKHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        body = self.server.files.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FDUKHandler)
+    server.requests = []
+    server.files = {
+        f"/{season_codes(CLOSED_YEAR)[0]}/E0.csv": _csv(
+            [
+                ("10/08/2024", "Arsenal", "Chelsea", 2, 1),
+                ("11/08/2024", "Everton", "Fulham", 0, 0),
+            ]
+        ),
+        f"/{season_codes(OPEN_YEAR)[0]}/E0.csv": _csv(
+            [
+                ("16/08/2025", "Arsenal", "Everton", 1, 1),
+                ("17/08/2025", "Chelsea", "Fulham", 3, 0),
+            ]
+        ),
+    }
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _ingest(server, store_root, cache_dir, **kwargs):
+    return ingest_fduk_incremental(
+        store_root,
+        [CLOSED_YEAR, OPEN_YEAR],
+        ["E0"],
+        COLUMNS,
+        base_url=f"http://127.0.0.1:{server.server_address[1]}",
+        cache_dir=cache_dir,
+        **kwargs,
+    )
+
+
+def test_first_run_inserts_every_fixture(server, tmp_path):
+    changes, summary = _ingest(server, tmp_path / "store", tmp_path / "cache")
+
+    assert changes["change"].tolist() == ["inserted"] * 4
+    assert summary.failed == []
+    data = load_fduk(tmp_path / "store")
+    assert len(data) == 4
+    assert data["goals_h"].tolist() == [2, 0, 1, 3]
+
+
+def test_unchanged_partitions_are_a_no_op(server, tmp_path):
+    store_root = tmp_path / "store"
+    _ingest(server, store_root, tmp_path / "cache")
+    files = {
+        path: path.stat().st_mtime_ns for path in store_root.rglob("*.parquet")
+    }
+
+    server.requests.clear()
+    changes, summary = _ingest(server, store_root, tmp_path / "cache")
+
+    # The closed season is skipped and the open one comes back as a 304
+    assert server.requests == [f"/{season_codes(OPEN_YEAR)[0]}/E0.csv"]
+    assert [r["source"] for r in summary.succeeded] == ["not_modified"]
+    assert changes.empty
+    assert {
+        path: path.stat().st_mtime_ns for path in store_root.rglob("*.parquet")
+    } == files
+
+    # Without the HTTP cache the payload is downloaded but still not diffed
+    changes, summary = _ingest(server, store_root, None)
+    assert [r["source"] for r in summary.succeeded] == ["network"]
+    assert changes.empty
+
+
+def test_changed_fixtures_are_upserted(server, tmp_path):
+    store_root = tmp_path / "store"
+    _ingest(server, store_root, tmp_path / "cache")
+
+    server.files[f"/{season_codes(OPEN_YEAR)[0]}/E0.csv"] = _csv(
+        [
+            ("16/08/2025", "Arsenal", "Everton", 2, 1),
+            ("17/08/2025", "Chelsea", "Fulham", 3, 0),
+            ("23/08/2025", "Fulham", "Arsenal", 0, 1),
+        ]
+    )
+    changes, _ = _ingest(server, store_root, tmp_path / "cache")
+
+    assert sorted(zip(changes["home_team"], changes["change"])) == [
+        ("Arsenal", "updated"),
+        ("Fulham", "inserted"),
+    ]
+    data = load_fduk(store_root, seasons=[season_codes(OPEN_YEAR)[1]])
+    assert data["goals_h"].tolist() == [2, 3, 0]
+
+    watermark = load_watermarks(store_root)[f"E0/{season_codes(OPEN_YEAR)[1]}"]
+    assert watermark["row_count"] == 3
+    assert watermark["previous_row_count"] == 2
+    assert watermark["last_date"] == "2025-08-23"
+
+
+def test_offline_runs_read_only_from_the_cache(server, tmp_path):
+    store_root = tmp_path / "store"
+    _ingest(server, store_root, tmp_path / "cache")
+
+    server.requests.clear()
+    changes, summary = _ingest(
+        server, store_root, tmp_path / "cache", offline=True
+    )
+
+    assert server.requests == []
+    assert [r["source"] for r in summary.succeeded] == ["cache"]
+    assert changes.empty
@@ -0,0 +1,204 @@
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from src.ingestion import (
+    _enrich_data_fduk,
+    fetch_fduk_partitions,
+    get_data_fduk,
+)
+from src.synthetic import generate_fduk_data
+
+COLUMN_MAPPING = {"HomeTeam": "home_team", "AwayTeam": "away_team"}
+KEEP_COLUMNS = ["season", "home_team", "away_team"]
+
+# Transient statuses returned before a partition is served
+TRANSIENT = {
+    "/1112/E0.csv": [503],
+    "/1213/E0.csv": [429],
+    "/1314/E0.csv": [500, 502],
+}
+MISSING = {"/1415/E0.csv"}
+ALWAYS_FAILING = {"/1516/E0.csv"}
+
+
+class FDUKHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        with self.server.lock:
+            pending = self.server.transient.get(self.path, [])
+            status = pending.pop(0) if pending else None
+
+        if self.path in ALWAYS_FAILING:
+            status = 503
+        elif self.path in MISSING:
+            status = 404
+        if status is not None:
+            self.send_response(status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        # Earlier seasons answer last, so downloads finish out of order
+        start_y = int(self.path[1:3])
+        time.sleep(0.02 * (20 - start_y))
+        body = f"HomeTeam,AwayTeam\nHome{start_y},Away{start_y}\n".encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/csv")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fduk_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FDUKHandler)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.transient = {path: list(codes) for path, codes in TRANSIENT.items()}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _base_url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_partitions_are_returned_in_request_order(fduk_server):
+    partitions = [("E0", start_y) for start_y in [10, 11, 12, 13, 16, 17]]
+    results, summary = fetch_fduk_partitions(
+        partitions,
+        KEEP_COLUMNS,
+        COLUMN_MAPPING,
+        max_workers=6,
+        retries=2,
+        base_url=_base_url(fduk_server),
+    )
+
+    assert sorted(results) == list(range(len(partitions)))
+    for index, (_, start_y) in enumerate(partitions):
+        assert results[index]["home_team"].tolist() == [f"Home{start_y}"]
+    assert [r["season"] for r in summary.succeeded] == [
+        "10_11",
+        "11_12",
+        "12_13",
+        "13_14",
+        "16_17",
+        "17_18",
+    ]
+    assert summary.failed == []
+
+
+def test_transient_errors_are_retried(fduk_server):
+    results, summary = fetch_fduk_partitions(
+        [("E0", 11), ("E0", 12), ("E0", 13)],
+        KEEP_COLUMNS,
+        COLUMN_MAPPING,
+        retries=2,
+        base_url=_base_url(fduk_server),
+    )
+
+    assert len(results) == 3
+    assert summary.failed == []
+    assert fduk_server.requests.count("/1112/E0.csv") == 2
+    assert fduk_server.requests.count("/1213/E0.csv") == 2
+    assert fduk_server.requests.count("/1314/E0.csv") == 3
+
+
+def test_failed_partitions_are_reported(fduk_server):
+    data, summary = get_data_fduk(
+        range(10, 18),
+        ["E0"],
+        ["home_team", "away_team"],
+        max_workers=8,
+        retries=1,
+        base_url=_base_url(fduk_server),
+        return_summary=True,
+    )
+
+    # 13/14 needs two retries, 14/15 is missing and 15/16 keeps failing
+    assert [r["season"] for r in summary.failed] == [
+        "13_14",
+        "14_15",
+        "15_16",
+    ]
+    assert fduk_server.requests.count("/1415/E0.csv") == 1
+    assert data["home_team"].tolist() == [
+        f"Home{start_y}" for start_y in [10, 11, 12, 16, 17]
+    ]
+    assert summary.to_dict()["num_succeeded"] == 5
+
+
+def _enrich_one_partition(data):
+    # The row-by-row enrichment the vectorized version replaced, which
+    # handles a single league-season per call
+    half_way_point = data["home_team"].nunique() - 1
+    team_counter = Counter()
+    game_num_h, game_num_a = [], []
+    for _, row in data.iterrows():
+        team_counter[row["home_team"]] += 1
+        game_num_h.append(team_counter[row["home_team"]])
+        team_counter[row["away_team"]] += 1
+        game_num_a.append(team_counter[row["away_team"]])
+
+    data = data.copy()
+    data["game_num_h"] = game_num_h
+    data["game_num_a"] = game_num_a
+    data["season_half_h"] = [
+        2 if n > half_way_point else 1 for n in game_num_h
+    ]
+    data["season_half_a"] = [
+        2 if n > half_way_point else 1 for n in game_num_a
+    ]
+    return data
+
+
+def test_enrichment_matches_the_per_partition_loop():
+    # Leagues of different sizes, with their fixtures interleaved
+    data = pd.concat(
+        [
+            generate_fduk_data(2, 3, num_teams=6, columns="config", seed=0),
+            generate_fduk_data(1, 3, num_teams=8, columns="config", seed=1)
+            .assign(division="X0")
+            .assign(home_team=lambda d: "X0 " + d["home_team"])
+            .assign(away_team=lambda d: "X0 " + d["away_team"]),
+        ]
+    )
+    data = data.iloc[
+        data.groupby(["division", "season"]).cumcount().argsort(kind="stable")
+    ].reset_index(drop=True)
+
+    enriched = _enrich_data_fduk(data)
+
+    expected = pd.concat(
+        [
+            _enrich_one_partition(partition)
+            for _, partition in data.groupby(["division", "season"])
+        ]
+    ).loc[data.index]
+    enrich_columns = [
+        "game_num_h",
+        "game_num_a",
+        "season_half_h",
+        "season_half_a",
+    ]
+    pd.testing.assert_frame_equal(
+        enriched[enrich_columns], expected[enrich_columns], check_dtype=False
+    )
+    # Each league turns at the end of its own first round robin
+    first_half = enriched[enriched["season_half_h"] == 1]
+    assert first_half.groupby("division")["game_num_h"].max().to_dict() == {
+        "E0": 5,
+        "E1": 5,
+        "X0": 7,
+    }
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+import tf_keras as tfk
+
+from src.bayesian_nn import create_bnn_model, model_moments
+from src.online_update import (
+    load_model_version,
+    save_model_version,
+    update_posterior,
+)
+from src.priors_posteriors import make_normal_prior, mean_field_posterior
+
+FEATURE_NAMES = ["elo_diff", "form_diff"]
+
+
+def _fixtures(n, seed):
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame(
+        rng.normal(size=(n, len(FEATURE_NAMES))), columns=FEATURE_NAMES
+    )
+    data["h_win"] = (data["elo_diff"] > 0).astype(np.float32)
+    return data
+
+
+@pytest.fixture
+def saved_model(tmp_path):
+    config = {
+        "feature_names": FEATURE_NAMES,
+        "hidden_units": [4],
+        "posterior": "mean_field",
+        "posterior_rank": 2,
+        "prior_scale": 1.0,
+        "kl_use_exact": True,
+        "layer_type": "dense_variational",
+        "packed_inputs": True,
+        "n_train": 200,
+        "parent_version": None,
+    }
+    model = create_bnn_model(
+        FEATURE_NAMES,
+        [4],
+        make_normal_prior(1.0),
+        mean_field_posterior,
+        200,
+        kl_use_exact=True,
+        packed_inputs=True,
+    )
+    model.compile(optimizer="rmsprop", loss="mse")
+    train = _fixtures(200, seed=0)
+    model.fit(
+        train[FEATURE_NAMES].to_numpy(np.float32),
+        train["h_win"].to_numpy(np.float32),
+        epochs=2,
+        verbose=0,
+    )
+    save_model_version(model, config, tmp_path, "bnn")
+    return model
+
+
+def _batch_norm(model):
+    (layer,) = [
+        layer
+        for layer in model.layers
+        if isinstance(layer, tfk.layers.BatchNormalization)
+    ]
+    return layer
+
+
+def test_update_keeps_batch_norm_population_stats(saved_model, tmp_path):
+    before = [w.numpy() for w in _batch_norm(saved_model).weights]
+
+    model, _ = update_posterior(
+        tmp_path, "bnn", _fixtures(10, seed=1) * 5, num_epochs=3
+    )
+
+    for stored, updated in zip(before, _batch_norm(model).weights):
+        np.testing.assert_array_equal(stored, updated.numpy())
+
+
+def test_updated_version_round_trips(saved_model, tmp_path):
+    model, version_path = update_posterior(
+        tmp_path, "bnn", _fixtures(10, seed=1), num_epochs=3
+    )
+    loaded, config = load_model_version(tmp_path, "bnn")
+
+    assert config["version"] == 2
+    assert config["n_train"] == 10
+    assert config["n_seen"] == 210
+    assert config["freeze_batch_norm"]
+    assert (version_path / config["prior"]).exists()
+
+    X = _fixtures(50, seed=2)[FEATURE_NAMES].to_numpy(np.float32)
+    for expected, actual in zip(
+        model_moments(model, X), model_moments(loaded, X)
+    ):
+        np.testing.assert_array_equal(expected, actual)
+
+    # The rebuilt version regularises towards the prior it was fitted with
+    model(X)
+    loaded(X)
+    np.testing.assert_allclose(
+        [loss.numpy() for loss in model.losses],
+        [loss.numpy() for loss in loaded.losses],
+        rtol=1e-6,
+    )
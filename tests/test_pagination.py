@@ -0,0 +1,100 @@
+import importlib
+import json
+import sys
+import threading
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from src.http_session import make_session
+
+NUM_PAGES = 3
+
+
+class SportmonksHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        page = int(parse_qs(url.query)["page"][0])
+        self.server.requests.append((url.path, page))
+
+        # Rate limited from the second page on, for longer than any backoff
+        if url.path.startswith("/limited") and page > 1:
+            self.send_response(429)
+            self.end_headers()
+            return
+
+        body = json.dumps(
+            {
+                "data": [{"id": f"{url.path}-{page}-{i}"} for i in range(2)],
+                "pagination": {"has_more": page < NUM_PAGES},
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SportmonksHandler)
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def sportmonks(monkeypatch):
+    # The Sportmonks config reads the API key from an untracked module
+    monkeypatch.setitem(
+        sys.modules, "credentials", types.SimpleNamespace(SM_API_KEY="test")
+    )
+    for name in list(sys.modules):
+        if name.startswith("scripts.ingestion.sportmonks"):
+            monkeypatch.delitem(sys.modules, name)
+    return importlib.import_module(
+        "scripts.ingestion.sportmonks.fixtures_ingestion"
+    )
+
+
+def _url(server, path):
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+def test_exhausted_retries_stop_only_that_listing(server, sportmonks):
+    from scripts.ingestion.sportmonks.pagination import iter_pages
+
+    session = make_session(retries=1, backoff_factor=0)
+
+    pages = list(iter_pages(_url(server, "/limited"), session=session))
+    assert [[r["id"] for r in page] for page in pages] == [
+        ["/limited-1-0", "/limited-1-1"]
+    ]
+
+    # The next listing on the same session is unaffected
+    pages = list(iter_pages(_url(server, "/open"), session=session))
+    assert len(pages) == NUM_PAGES
+
+
+def test_get_fixtures_from_period_flattens_pages(
+    server, sportmonks, monkeypatch
+):
+    monkeypatch.setattr(sportmonks, "BASE_URL", _url(server, ""))
+
+    fixtures = sportmonks.get_fixtures_from_period(
+        8, "2024-08-01", "2024-08-31", session=make_session(retries=0)
+    )
+
+    path = "/fixtures/between/2024-08-01/2024-08-31"
+    assert fixtures == [
+        {"id": f"{path}-{page}-{i}"}
+        for page in range(1, NUM_PAGES + 1)
+        for i in range(2)
+    ]
@@ -0,0 +1,53 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from src.profiling import Profiler, current_rss_mb
+
+
+def test_concurrent_stages_record_elapsed_wall_time(tmp_path):
+    profiler = Profiler(profile_stage="download", profile_dir=tmp_path)
+
+    def download(_):
+        with profiler.stage("download", items=1):
+            time.sleep(0.2)
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        list(executor.map(download, range(16)))
+
+    record = profiler.stages["download"]
+    assert record["calls"] == 16
+    assert record["items"] == 16
+    assert 0.2 <= record["wall_time"] < 16 * 0.2 / 2
+    # Worker threads are timed but never start a process wide capture
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_main_thread_stage_is_captured(tmp_path):
+    profiler = Profiler(profile_stage="download", profile_dir=tmp_path)
+
+    with profiler.stage("download"):
+        sum(range(1000))
+
+    assert (tmp_path / "download.prof").exists()
+    assert profiler.stages["download"]["calls"] == 1
+
+
+@pytest.mark.skipif(current_rss_mb() is None, reason="needs /proc/self/statm")
+def test_rss_growth_is_per_stage(tmp_path):
+    profiler = Profiler(profile_dir=tmp_path)
+
+    with profiler.stage("large"):
+        large = np.ones(2**25)
+    del large
+
+    # Smaller than the earlier stage, so the process peak does not move
+    with profiler.stage("small"):
+        small = np.ones(2**23)
+
+    growth = profiler.stages["small"]["rss_growth_mb"]
+    assert small.nbytes / 2**20 * 0.8 < growth < small.nbytes / 2**20 * 1.5
+    assert profiler.stages["large"]["rss_growth_mb"] > 200
+    assert profiler.stages["small"]["rss_mb"] <= current_rss_mb() + 1
@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+import pytest
+from loguru import logger
+
+from src.ingestion import _enrich_data_fduk
+from src.preprocess import create_dataframe, load_ingested_data
+from src.storage import apply_fduk_dtypes, load_fduk, write_partitioned
+from src.synthetic import generate_fduk_data, rename_fduk_columns
+
+
+@pytest.fixture
+def ingested():
+    # Seasons 97_98 to 99_00, with no referees recorded for E1 in 99_00
+    data = _enrich_data_fduk(
+        generate_fduk_data(
+            num_leagues=2,
+            num_seasons=3,
+            num_teams=6,
+            first_start_year=97,
+            columns="config",
+        )
+    )
+    drift = (data["division"] == "E1") & (data["season"] == "99_00")
+    data.loc[drift, "referee"] = np.nan
+    return data
+
+
+@pytest.fixture
+def warnings():
+    messages = []
+    handler_id = logger.add(messages.append, level="WARNING")
+    yield messages
+    logger.remove(handler_id)
+
+
+def _comparable(model_data):
+    # The store keeps odds as float32 and counts as nullable integers
+    keys = ["season", "div", "h_team", "a_team"]
+    model_data = model_data.drop(columns="date").astype(
+        {column: str for column in keys + ["ftr"]}
+    )
+    numeric = model_data.columns.difference(keys + ["ftr"])
+    model_data[numeric] = model_data[numeric].astype("float64")
+    return model_data.sort_values(keys, ignore_index=True)
+
+
+def test_round_trip_keeps_dtypes_and_order(ingested, tmp_path):
+    store = write_partitioned(apply_fduk_dtypes(ingested), tmp_path / "fduk")
+
+    loaded = load_fduk(store)
+
+    # Season-major like get_data_fduk, rather than the league-major order
+    # the synthetic data comes in
+    expected = apply_fduk_dtypes(ingested).sort_values(
+        ["season", "division"], kind="stable"
+    )
+    # Partition columns come back from the directory names, after the rest
+    assert sorted(loaded.columns) == sorted(expected.columns)
+    loaded = loaded[expected.columns]
+    assert loaded["division"].dtype == "category"
+    assert loaded["goals_h"].dtype == "Int8"
+    assert loaded["odds_h_b365"].dtype == "float32"
+    assert loaded["home_team"].dtype == "category"
+    assert loaded["season_half_h"].dtype == "int8"
+    assert pd.api.types.is_datetime64_any_dtype(loaded["date"])
+    pd.testing.assert_frame_equal(
+        loaded.astype(str),
+        expected.reset_index(drop=True).astype(str),
+        check_dtype=False,
+    )
+
+
+def test_partition_filters(ingested, tmp_path):
+    store = write_partitioned(apply_fduk_dtypes(ingested), tmp_path / "fduk")
+
+    loaded = load_fduk(
+        store,
+        columns=["division", "season", "home_team", "goals_h"],
+        leagues=["E1"],
+        season_range=("98_99", "99_00"),
+    )
+
+    expected = ingested[
+        (ingested["division"] == "E1")
+        & ingested["season"].isin(["98_99", "99_00"])
+    ]
+    assert loaded.columns.tolist() == [
+        "division",
+        "season",
+        "home_team",
+        "goals_h",
+    ]
+    assert loaded["home_team"].tolist() == expected["home_team"].tolist()
+    assert loaded["goals_h"].tolist() == expected["goals_h"].tolist()
+    # Unused categories are dropped with the pruned partitions
+    assert loaded["season"].cat.categories.tolist() == ["98_99", "99_00"]
+
+
+def test_schema_drift_season_warns(ingested, tmp_path, warnings):
+    store = write_partitioned(apply_fduk_dtypes(ingested), tmp_path / "fduk")
+
+    loaded = load_fduk(store, seasons=["99_00"])
+
+    drift = loaded["division"] == "E1"
+    assert loaded.loc[drift, "referee"].isna().all()
+    assert loaded.loc[~drift, "referee"].notna().all()
+    assert len(warnings) == 1
+    assert "['referee'] in E1 99_00" in warnings[0]
+
+    warnings.clear()
+    load_fduk(store, seasons=["97_98", "98_99"])
+    assert warnings == []
+
+
+def test_preprocessing_reads_the_store(ingested, tmp_path):
+    store = write_partitioned(apply_fduk_dtypes(ingested), tmp_path / "fduk")
+
+    from_store = create_dataframe(load_ingested_data(store))
+
+    raw = rename_fduk_columns(
+        generate_fduk_data(
+            num_leagues=2, num_seasons=3, num_teams=6, first_start_year=97
+        ),
+        "lowercase",
+    )
+    raw["season_half_h"] = ingested["season_half_h"].values
+    raw["season_half_a"] = ingested["season_half_a"].values
+    expected = create_dataframe(raw)
+
+    assert len(from_store) == len(expected) > 0
+    pd.testing.assert_frame_equal(
+        _comparable(from_store), _comparable(expected), rtol=1e-6
+    )
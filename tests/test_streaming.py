@@ -0,0 +1,69 @@
+import numpy as np
+
+from src.streaming import PredictiveAccumulator
+
+
+def _samples(num_samples=1000, num_fixtures=6, seed=0):
+    rng = np.random.default_rng(seed)
+    # Per-fixture Beta draws, so each column has its own spread and skew
+    a = rng.uniform(1, 8, num_fixtures)
+    b = rng.uniform(1, 8, num_fixtures)
+    return rng.beta(a, b, size=(num_samples, num_fixtures))
+
+
+def test_merged_chunks_match_numpy():
+    samples = _samples()
+    accumulator = PredictiveAccumulator(samples.shape[1])
+
+    # Uneven chunks, including a single sample
+    for chunk in np.split(samples, [1, 7, 250, 600]):
+        accumulator.update(chunk)
+
+    assert accumulator.count == len(samples)
+    np.testing.assert_allclose(accumulator.mean, samples.mean(axis=0))
+    np.testing.assert_allclose(accumulator.variance, samples.var(axis=0))
+
+
+def test_chunking_does_not_change_the_result():
+    samples = _samples(seed=1)
+    whole = PredictiveAccumulator(samples.shape[1], thresholds=[0.5])
+    whole.update(samples)
+    chunked = PredictiveAccumulator(samples.shape[1], thresholds=[0.5])
+    for chunk in np.array_split(samples, 9):
+        chunked.update(chunk)
+
+    np.testing.assert_allclose(chunked.mean, whole.mean)
+    np.testing.assert_allclose(chunked.variance, whole.variance)
+    np.testing.assert_array_equal(chunked.histogram, whole.histogram)
+    np.testing.assert_array_equal(
+        chunked.exceedance_counts, whole.exceedance_counts
+    )
+
+
+def test_quantile_sketch_is_within_a_bin():
+    samples = _samples(num_samples=20000, seed=2)
+    accumulator = PredictiveAccumulator(samples.shape[1], num_bins=100)
+    for chunk in np.array_split(samples, 4):
+        accumulator.update(chunk)
+
+    quantiles = [0.05, 0.5, 0.95]
+    np.testing.assert_allclose(
+        accumulator.quantiles(quantiles),
+        np.quantile(samples, quantiles, axis=0),
+        atol=1 / accumulator.num_bins,
+    )
+
+
+def test_exceedance_probabilities():
+    samples = _samples(seed=3)
+    thresholds = [0.25, 0.5, 0.75]
+    accumulator = PredictiveAccumulator(
+        samples.shape[1], thresholds=thresholds
+    )
+    accumulator.update(samples[:400])
+    accumulator.update(samples[400:])
+
+    np.testing.assert_allclose(
+        accumulator.exceedance_probabilities(),
+        (samples[..., np.newaxis] > thresholds).mean(axis=0),
+    )
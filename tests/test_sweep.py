@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.shared_data import load_shared_dataframe, share_dataframe
+from src.sweep import grid_search, random_search, trial_key
+
+SPACE = {
+    "learning_rate": [0.001, 0.01, 0.1],
+    "hidden_units": [[8], [8, 8], [16]],
+    "posterior": ["mean_field", "low_rank"],
+}
+
+
+def test_random_search_draws_distinct_trials():
+    trials = random_search(SPACE, num_trials=12, seed=3)
+
+    assert len({trial_key(params) for params in trials}) == 12
+    grid_keys = {trial_key(params) for params in grid_search(SPACE)}
+    assert {trial_key(params) for params in trials} <= grid_keys
+    assert trials == random_search(SPACE, num_trials=12, seed=3)
+
+
+def test_random_search_caps_at_the_space_size():
+    trials = random_search(SPACE, num_trials=50)
+
+    assert sorted(map(trial_key, trials)) == sorted(
+        map(trial_key, grid_search(SPACE))
+    )
+
+
+def _frame(num_rows):
+    return pd.DataFrame(
+        {
+            "season": [
+                f"{i % 3:02d}_{i % 3 + 1:02d}" for i in range(num_rows)
+            ],
+            "h_avg_goals_scored": np.linspace(0, 1, num_rows),
+            "h_win": np.arange(num_rows) % 2,
+        }
+    )
+
+
+def test_shared_dataframe_round_trip(tmp_path):
+    data = _frame(10)
+
+    loaded = load_shared_dataframe(
+        share_dataframe(data, tmp_path / "train")
+    ).copy()
+
+    pd.testing.assert_frame_equal(loaded, data)
+
+
+def test_interrupted_share_leaves_previous_split(tmp_path, monkeypatch):
+    directory = share_dataframe(_frame(10), tmp_path / "val")
+
+    save = np.save
+    calls = []
+
+    def failing_save(path, values):
+        calls.append(path)
+        if len(calls) == 2:
+            raise OSError("No space left on device")
+        save(path, values)
+
+    monkeypatch.setattr(np, "save", failing_save)
+    with pytest.raises(OSError):
+        share_dataframe(_frame(20), directory)
+    monkeypatch.undo()
+
+    # The half-written copy never replaces the complete one
+    pd.testing.assert_frame_equal(
+        load_shared_dataframe(directory).copy(), _frame(10)
+    )
+
+    share_dataframe(_frame(20), directory)
+    pd.testing.assert_frame_equal(
+        load_shared_dataframe(directory).copy(), _frame(20)
+    )
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["val"]
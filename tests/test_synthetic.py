@@ -0,0 +1,82 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from src.synthetic import (
+    generate_fduk_data,
+    league_codes,
+    round_robin,
+    season_tags,
+)
+
+
+def test_round_robin_is_a_double_round_robin():
+    num_teams = 8
+    home, away, matchweek = round_robin(num_teams)
+
+    assert len(home) == num_teams * (num_teams - 1)
+    assert Counter(zip(home, away)) == {
+        (h, a): 1 for h in range(num_teams) for a in range(num_teams) if h != a
+    }
+    # Every team plays exactly once in every matchweek
+    for week in range(2 * (num_teams - 1)):
+        playing = np.concatenate(
+            [home[matchweek == week], away[matchweek == week]]
+        )
+        assert sorted(playing) == list(range(num_teams))
+    # The second half repeats the first with venues swapped
+    first = matchweek < num_teams - 1
+    assert set(zip(away[first], home[first])) == set(
+        zip(home[~first], away[~first])
+    )
+
+
+def test_tags_and_codes():
+    assert season_tags(3, first_start_year=98) == ["98_99", "99_00", "00_01"]
+    assert league_codes(2) == ["E0", "E1"]
+    assert league_codes(22)[-2:] == ["X0", "X1"]
+
+
+def test_generated_fixtures_are_consistent():
+    data = generate_fduk_data(
+        num_leagues=3, num_seasons=2, num_teams=6, first_start_year=98
+    )
+
+    assert len(data) == 3 * 2 * 6 * 5
+    assert data.groupby(["Div", "season"]).size().eq(30).all()
+    assert (data["HTHG"] <= data["FTHG"]).all()
+    assert (data["HST"] <= data["HS"]).all()
+    assert (data["FTHG"] <= data["HST"]).all()
+    expected_result = np.where(
+        data["FTHG"] > data["FTAG"],
+        "H",
+        np.where(data["FTHG"] < data["FTAG"], "A", "D"),
+    )
+    assert (data["FTR"] == expected_result).all()
+    # A five percent overround, more where the probabilities are clipped
+    margin = (1 / data[["B365H", "B365D", "B365A"]].to_numpy()).sum(axis=1)
+    assert (margin > 1.04).all()
+    assert np.median(margin) == pytest.approx(1.05, abs=0.005)
+    assert data["Date"].str.endswith(("1998", "1999", "2000")).all()
+
+
+def test_generation_is_seeded():
+    first = generate_fduk_data(num_seasons=2, num_teams=4, seed=5)
+
+    assert first.equals(generate_fduk_data(num_seasons=2, num_teams=4, seed=5))
+    assert not first.equals(
+        generate_fduk_data(num_seasons=2, num_teams=4, seed=6)
+    )
+
+
+def test_column_names():
+    config = generate_fduk_data(num_seasons=1, num_teams=4, columns="config")
+    lowercase = generate_fduk_data(
+        num_seasons=1, num_teams=4, columns="lowercase"
+    )
+
+    assert {"division", "home_team", "odds_h_b365"} <= set(config.columns)
+    assert {"div", "hometeam", "b365h"} <= set(lowercase.columns)
+    with pytest.raises(ValueError):
+        generate_fduk_data(num_seasons=1, num_teams=4, columns="camel")
@@ -0,0 +1,295 @@
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from mlflow.tracking import MlflowClient
+
+import src.tracking
+from src.tracking import ExperimentTracker, sync_offline_runs
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture
+def file_store(tmp_path):
+    return f"file:{tmp_path / 'mlruns'}"
+
+
+@pytest.fixture
+def unreachable_server():
+    # Bound but never listening, so connections are refused straight away
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        yield f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+def _runs(tracking_uri, experiment_name):
+    client = MlflowClient(tracking_uri=tracking_uri)
+    experiment = client.get_experiment_by_name(experiment_name)
+    if experiment is None:
+        return []
+    return client.search_runs([experiment.experiment_id])
+
+
+def _log_run(tracker, num_metrics=5):
+    tracker.start_run(run_name="test-run")
+    tracker.set_tags({"league": "E0"})
+    tracker.log_params({"learning_rate": 0.001, "hidden_units": [8, 8]})
+    tracker.log_history({"loss": [1.0 / (i + 1) for i in range(num_metrics)]})
+    tracker.log_metric("val_mse", 0.2)
+    tracker.end_run()
+
+
+def _sync_script(tracking_uri, offline_dir):
+    subprocess.run(
+        [
+            sys.executable,
+            "scripts/mlflow_server/sync_offline_runs.py",
+            "--tracking_uri",
+            tracking_uri,
+            "--offline_dir",
+            str(offline_dir),
+        ],
+        cwd=REPO_ROOT,
+        env={**os.environ, "PYTHONPATH": str(REPO_ROOT)},
+        check=True,
+    )
+
+
+def test_batches_are_flushed_to_file_store(file_store, tmp_path, monkeypatch):
+    batch_calls = []
+    log_batch = MlflowClient.log_batch
+
+    def counting_log_batch(self, run_id, metrics=(), params=(), tags=()):
+        batch_calls.append(len(metrics) + len(params) + len(tags))
+        return log_batch(
+            self, run_id, metrics=metrics, params=params, tags=tags
+        )
+
+    monkeypatch.setattr(MlflowClient, "log_batch", counting_log_batch)
+
+    tracker = ExperimentTracker(
+        "batched",
+        file_store,
+        offline_dir=tmp_path / "offline",
+        flush_interval=60.0,
+        max_batch_size=500,
+    )
+    _log_run(tracker, num_metrics=1200)
+
+    # 1200 history points, a metric, two params and a tag, in a handful of
+    # requests rather than one per record
+    assert sum(batch_calls) == 1204
+    assert len(batch_calls) <= 8
+
+    (run,) = _runs(file_store, "batched")
+    client = MlflowClient(tracking_uri=file_store)
+    assert run.info.status == "FINISHED"
+    assert run.data.params == {
+        "learning_rate": "0.001",
+        "hidden_units": "[8, 8]",
+    }
+    assert run.data.tags["league"] == "E0"
+    assert len(client.get_metric_history(run.info.run_id, "loss")) == 1200
+    assert tracker.metrics["val_mse"] == 0.2
+    assert not (tmp_path / "offline").exists()
+
+
+def test_falls_back_to_offline_store(unreachable_server, tmp_path):
+    tracker = ExperimentTracker(
+        "offline", unreachable_server, offline_dir=tmp_path / "offline"
+    )
+    _log_run(tracker)
+
+    assert tracker.run_id is None
+    (spool_path,) = (tmp_path / "offline").glob("*.jsonl")
+    with open(spool_path) as f:
+        header, *records = [json.loads(line) for line in f]
+
+    assert header == {
+        "type": "run",
+        "experiment_name": "offline",
+        "run_name": "test-run",
+        "run_id": None,
+    }
+    assert [r["type"] for r in records].count("metric") == 6
+    assert records[-1] == {"type": "end", "status": "FINISHED"}
+
+
+def test_sync_script_replays_runs_once(
+    unreachable_server, file_store, tmp_path
+):
+    offline_dir = tmp_path / "offline"
+    for _ in range(2):
+        _log_run(
+            ExperimentTracker(
+                "replayed", unreachable_server, offline_dir=offline_dir
+            )
+        )
+    spool_copies = tmp_path / "spool_copies"
+    shutil.copytree(offline_dir, spool_copies)
+
+    _sync_script(file_store, offline_dir)
+    assert list(offline_dir.glob("*.jsonl")) == []
+
+    # Replaying the same spool files again, as after a sync that died
+    # before removing them, must not add runs or metric points
+    shutil.copytree(spool_copies, offline_dir, dirs_exist_ok=True)
+    _sync_script(file_store, offline_dir)
+    _sync_script(file_store, offline_dir)
+
+    runs = _runs(file_store, "replayed")
+    client = MlflowClient(tracking_uri=file_store)
+    assert len(runs) == 2
+    for run in runs:
+        assert run.info.status == "FINISHED"
+        assert run.info.run_name == "test-run"
+        assert len(client.get_metric_history(run.info.run_id, "loss")) == 5
+        assert len(client.get_metric_history(run.info.run_id, "val_mse")) == 1
+    assert list(offline_dir.glob("*.jsonl")) == []
+
+
+def test_run_that_goes_offline_resumes_in_same_run(
+    file_store, tmp_path, monkeypatch
+):
+    offline_dir = tmp_path / "offline"
+    tracker = ExperimentTracker(
+        "interrupted", file_store, offline_dir=offline_dir, flush_interval=0.1
+    )
+    tracker.start_run(run_name="test-run")
+    tracker.log_metric("loss", 1.0, step=0)
+    tracker.log_param("learning_rate", 0.001)
+    while tracker.run_id is None:
+        time.sleep(0.01)
+
+    monkeypatch.setattr(src.tracking, "server_available", lambda uri: False)
+    tracker.log_metric("loss", 0.5, step=1)
+    tracker.end_run()
+    monkeypatch.undo()
+
+    (spool_path,) = offline_dir.glob("*.jsonl")
+    shutil.copy(spool_path, tmp_path / "spool_copy.jsonl")
+
+    assert sync_offline_runs(file_store, offline_dir) == 1
+    shutil.copy(tmp_path / "spool_copy.jsonl", spool_path)
+    sync_offline_runs(file_store, offline_dir)
+
+    (run,) = _runs(file_store, "interrupted")
+    client = MlflowClient(tracking_uri=file_store)
+    assert run.info.run_id == tracker.run_id
+    assert run.info.status == "FINISHED"
+    history = client.get_metric_history(run.info.run_id, "loss")
+    assert sorted(m.step for m in history) == [0, 1]
+
+
+def _fail_once(monkeypatch, name, should_fail):
+    original = getattr(MlflowClient, name)
+    failed = []
+
+    def flaky(self, *args, **kwargs):
+        if not failed and should_fail(*args, **kwargs):
+            failed.append(True)
+            raise ConnectionError("connection reset")
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(MlflowClient, name, flaky)
+    return failed
+
+
+def test_partly_logged_batch_spools_only_the_rest(
+    file_store, tmp_path, monkeypatch
+):
+    offline_dir = tmp_path / "offline"
+    # The metrics request succeeds and the params request after it fails
+    failed = _fail_once(
+        monkeypatch, "log_batch", lambda run_id, **kwargs: kwargs.get("params")
+    )
+    tracker = ExperimentTracker(
+        "partial", file_store, offline_dir=offline_dir, flush_interval=60.0
+    )
+    _log_run(tracker)
+    assert failed
+
+    with open(tracker.spool_path) as f:
+        header, *records = [json.loads(line) for line in f]
+    assert header["run_id"] == tracker.run_id
+    assert {r["type"] for r in records} == {"param", "tag", "end"}
+
+    monkeypatch.undo()
+    assert sync_offline_runs(file_store, offline_dir) == 1
+
+    (run,) = _runs(file_store, "partial")
+    client = MlflowClient(tracking_uri=file_store)
+    assert run.info.status == "FINISHED"
+    assert run.data.params["learning_rate"] == "0.001"
+    assert len(client.get_metric_history(run.info.run_id, "loss")) == 5
+
+
+def _spool_run(tracking_uri, offline_dir, monkeypatch, went_offline):
+    if not went_offline:
+        _log_run(
+            ExperimentTracker("resumed", tracking_uri, offline_dir=offline_dir)
+        )
+        return
+
+    # Starts online, so the spool replays into the existing run
+    tracker = ExperimentTracker(
+        "resumed", tracking_uri, offline_dir=offline_dir, flush_interval=0.1
+    )
+    tracker.start_run(run_name="test-run")
+    tracker.log_metric("val_mse", 0.2)
+    while tracker.run_id is None:
+        time.sleep(0.01)
+    with monkeypatch.context() as m:
+        m.setattr(src.tracking, "server_available", lambda uri: False)
+        tracker.log_params({"learning_rate": 0.001, "hidden_units": [8, 8]})
+        tracker.log_history({"loss": [1.0 / (i + 1) for i in range(5)]})
+        tracker.end_run()
+
+
+@pytest.mark.parametrize("fail_on", ["log_batch", "set_tag"])
+@pytest.mark.parametrize("went_offline", [False, True])
+def test_interrupted_sync_resumes_without_duplicates(
+    unreachable_server,
+    file_store,
+    tmp_path,
+    monkeypatch,
+    fail_on,
+    went_offline,
+):
+    offline_dir = tmp_path / "offline"
+    _spool_run(
+        file_store if went_offline else unreachable_server,
+        offline_dir,
+        monkeypatch,
+        went_offline,
+    )
+
+    # Dies after the metrics are logged, either on the params request or
+    # when marking the spool as synced
+    failed = _fail_once(
+        monkeypatch,
+        fail_on,
+        lambda run_id, *args, **kwargs: fail_on == "set_tag"
+        or kwargs.get("params"),
+    )
+    with pytest.raises(ConnectionError):
+        sync_offline_runs(file_store, offline_dir)
+    assert failed
+    monkeypatch.undo()
+
+    assert sync_offline_runs(file_store, offline_dir) == 1
+    assert list(offline_dir.glob("*.jsonl")) == []
+
+    (run,) = _runs(file_store, "resumed")
+    client = MlflowClient(tracking_uri=file_store)
+    assert run.info.status == "FINISHED"
+    assert run.data.params["hidden_units"] == "[8, 8]"
+    assert len(client.get_metric_history(run.info.run_id, "loss")) == 5
+    assert len(client.get_metric_history(run.info.run_id, "val_mse")) == 1